@@ -7,6 +7,10 @@ from sqlmodel import SQLModel
 from alembic import context
 from channel_automation.models.admin import Admin
 from channel_automation.models.channel import ChannelInfo
+from channel_automation.models.completion import CachedCompletion
+from channel_automation.models.digest import Digest, DigestItem
+from channel_automation.models.image import ImageFileId, ImageFingerprint
+from channel_automation.models.outbox import OutboxMessage
 from channel_automation.models.source import Source
 
 # this is the Alembic Config object, which provides
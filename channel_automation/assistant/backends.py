@@ -0,0 +1,169 @@
+from typing import Any, Optional
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+import openai
+
+from channel_automation.health import BackendHealth, HealthStats
+
+
+@dataclass
+class ChatBackend:
+    """
+    One chat completion endpoint: OpenAI itself or any server speaking the
+    OpenAI API, e.g. a local vLLM, llama.cpp or Ollama server given by
+    ``api_base``.
+    """
+
+    name: str
+    model: str
+    api_key: str = field(repr=False)
+    api_base: Optional[str] = None  # None for api.openai.com
+    timeout: float = 120.0
+    # Local servers often do not implement function calling
+    supports_functions: bool = True
+    health: BackendHealth = field(default_factory=BackendHealth, repr=False)
+
+    async def create(self, **params) -> Any:
+        if not self.supports_functions:
+            params.pop("functions", None)
+            params.pop("function_call", None)
+        return await openai.ChatCompletion.acreate(
+            api_key=self.api_key,
+            api_base=self.api_base,
+            request_timeout=self.timeout,
+            **{**params, "model": self.model},
+        )
+
+
+@dataclass
+class RouterStats:
+    backends: dict[str, HealthStats]
+    fallbacks: int
+    hedged: int
+    hedge_wins: int
+
+
+class BackendRouter:
+    """
+    Sends every completion to the first healthy backend and falls back to the
+    next one when it fails or exceeds its own timeout.
+
+    With a ``hedge`` backend, usually a faster model, a second request is sent
+    to it when the first has not answered within ``hedge_after`` seconds. The
+    first answer wins and the other request is cancelled, so one provider's
+    slow minute no longer decides the tail latency.
+    """
+
+    def __init__(
+        self,
+        backends: list[ChatBackend],
+        hedge: Optional[ChatBackend] = None,
+        hedge_after: float = 20.0,
+    ) -> None:
+        if not backends:
+            raise ValueError("At least one backend is required")
+        self.backends = backends
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self._fallbacks = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+
+    @property
+    def primary(self) -> ChatBackend:
+        return self.backends[0]
+
+    async def create(self, **params) -> Any:
+        """
+        Runs ``ChatCompletion.acreate`` with ``params`` on the backends. With
+        ``stream=True`` the answer counts as arrived once the stream starts.
+        """
+        _, response = await self.create_with_backend(**params)
+        return response
+
+    async def create_with_backend(self, **params) -> tuple[ChatBackend, Any]:
+        """
+        Like ``create``, but also returns the backend that answered, a
+        fallback or the hedge when the primary backend did not.
+        """
+        # When everything is cooling down trying anyway beats failing outright
+        candidates = [
+            backend for backend in self.backends if backend.health.available
+        ] or self.backends
+        error: Optional[Exception] = None
+        for attempt, backend in enumerate(candidates):
+            if attempt:
+                self._fallbacks += 1
+                print(f"Falling back to the {backend.name} backend")
+            try:
+                return await self._hedged_call(backend, params)
+            except Exception as e:
+                print(f"Backend {backend.name} failed: {e!r}")
+                error = error or e
+        raise error
+
+    async def _hedged_call(
+        self, backend: ChatBackend, params: dict
+    ) -> tuple[ChatBackend, Any]:
+        if (
+            self.hedge is None
+            or self.hedge is backend
+            or not self.hedge.health.available
+        ):
+            return backend, await self._call(backend, params)
+
+        primary = asyncio.create_task(self._call(backend, params))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done:
+                self._hedged += 1
+                print(
+                    f"{backend.name} has not answered in {self.hedge_after}s, "
+                    f"asking {self.hedge.name} as well"
+                )
+                tasks.add(asyncio.create_task(self._call(self.hedge, params)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._hedge_wins += 1
+                            return self.hedge, task.result()
+                        return backend, task.result()
+            # Both failed, report the error of the backend that was asked first
+            return backend, primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    async def _call(backend: ChatBackend, params: dict) -> Any:
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(backend.timeout):
+                response = await backend.create(**params)
+        except Exception:
+            backend.health.record_failure()
+            raise
+        backend.health.record_success(time.monotonic() - started)
+        return response
+
+    def stats(self) -> RouterStats:
+        backends = {backend.name: backend for backend in self.backends}
+        if self.hedge is not None:
+            backends.setdefault(self.hedge.name, self.hedge)
+        return RouterStats(
+            backends={
+                name: backend.health.stats() for name, backend in backends.items()
+            },
+            fallbacks=self._fallbacks,
+            hedged=self._hedged,
+            hedge_wins=self._hedge_wins,
+        )
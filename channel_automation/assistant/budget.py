@@ -0,0 +1,88 @@
+from typing import Callable, Optional
+
+import datetime
+from dataclasses import dataclass
+
+# USD per 1000 tokens (input, output)
+MODEL_PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-1106-preview": (0.01, 0.03),
+    "gpt-3.5-turbo": (0.001, 0.002),
+}
+
+
+def completion_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    input_price, output_price = MODEL_PRICES.get(model, MODEL_PRICES["gpt-4"])
+    return (input_tokens * input_price + output_tokens * output_price) / 1000
+
+
+@dataclass
+class BudgetStats:
+    day: str
+    tokens: int
+    cost: float
+    daily_tokens: Optional[int]
+    daily_cost: Optional[float]
+    rejected: int
+
+
+class DailyTokenBudget:
+    """
+    Tracks the tokens and the money spent on background generations per UTC
+    day. A limit of None means unlimited. The budget resets at midnight UTC.
+    """
+
+    def __init__(
+        self,
+        daily_tokens: Optional[int] = None,
+        daily_cost: Optional[float] = None,
+        today: Callable[[], datetime.date] = lambda: datetime.datetime.utcnow().date(),
+    ) -> None:
+        self.daily_tokens = daily_tokens
+        self.daily_cost = daily_cost
+        self.today = today
+        self._day = today()
+        self._tokens = 0
+        self._cost = 0.0
+        self._rejected = 0
+
+    def _roll_over(self) -> None:
+        today = self.today()
+        if today != self._day:
+            self._day = today
+            self._tokens = 0
+            self._cost = 0.0
+
+    def allows(self, estimated_tokens: int = 0, model: str = "gpt-4") -> bool:
+        """
+        Checks whether a call of about ``estimated_tokens`` still fits into
+        today's budget. Counts a rejection if it does not.
+        """
+        self._roll_over()
+        fits = True
+        if self.daily_tokens is not None:
+            fits = self._tokens + estimated_tokens <= self.daily_tokens
+        if fits and self.daily_cost is not None:
+            estimated_cost = completion_cost(model, estimated_tokens, 0)
+            fits = self._cost + estimated_cost <= self.daily_cost
+        if not fits:
+            self._rejected += 1
+        return fits
+
+    def record(
+        self, input_tokens: int, output_tokens: int, model: str = "gpt-4"
+    ) -> None:
+        self._roll_over()
+        self._tokens += input_tokens + output_tokens
+        self._cost += completion_cost(model, input_tokens, output_tokens)
+
+    def stats(self) -> BudgetStats:
+        self._roll_over()
+        return BudgetStats(
+            day=self._day.isoformat(),
+            tokens=self._tokens,
+            cost=round(self._cost, 4),
+            daily_tokens=self.daily_tokens,
+            daily_cost=self.daily_cost,
+            rejected=self._rejected,
+        )
@@ -0,0 +1,144 @@
+from typing import Awaitable, Callable, Optional
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+# Called with the caller's position in the queue (1 is next), and with 0 once
+# a queued caller gets its slot
+PositionCallback = Callable[[int], Awaitable[None]]
+
+# Lower runs first; an admin waiting in the chat always goes before drafts
+# generated in the background
+INTERACTIVE = 0
+BACKGROUND = 10
+
+
+@dataclass
+class GovernorStats:
+    max_concurrent: int
+    active: int
+    waiting: int
+    completed: int
+    max_waiting: int
+
+
+@dataclass
+class _Waiter:
+    future: asyncio.Future
+    on_position: Optional[PositionCallback]
+    priority: int = INTERACTIVE
+
+
+class ConcurrencyGovernor:
+    """
+    Limits how many LLM calls run at once across the whole bot.
+
+    Callers beyond ``max_concurrent`` wait in FIFO order within their priority
+    and are told their position in the queue whenever it changes, so an admin
+    sees "you are #2" instead of a frozen chat. Interactive callers are queued
+    ahead of every background caller.
+    """
+
+    def __init__(self, max_concurrent: int = 2) -> None:
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be positive")
+        self.max_concurrent = max_concurrent
+        self._active = 0
+        self._waiters: deque[_Waiter] = deque()
+        self._completed = 0
+        self._max_waiting = 0
+        self._notifications: set[asyncio.Task] = set()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        on_position: Optional[PositionCallback] = None,
+        priority: int = INTERACTIVE,
+    ):
+        await self.acquire(on_position, priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(
+        self,
+        on_position: Optional[PositionCallback] = None,
+        priority: int = INTERACTIVE,
+    ) -> None:
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            return
+
+        waiter = _Waiter(
+            asyncio.get_running_loop().create_future(), on_position, priority
+        )
+        position = self._enqueue(waiter)
+        self._max_waiting = max(self._max_waiting, len(self._waiters))
+        # The callbacks send messages, the caller may be cancelled during any
+        # of them
+        try:
+            await self._notify(waiter, position)
+            if position < len(self._waiters):
+                # Jumped ahead of lower priority callers, they moved back
+                await self._notify_positions(list(self._waiters)[position:])
+            await waiter.future
+            await self._notify(waiter, 0)
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was already handed over
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+                await self._notify_positions(list(self._waiters))
+            raise
+
+    def _enqueue(self, waiter: _Waiter) -> int:
+        """Queues the waiter behind everyone with the same or a higher priority."""
+        index = len(self._waiters)
+        while index > 0 and self._waiters[index - 1].priority > waiter.priority:
+            index -= 1
+        self._waiters.insert(index, waiter)
+        return index + 1
+
+    def release(self) -> None:
+        self._completed += 1
+        if self._waiters:
+            # Hand the slot straight to the next waiter, _active stays the same
+            waiter = self._waiters.popleft()
+            waiter.future.set_result(None)
+            task = asyncio.get_running_loop().create_task(
+                self._notify_positions(list(self._waiters))
+            )
+            self._notifications.add(task)
+            task.add_done_callback(self._notifications.discard)
+        else:
+            self._active -= 1
+
+    async def _notify_positions(self, waiters: list[_Waiter]) -> None:
+        # A waiter may get its slot while earlier ones are still being notified
+        for waiter in waiters:
+            if waiter.future.done() or waiter not in self._waiters:
+                continue
+            await self._notify(waiter, self._waiters.index(waiter) + 1)
+
+    @staticmethod
+    async def _notify(waiter: _Waiter, position: int) -> None:
+        if waiter.on_position is None:
+            return
+        try:
+            await waiter.on_position(position)
+        except Exception as e:
+            # Reporting the position must never cost the caller its slot
+            print(f"Error reporting queue position: {e}")
+
+    def stats(self) -> GovernorStats:
+        return GovernorStats(
+            max_concurrent=self.max_concurrent,
+            active=self._active,
+            waiting=len(self._waiters),
+            completed=self._completed,
+            max_waiting=self._max_waiting,
+        )
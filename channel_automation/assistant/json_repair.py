@@ -0,0 +1,131 @@
+from typing import Any
+
+import json
+import re
+from dataclasses import dataclass
+
+_CODE_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL)
+_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_CLOSING = {"{": "}", "[": "]"}
+
+
+class JSONRepairError(ValueError):
+    pass
+
+
+def repair_json(text: str) -> str:
+    """
+    Turns almost-JSON from a language model into valid JSON.
+
+    Handles the mistakes GPT actually makes: code fences and chatter around
+    the object, raw newlines and tabs inside strings, trailing commas and an
+    answer cut off by the token limit (open strings, objects and arrays are
+    closed). The text is scanned once, keeping track of strings and nesting.
+
+    >>> repair_json('Sure! {"a": "line\\none", "b": [1, 2,],}')
+    '{"a": "line\\\\none", "b": [1, 2]}'
+    """
+    fenced = _CODE_FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find("{")
+    if start == -1:
+        raise JSONRepairError("No JSON object found")
+
+    output: list[str] = []
+    stack: list[str] = []
+    in_string = False
+    escaped = False
+    for char in text[start:]:
+        if in_string:
+            if escaped:
+                escaped = False
+                output.append(char)
+            elif char == "\\":
+                escaped = True
+                output.append(char)
+            elif char == '"':
+                in_string = False
+                output.append(char)
+            else:
+                output.append(_ESCAPES.get(char, char))
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in _CLOSING:
+            stack.append(_CLOSING[char])
+        elif char in "}]":
+            _drop_trailing_comma(output)
+            if not stack or stack[-1] != char:
+                raise JSONRepairError(f"Unexpected '{char}'")
+            stack.pop()
+            output.append(char)
+            if not stack:
+                break  # anything after the object is chatter
+            continue
+        output.append(char)
+
+    if escaped:
+        output.pop()
+    if in_string:
+        output.append('"')
+    while stack:
+        _drop_trailing_comma(output)
+        output.append(stack.pop())
+    return "".join(output)
+
+
+def _drop_trailing_comma(output: list[str]) -> None:
+    index = len(output) - 1
+    while index >= 0 and output[index].isspace():
+        index -= 1
+    if index >= 0 and output[index] == ",":
+        del output[index]
+
+
+@dataclass
+class ParseStats:
+    parsed: int = 0
+    failures: int = 0  # answers that were not valid JSON
+    repaired: int = 0  # of those, fixed locally
+    unrepairable: int = 0
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failures / self.parsed if self.parsed else 0.0
+
+    @property
+    def repair_rate(self) -> float:
+        return self.repaired / self.failures if self.failures else 0.0
+
+
+class TolerantJSONParser:
+    """
+    Parses JSON answers, repairing them when they are malformed, and counts
+    how often that was needed.
+    """
+
+    def __init__(self) -> None:
+        self._stats = ParseStats()
+
+    def loads(self, text: str) -> Any:
+        self._stats.parsed += 1
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            self._stats.failures += 1
+            error = e
+
+        try:
+            value = json.loads(repair_json(text))
+        except ValueError:
+            self._stats.unrepairable += 1
+            print(f"Could not repair JSON ({error}): {text}")
+            raise ValueError(f"Invalid JSON format: {error}")
+        self._stats.repaired += 1
+        print(f"Repaired malformed JSON ({error}), {self.stats()}")
+        return value
+
+    def stats(self) -> ParseStats:
+        return ParseStats(**self._stats.__dict__)
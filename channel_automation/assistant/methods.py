@@ -1,11 +1,28 @@
+from typing import Awaitable, Callable, Optional
+
+import asyncio
+import hashlib
 import json
 
 import openai
 
 from alembic.op import f
-from channel_automation.assistant.models import PostData
-from channel_automation.interfaces.assistant_interface import IAssistant
+from channel_automation.assistant.backends import BackendRouter, ChatBackend
+from channel_automation.assistant.governor import (
+    INTERACTIVE,
+    ConcurrencyGovernor,
+    PositionCallback,
+)
+from channel_automation.assistant.json_repair import TolerantJSONParser, repair_json
+from channel_automation.assistant.models import AssistantStats, Completion, PostData
+from channel_automation.assistant.prompt_budget import PromptBudget
+from channel_automation.interfaces.assistant_interface import (
+    IAssistant,
+    IAsyncAssistant,
+)
+from channel_automation.interfaces.completion_cache_interface import ICompletionCache
 from channel_automation.models import NewsArticle, Post
+from channel_automation.services.http_client import HTTPClientManager
 
 template1 = """
 You are an assistant responsible for creating social media posts based on newspaper articles. Here are your two tasks:
@@ -109,64 +126,273 @@ Your ultimate goal is to generate a social post that adheres to the user's guide
 """
 
 
-def get_completion(prompt, template):
-    messages = [
+COMPLETION_PARAMS = {
+    "model": "gpt-4",
+    "temperature": 0.51,
+    "max_tokens": 2261,
+    "top_p": 0,
+    "frequency_penalty": 0,
+    "presence_penalty": 0,
+}
+
+
+# Post templates answer through this function, so the model returns arguments
+# that follow the schema instead of free-form text around a JSON object
+POST_FUNCTION = {
+    "name": "create_social_post",
+    "description": "Create a social media post for a newspaper article.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "social_post": {
+                "type": "string",
+                "description": "The social post in Russian, Telegram Markdown.",
+            },
+            "images_search": {
+                "type": "string",
+                "description": "An English Google search query for images.",
+            },
+        },
+        "required": ["social_post", "images_search"],
+    },
+}
+POST_FUNCTION_PARAMS = {
+    "functions": [POST_FUNCTION],
+    "function_call": {"name": POST_FUNCTION["name"]},
+}
+# Room for the answer of every requested variation
+MAX_TOKENS_PER_VARIATION = 1000
+
+
+def variations_template(variation_numbers: list[int]) -> str:
+    """
+    Combines the templates of several variations into one system prompt, so
+    the article is sent and read once for all of them.
+    """
+    sections = [
+        f"### Variation {number}\n{templates[number].strip()}"
+        for number in variation_numbers
+    ]
+    return (
+        "You will write several variations of a social media post for the same "
+        "article. Follow the instructions of each variation separately and "
+        "return all of them at once.\n\n" + "\n\n".join(sections)
+    )
+
+
+def variations_function_params(variation_numbers: list[int]) -> dict:
+    post_schema = POST_FUNCTION["parameters"]
+    function = {
+        "name": "create_social_post_variations",
+        "description": "Create one social media post per variation.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                f"variation_{number}": {
+                    **post_schema,
+                    "description": f"The post written by the Variation {number} rules.",
+                }
+                for number in variation_numbers
+            },
+            "required": [f"variation_{number}" for number in variation_numbers],
+        },
+    }
+    return {
+        "functions": [function],
+        "function_call": {"name": function["name"]},
+        "max_tokens": max(
+            COMPLETION_PARAMS["max_tokens"],
+            MAX_TOKENS_PER_VARIATION * len(variation_numbers),
+        ),
+    }
+
+
+def parse_variations(
+    json_text: str,
+    variation_numbers: list[int],
+    parser: Optional[TolerantJSONParser] = None,
+) -> dict[int, PostData]:
+    json_data = (parser or post_data_parser).loads(json_text)
+    variations = {}
+    for number in variation_numbers:
+        try:
+            variation = json_data[f"variation_{number}"]
+            variations[number] = PostData(
+                social_post=variation["social_post"],
+                images_search=variation.get("images_search") or "",
+            )
+        except (KeyError, TypeError, AttributeError) as e:
+            # Keep the variations that did come back
+            print(f"Variation {number} is missing from the answer: {e}")
+    if not variations:
+        raise ValueError("No variations in the answer.")
+    return variations
+
+
+def posts_from_variations(
+    variations: dict[int, PostData], completion: Completion
+) -> dict[int, Post]:
+    # Usage is reported for the whole call, split it between the drafts
+    count = len(variations)
+    return {
+        number: Post(
+            social_post=post_data.social_post,
+            images_search=post_data.images_search,
+            input_tokens=completion.input_tokens // count,
+            output_tokens=completion.output_tokens // count,
+        )
+        for number, post_data in variations.items()
+    }
+
+
+# Counts parse failures and repairs of the sync Assistant
+post_data_parser = TolerantJSONParser()
+
+
+# Called with the whole answer received so far while it is streamed
+ProgressCallback = Callable[[str], Awaitable[None]]
+
+
+def partial_post_text(arguments: str) -> str:
+    """
+    Returns the part of the social post that has already arrived in a
+    streamed, still incomplete function call.
+    """
+    try:
+        return json.loads(repair_json(arguments)).get("social_post") or ""
+    except (ValueError, AttributeError):
+        return ""
+
+
+def completion_cache_key(source: str, template: str, params: dict) -> str:
+    """
+    Hashes everything that decides the answer. ``source`` is the prompt, or
+    the article fingerprint so that syndicated copies of a story share it.
+    """
+    payload = json.dumps(
+        {"source": source, "template": template, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def article_cache_source(news_article: NewsArticle, article_text: str) -> str:
+    if news_article.fingerprint:
+        return f"fingerprint:{news_article.fingerprint}"
+    return article_text
+
+
+def budget_article_prompt(
+    prompt_budget: PromptBudget, news_article: NewsArticle
+) -> str:
+    budgeted = prompt_budget.fit(news_article.title, news_article.text)
+    if budgeted.trimmed:
+        print(
+            f"Trimmed {news_article.source} from {budgeted.original_tokens} "
+            f"to {budgeted.tokens} tokens, "
+            f"dropped {budgeted.dropped_paragraphs} paragraphs"
+        )
+    return budgeted.text
+
+
+def build_messages(prompt, template):
+    return [
         {"role": "system", "content": template},
         {"role": "user", "content": prompt},
     ]
+
+
+def get_completion(prompt, template, function_params=None):
     response = openai.ChatCompletion.create(
-        model="gpt-4",
-        messages=messages,
-        temperature=0.51,
-        max_tokens=2261,
-        top_p=0,
-        frequency_penalty=0,
-        presence_penalty=0,
+        messages=build_messages(prompt, template),
+        **{**COMPLETION_PARAMS, **(function_params or {})},
     )
+    return completion_content(response)
+
+
+def get_completion_with_usage(prompt, template, function_params=None) -> Completion:
+    response = openai.ChatCompletion.create(
+        messages=build_messages(prompt, template),
+        **{**COMPLETION_PARAMS, **(function_params or {})},
+    )
+    usage = response.get("usage") or {}
+    return Completion(
+        content=completion_content(response),
+        input_tokens=usage.get("prompt_tokens", 0),
+        output_tokens=usage.get("completion_tokens", 0),
+    )
+
+
+def completion_content(response) -> str:
     if "choices" not in response or not response.choices:
         raise ValueError("No choices in response.")
 
     first_choice = response.choices[0]
+    function_call = first_choice.get("message", {}).get("function_call")
+    if function_call:
+        return function_call["arguments"]
     if "message" not in first_choice or "content" not in first_choice.message:
         raise ValueError("Missing 'message' or 'content' in the first choice.")
 
     return first_choice.message["content"]
 
 
-def parse_json_to_dataclass(json_text: str) -> PostData:
-    # Escape newlines and tabs
-    escaped_json_text = json_text.replace("\n", "\\n").replace("\t", "\\t")
-    # Remove the trailing '\\n' if it exists
-    if escaped_json_text.endswith("\\n"):
-        escaped_json_text = escaped_json_text[:-2]
+def parse_json_to_dataclass(
+    json_text: str, parser: TolerantJSONParser = post_data_parser
+) -> PostData:
+    # Malformed answers are repaired locally instead of regenerating them
+    json_data = parser.loads(json_text)
     try:
-        json_data = json.loads(escaped_json_text)
-        return PostData(**json_data)
-    except json.JSONDecodeError as e:
-        print(f"JSON text: {escaped_json_text}")
-        raise ValueError(f"Invalid JSON format: {e}")
+        return PostData(
+            social_post=json_data["social_post"],
+            images_search=json_data.get("images_search") or "",
+        )
+    except (KeyError, TypeError) as e:
+        print(f"JSON text: {json_text}")
+        raise ValueError(f"Missing post field: {e}")
 
 
 class Assistant(IAssistant):
-    def __init__(self, api_token: str):
+    def __init__(self, api_token: str, prompt_budget: Optional[PromptBudget] = None):
         openai.api_key = api_token
-        pass
+        self.prompt_budget = prompt_budget or PromptBudget()
+
+    def article_prompt(self, news_article: NewsArticle) -> str:
+        return budget_article_prompt(self.prompt_budget, news_article)
 
     def generate_post(self, news_article: NewsArticle, variation_number: int) -> Post:
         try:
-            article_text = f"{news_article.title}\n\n{news_article.text}"
+            article_text = self.article_prompt(news_article)
             chosen_template = templates.get(variation_number, template1)
-            result_json = get_completion(article_text, chosen_template)
-            post_data = parse_json_to_dataclass(result_json)
+            completion = get_completion_with_usage(
+                article_text, chosen_template, POST_FUNCTION_PARAMS
+            )
+            post_data = parse_json_to_dataclass(completion.content)
 
             return Post(
-                social_post=post_data.social_post, images_search=post_data.images_search
+                social_post=post_data.social_post,
+                images_search=post_data.images_search,
+                input_tokens=completion.input_tokens,
+                output_tokens=completion.output_tokens,
             )
         except Exception as e:
             print(e)
             # Optional: log the exception
             raise  # This will propagate the exception up a level
 
+    def generate_post_variations(
+        self, news_article: NewsArticle, variation_numbers: list[int]
+    ) -> dict[int, Post]:
+        article_text = self.article_prompt(news_article)
+        completion = get_completion_with_usage(
+            article_text,
+            variations_template(variation_numbers),
+            variations_function_params(variation_numbers),
+        )
+        variations = parse_variations(completion.content, variation_numbers)
+        return posts_from_variations(variations, completion)
+
     def make_post_fancy(self, post: Post) -> Post:
         prompt = f"Edit social post:\n{post.social_post}"
 
@@ -182,3 +408,278 @@ class Assistant(IAssistant):
         post.social_post = result
 
         return post
+
+
+class AsyncAssistant(IAsyncAssistant):
+    """
+    Assistant on the async OpenAI client, so a generation that takes a minute
+    does not block the bot's event loop.
+
+    All calls share one pooled HTTP session and a ConcurrencyGovernor: at most
+    ``max_concurrent`` completions run at once, the rest wait in line and are
+    told their position. Every call is cancelled after ``timeout`` seconds.
+
+    Requests go through a BackendRouter, by default to OpenAI with
+    ``api_token``; pass a ``router`` to use other or several providers.
+
+    With a ``cache`` answers are reused for identical requests unless the
+    caller passes ``use_cache=False``; the fresh answer then replaces the
+    stored one.
+    """
+
+    def __init__(
+        self,
+        api_token: str,
+        max_concurrent: int = 2,
+        timeout: float = 120.0,
+        prompt_budget: Optional[PromptBudget] = None,
+        cache: Optional[ICompletionCache] = None,
+        router: Optional[BackendRouter] = None,
+    ) -> None:
+        self.timeout = timeout
+        self.cache = cache
+        self.router = router or BackendRouter(
+            [
+                ChatBackend(
+                    "openai", COMPLETION_PARAMS["model"], api_token, timeout=timeout
+                )
+            ]
+        )
+        self.prompt_budget = prompt_budget or PromptBudget()
+        self.governor = ConcurrencyGovernor(max_concurrent)
+        self.parser = TolerantJSONParser()
+        self.http_client = HTTPClientManager(
+            limit=max_concurrent * 2, limit_per_host=max_concurrent * 2
+        )
+
+    def article_prompt(self, news_article: NewsArticle) -> str:
+        return budget_article_prompt(self.prompt_budget, news_article)
+
+    async def get_completion(
+        self,
+        prompt: str,
+        template: str,
+        on_queued: Optional[PositionCallback] = None,
+        priority: int = INTERACTIVE,
+        function_params: Optional[dict] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        use_cache: bool = True,
+        cache_source: Optional[str] = None,
+    ) -> Completion:
+        """
+        Runs a completion once the governor gives it a slot. With
+        ``on_progress`` the answer is streamed and the callback gets the text
+        received so far after every chunk.
+
+        Cached answers are returned without waiting for a slot. They are
+        looked up by ``cache_source`` (the prompt by default), the template
+        and the model parameters. Only answers of the primary backend's model
+        are cached, not those of a fallback or the hedge.
+        """
+        params = {**COMPLETION_PARAMS, **(function_params or {})}
+        primary_model = self.router.primary.model
+        cache_key = None
+        if self.cache is not None:
+            cache_key = completion_cache_key(
+                cache_source or prompt, template, {**params, "model": primary_model}
+            )
+            cached = await self.cache.get(cache_key) if use_cache else None
+            if cached is not None:
+                print(
+                    f"Completion cache hit, saved "
+                    f"{cached.input_tokens + cached.output_tokens} tokens"
+                )
+                if on_progress is not None:
+                    await on_progress(cached.content)
+                return Completion(content=cached.content, cached=True)
+
+        async with self.governor.slot(on_queued, priority):
+            # openai reads the session from a context variable, so setting it
+            # here only affects this call
+            openai.aiosession.set(await self.http_client.get_session())
+            # Every backend has its own timeout and the router falls back
+            # to the next one
+            backend, response = await self.router.create_with_backend(
+                messages=build_messages(prompt, template),
+                stream=on_progress is not None,
+                **params,
+            )
+            if on_progress is None:
+                content = completion_content(response)
+                usage = response.get("usage") or {}
+            else:
+                async with asyncio.timeout(self.timeout):
+                    content = await self._read_stream(response, on_progress)
+                usage = {}  # streamed answers come without usage
+        counter = self.prompt_budget.counter
+        completion = Completion(
+            content=content,
+            # Counted locally if the response has no usage, e.g. a local server
+            input_tokens=usage.get("prompt_tokens")
+            or counter.count(template) + counter.count(prompt),
+            output_tokens=usage.get("completion_tokens") or counter.count(content),
+        )
+        if cache_key is not None and backend.model == primary_model:
+            await self.cache.set(cache_key, completion)
+        return completion
+
+    @staticmethod
+    async def _read_stream(response, on_progress: ProgressCallback) -> str:
+        parts = []
+        async for chunk in response:
+            if not chunk["choices"]:
+                continue
+            delta = chunk["choices"][0].get("delta", {})
+            function_call = delta.get("function_call") or {}
+            piece = delta.get("content") or function_call.get("arguments")
+            if not piece:
+                continue
+            parts.append(piece)
+            try:
+                await on_progress("".join(parts))
+            except Exception as e:
+                # A failed preview must not cost the whole answer
+                print(f"Error reporting completion progress: {e}")
+        return "".join(parts)
+
+    async def generate_post(
+        self,
+        news_article: NewsArticle,
+        variation_number: int,
+        on_queued: Optional[PositionCallback] = None,
+        priority: int = INTERACTIVE,
+        on_progress: Optional[ProgressCallback] = None,
+        use_cache: bool = True,
+    ) -> Post:
+        try:
+            article_text = self.article_prompt(news_article)
+            chosen_template = templates.get(variation_number, template1)
+
+            on_arguments = None
+            if on_progress is not None:
+
+                async def on_arguments(arguments: str) -> None:
+                    await on_progress(partial_post_text(arguments))
+
+            async def complete(use_cache: bool) -> Completion:
+                return await self.get_completion(
+                    article_text,
+                    chosen_template,
+                    on_queued,
+                    priority,
+                    function_params=POST_FUNCTION_PARAMS,
+                    on_progress=on_arguments,
+                    use_cache=use_cache,
+                    cache_source=article_cache_source(news_article, article_text),
+                )
+
+            completion = await complete(use_cache)
+            try:
+                post_data = parse_json_to_dataclass(completion.content, self.parser)
+            except ValueError:
+                if not completion.cached:
+                    raise
+                # Replace the unusable cached answer instead of serving it again
+                completion = await complete(use_cache=False)
+                post_data = parse_json_to_dataclass(completion.content, self.parser)
+
+            return Post(
+                social_post=post_data.social_post,
+                images_search=post_data.images_search,
+                input_tokens=completion.input_tokens,
+                output_tokens=completion.output_tokens,
+            )
+        except Exception as e:
+            print(e)
+            raise
+
+    async def generate_post_variations(
+        self,
+        news_article: NewsArticle,
+        variation_numbers: list[int],
+        on_queued: Optional[PositionCallback] = None,
+        priority: int = INTERACTIVE,
+        use_cache: bool = True,
+    ) -> dict[int, Post]:
+        article_text = self.article_prompt(news_article)
+
+        async def complete(use_cache: bool) -> Completion:
+            return await self.get_completion(
+                article_text,
+                variations_template(variation_numbers),
+                on_queued,
+                priority,
+                function_params=variations_function_params(variation_numbers),
+                use_cache=use_cache,
+                cache_source=article_cache_source(news_article, article_text),
+            )
+
+        completion = await complete(use_cache)
+        try:
+            variations = parse_variations(
+                completion.content, variation_numbers, self.parser
+            )
+        except ValueError:
+            if not completion.cached:
+                raise
+            completion = await complete(use_cache=False)
+            variations = parse_variations(
+                completion.content, variation_numbers, self.parser
+            )
+        return posts_from_variations(variations, completion)
+
+    async def make_post_fancy(
+        self,
+        post: Post,
+        on_queued: Optional[PositionCallback] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        use_cache: bool = True,
+    ) -> Post:
+        prompt = f"Edit social post:\n{post.social_post}"
+
+        completion = await self.get_completion(
+            prompt,
+            template_fancier,
+            on_queued,
+            on_progress=on_progress,
+            use_cache=use_cache,
+        )
+        post.social_post = completion.content
+        post.input_tokens = completion.input_tokens
+        post.output_tokens = completion.output_tokens
+
+        return post
+
+    async def post_guidence(
+        self,
+        post: Post,
+        guidence: str,
+        on_queued: Optional[PositionCallback] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        use_cache: bool = True,
+    ) -> Post:
+        prompt = f"Guidence:\n{guidence}\n\nSocial post:\n{post.social_post}"
+
+        completion = await self.get_completion(
+            prompt,
+            template_guidence,
+            on_queued,
+            on_progress=on_progress,
+            use_cache=use_cache,
+        )
+        post.social_post = completion.content
+        post.input_tokens = completion.input_tokens
+        post.output_tokens = completion.output_tokens
+
+        return post
+
+    def stats(self) -> AssistantStats:
+        return AssistantStats(
+            governor=self.governor.stats(),
+            parsing=self.parser.stats(),
+            cache=self.cache.stats() if self.cache is not None else None,
+            backends=self.router.stats(),
+        )
+
+    async def close(self) -> None:
+        await self.http_client.close()
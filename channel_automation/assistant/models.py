@@ -1,5 +1,29 @@
+from typing import Optional
+
 from dataclasses import dataclass
 
+from channel_automation.assistant.backends import RouterStats
+from channel_automation.assistant.governor import GovernorStats
+from channel_automation.assistant.json_repair import ParseStats
+from channel_automation.cache import CacheStats
+
+
+@dataclass
+class Completion:
+    content: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    # Served from the completion cache, nothing was spent on it
+    cached: bool = False
+
+
+@dataclass
+class AssistantStats:
+    governor: GovernorStats
+    parsing: ParseStats
+    cache: Optional[CacheStats] = None
+    backends: Optional[RouterStats] = None
+
 
 @dataclass
 class PostData:
@@ -0,0 +1,147 @@
+from typing import Optional
+
+import re
+from dataclasses import dataclass
+
+try:
+    import tiktoken
+except ImportError:  # the estimate below is good enough to budget with
+    tiktoken = None
+
+# Paragraphs that news sites put around the article itself
+BOILERPLATE_PATTERNS = [
+    r"^(read|see) (more|also)\b",
+    r"^related( articles| stories| news)?\s*:",
+    r"\b(subscribe|sign up) (to|for) (our|the)\b",
+    r"^follow us\b",
+    r"^share (this|on)\b",
+    r"^click here\b",
+    r"^advertisement$",
+    r"\ball rights reserved\b",
+    r"^(©|copyright\b)",
+    r"\bcookies?\b.*\b(accept|consent|policy)\b",
+    r"^(photo|image|source)\s*:",
+    r"^(читайте также|подписывайтесь|реклама)\b",
+]
+_BOILERPLATE = re.compile("|".join(BOILERPLATE_PATTERNS), re.IGNORECASE)
+
+
+class TokenCounter:
+    """
+    Counts tokens the way the model does, using tiktoken when it and its
+    encoding files are available, and a character based estimate otherwise.
+    """
+
+    def __init__(self, model: str = "gpt-4", use_tiktoken: bool = True) -> None:
+        self.model = model
+        self._encoding = None
+        self._loaded = not use_tiktoken
+
+    def load(self) -> None:
+        """
+        Loads the encoding. tiktoken downloads it on first use, so call this
+        at startup rather than from within the event loop.
+        """
+        if self._loaded:
+            return
+        self._loaded = True
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(self.model)
+            except Exception as e:
+                print(f"Falling back to estimated token counts: {e}")
+
+    @property
+    def encoding(self):
+        self.load()
+        return self._encoding
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return self.estimate(text)
+
+    @staticmethod
+    def estimate(text: str) -> int:
+        # About four characters per token in English and two in Russian
+        ascii_chars = sum(1 for char in text if ord(char) < 128)
+        return (ascii_chars + 3) // 4 + (len(text) - ascii_chars + 1) // 2
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text)[:max_tokens])
+        end = len(text)
+        while end > 0 and self.estimate(text[:end]) > max_tokens:
+            end = end * max_tokens // max(self.estimate(text[:end]), 1)
+        return text[:end]
+
+
+@dataclass
+class BudgetedPrompt:
+    text: str
+    tokens: int
+    original_tokens: int
+    dropped_paragraphs: int
+
+    @property
+    def trimmed(self) -> bool:
+        return self.tokens < self.original_tokens
+
+
+class PromptBudget:
+    """
+    Fits an article into at most ``max_input_tokens`` prompt tokens.
+
+    Boilerplate and repeated paragraphs are dropped first. News is written
+    lead first, so the remaining paragraphs are then kept from the top until
+    the budget is reached; a lead paragraph that alone is too long is cut.
+    """
+
+    def __init__(
+        self, max_input_tokens: int = 3000, counter: Optional[TokenCounter] = None
+    ) -> None:
+        self.max_input_tokens = max_input_tokens
+        self.counter = counter or TokenCounter()
+
+    def fit(self, title: str, text: str) -> BudgetedPrompt:
+        original = f"{title}\n\n{text}"
+        original_tokens = self.counter.count(original)
+        if original_tokens <= self.max_input_tokens:
+            return BudgetedPrompt(original, original_tokens, original_tokens, 0)
+
+        paragraphs = [
+            paragraph.strip() for paragraph in re.split(r"\n\s*\n|\n", text or "")
+        ]
+        content = []
+        seen = set()
+        for paragraph in paragraphs:
+            if not paragraph or paragraph in seen or _BOILERPLATE.search(paragraph):
+                continue
+            seen.add(paragraph)
+            content.append(paragraph)
+
+        kept = [title]
+        used = self.counter.count(title)
+        for paragraph in content:
+            # Paragraphs are joined with a blank line, about one token
+            tokens = self.counter.count(paragraph) + 1
+            if used + tokens > self.max_input_tokens:
+                if len(kept) == 1:
+                    remaining = self.max_input_tokens - used - 1
+                    kept.append(self.counter.truncate(paragraph, remaining))
+                break
+            kept.append(paragraph)
+            used += tokens
+
+        budgeted = "\n\n".join(kept)
+        return BudgetedPrompt(
+            text=budgeted,
+            tokens=self.counter.count(budgeted),
+            original_tokens=original_tokens,
+            dropped_paragraphs=sum(1 for paragraph in paragraphs if paragraph)
+            - (len(kept) - 1),
+        )
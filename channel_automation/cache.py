@@ -0,0 +1,118 @@
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    entries: int
+    size: int
+    max_entries: int
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class TTLCache(Generic[V]):
+    """
+    An in-process LRU cache whose entries expire after ``ttl`` seconds.
+
+    The cache is bounded both by the number of entries and by their total size
+    as reported by ``sizeof`` (1 per entry by default). The least recently used
+    entries are evicted first when either bound is exceeded. Not thread-safe;
+    meant to be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = 300.0,
+        max_size: Optional[int] = None,
+        sizeof: Optional[Callable[[V], int]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_size = max_size
+        self.sizeof = sizeof or (lambda value: 1)
+        self.clock = clock
+        # key -> (expires_at, size, value)
+        self._entries: OrderedDict[Hashable, tuple[float, int, V]] = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        expires_at, _, value = entry
+        if expires_at <= self.clock():
+            self._remove(key)
+            self._expirations += 1
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        size = self.sizeof(value)
+        if self.max_size is not None and size > self.max_size:
+            # Would evict everything else and still not fit
+            self.invalidate(key)
+            return
+        self.invalidate(key)
+        self._entries[key] = (self.clock() + self.ttl, size, value)
+        self._size += size
+        while len(self._entries) > self.max_entries or (
+            self.max_size is not None and self._size > self.max_size
+        ):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self._evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > self.clock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            entries=len(self._entries),
+            size=self._size,
+            max_entries=self.max_entries,
+            max_size=self.max_size or 0,
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            expirations=self._expirations,
+        )
@@ -0,0 +1,116 @@
+from typing import Optional, Sequence
+
+import copy
+
+from channel_automation.cache import CacheStats, TTLCache
+from channel_automation.interfaces.es_repository_interface import IAsyncESRepository
+from channel_automation.models import ArticlePage, NewsArticle, Post
+
+
+def estimate_article_size(news_article: NewsArticle) -> int:
+    """
+    Roughly estimates the memory an article takes in bytes. Only the text
+    fields count, they dominate the size of an article.
+    """
+    size = 512  # the dataclass and its small fields
+    for value in news_article.__dict__.values():
+        if isinstance(value, str):
+            size += len(value)
+    for post in news_article.posts or []:
+        size += 256 + len(post.social_post or "") + len(post.images_search or "")
+        size += sum(len(item) for item in post.images_id + post.images_url)
+    return size
+
+
+class CachedESRepository(IAsyncESRepository):
+    """
+    Read-through cache for news articles in front of another repository.
+
+    A single button press in the bot reads the same article several times, so
+    ``get_news_article_by_id`` is served from an LRU cache with a TTL and a
+    memory budget. Every write through this repository refreshes or drops the
+    cached entry. Callers always get their own copy of the article, so changes
+    they make locally never leak into the cache.
+    """
+
+    def __init__(
+        self,
+        repository: IAsyncESRepository,
+        max_entries: int = 512,
+        ttl: float = 300.0,
+        max_bytes: int = 32 * 1024 * 1024,
+    ) -> None:
+        self.repository = repository
+        self.cache: TTLCache[NewsArticle] = TTLCache(
+            max_entries=max_entries,
+            ttl=ttl,
+            max_size=max_bytes,
+            sizeof=estimate_article_size,
+        )
+
+    async def connect(self) -> None:
+        await self.repository.connect()
+
+    async def close(self) -> None:
+        self.cache.clear()
+        await self.repository.close()
+
+    def _remember(self, news_article: NewsArticle) -> None:
+        if news_article.id:
+            self.cache.set(news_article.id, copy.deepcopy(news_article))
+
+    async def bulk_create_news_articles(
+        self, news_articles: list[NewsArticle]
+    ) -> dict[str, int]:
+        return await self.repository.bulk_create_news_articles(news_articles)
+
+    async def existing_sources(self, sources: list[str]) -> set[str]:
+        return await self.repository.existing_sources(sources)
+
+    async def list_latest_articles(
+        self,
+        size: int = 10,
+        fields: Optional[Sequence[str]] = None,
+        cursor: Optional[str] = None,
+    ) -> ArticlePage:
+        return await self.repository.list_latest_articles(size, fields, cursor)
+
+    async def append_post(self, news_article: NewsArticle, post: Post) -> int:
+        return await self.append_posts(news_article, [post])
+
+    async def append_posts(self, news_article: NewsArticle, posts: list[Post]) -> int:
+        self.cache.invalidate(news_article.id)
+        post_index = await self.repository.append_posts(news_article, posts)
+        self._remember(news_article)
+        return post_index
+
+    async def set_post_images(
+        self,
+        news_article: NewsArticle,
+        post_index: int,
+        images_id: Optional[list[str]] = None,
+        images_url: Optional[list[str]] = None,
+    ) -> None:
+        self.cache.invalidate(news_article.id)
+        await self.repository.set_post_images(
+            news_article, post_index, images_id, images_url
+        )
+        self._remember(news_article)
+
+    async def get_news_article_by_id(self, article_id: str) -> Optional[NewsArticle]:
+        cached_article = self.cache.get(article_id)
+        if cached_article is not None:
+            return copy.deepcopy(cached_article)
+
+        news_article = await self.repository.get_news_article_by_id(article_id)
+        if news_article is not None:
+            self._remember(news_article)
+        stats = self.cache.stats()
+        print(
+            f"Article cache miss for {article_id}: {stats.hits} hits, "
+            f"{stats.misses} misses, {stats.entries} entries, {stats.size} bytes"
+        )
+        return news_article
+
+    def stats(self) -> CacheStats:
+        return self.cache.stats()
@@ -0,0 +1,65 @@
+import base64
+import hashlib
+
+# Readers and writers always go through the alias; the concrete index behind it
+# is versioned so the mapping can evolve through a reindex.
+NEWS_INDEX_ALIAS = "news"
+NEWS_MAPPING_VERSION = 1
+
+NEWS_INDEX_SETTINGS = {
+    "number_of_shards": 1,
+    "number_of_replicas": 0,  # single node, replicas would never be allocated
+    "codec": "best_compression",
+}
+
+_not_indexed_text = {"type": "text", "index": False, "norms": False}
+_not_indexed_keyword = {"type": "keyword", "index": False, "doc_values": False}
+
+NEWS_MAPPINGS = {
+    # Unknown fields are kept in _source but are not indexed
+    "dynamic": False,
+    "properties": {
+        "id": {"type": "keyword"},
+        "title": {"type": "text"},
+        "author": {"type": "text"},
+        "hostname": {"type": "keyword"},
+        "date": {
+            "type": "date",
+            "format": "strict_date_optional_time||yyyy-MM-dd||epoch_millis",
+            "ignore_malformed": True,
+        },
+        "categories": {"type": "keyword", "ignore_above": 256},
+        "tags": {"type": "keyword", "ignore_above": 256},
+        "fingerprint": {"type": "keyword"},
+        "license": _not_indexed_keyword,
+        "comments": _not_indexed_text,
+        "raw_text": _not_indexed_text,
+        "text": {"type": "text"},
+        "language": {"type": "keyword"},
+        "source": {"type": "keyword"},
+        "source_hostname": {"type": "keyword"},
+        "excerpt": {"type": "text"},
+        "posts": {"type": "object", "enabled": False},
+        "images_url": _not_indexed_keyword,
+        "russian_abstract": _not_indexed_text,
+        "images_search": _not_indexed_text,
+    },
+}
+
+
+def versioned_index_name(version: int = NEWS_MAPPING_VERSION) -> str:
+    return f"{NEWS_INDEX_ALIAS}_v{version}"
+
+
+def document_id(source: str) -> str:
+    """
+    Returns a deterministic document ID for an article source URL.
+
+    The ID is 20 characters long, like the IDs Elasticsearch generates, so it
+    still fits into Telegram's 64 byte callback data.
+
+    >>> document_id("https://example.com/news/1")
+    'wmGEijKpqccdyrIgO9V1'
+    """
+    digest = hashlib.blake2b(source.encode("utf-8"), digest_size=15).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii")
@@ -1,17 +1,118 @@
-from typing import Any, Optional
+from typing import Any, Optional, Sequence
 
+import asyncio
 import copy
 import time
+from dataclasses import fields
 
-from elasticsearch import Elasticsearch
+from elasticsearch import AsyncElasticsearch, ConflictError, Elasticsearch, helpers
 
-from channel_automation.interfaces.es_repository_interface import IESRepository
-from channel_automation.models import NewsArticle, Post
+from channel_automation.data_access.elasticsearch.mapping import (
+    NEWS_INDEX_ALIAS,
+    NEWS_INDEX_SETTINGS,
+    NEWS_MAPPINGS,
+    document_id,
+    versioned_index_name,
+)
+from channel_automation.interfaces.es_repository_interface import (
+    IAsyncESRepository,
+    IESRepository,
+)
+from channel_automation.models import ArticlePage, ArticleSummary, NewsArticle, Post
+
+# Fields fetched for listings, everything else stays in Elasticsearch
+SUMMARY_FIELDS = tuple(
+    field.name for field in fields(ArticleSummary) if field.name != "id"
+)
+
+
+def news_article_to_document(news_article: NewsArticle) -> dict[str, Any]:
+    document = {
+        field.name: copy.deepcopy(getattr(news_article, field.name))
+        for field in fields(NewsArticle)
+        if field.metadata.get("persist", True)
+    }
+    # Convert Post objects to dictionaries
+    document["posts"] = [
+        post.__dict__ if isinstance(post, Post) else post
+        for post in document.get("posts") or []
+    ]
+    return document
+
+
+def news_article_from_document(
+    doc_id: str,
+    source: dict[str, Any],
+    seq_no: Optional[int] = None,
+    primary_term: Optional[int] = None,
+) -> NewsArticle:
+    source["id"] = doc_id
+    source["seq_no"] = seq_no
+    source["primary_term"] = primary_term
+    # Convert list of dictionaries to list of Post objects
+    if "posts" in source and isinstance(source["posts"], list):
+        source["posts"] = [Post(**post_data) for post_data in source["posts"]]
+    else:
+        source["posts"] = []
+    return NewsArticle(**source)
+
+
+def latest_articles_search(
+    size: int,
+    fields: Optional[Sequence[str]] = None,
+    cursor: Optional[str] = None,
+    legacy_index: bool = False,
+) -> dict[str, Any]:
+    """
+    Builds the search arguments for a page of the newest articles, projected to
+    ``fields``. Pages are chained with search_after on the date and the ID.
+    """
+    if fields is None:
+        fields = SUMMARY_FIELDS
+    unknown_fields = set(fields) - set(SUMMARY_FIELDS)
+    if unknown_fields:
+        raise ValueError(f"Fields {sorted(unknown_fields)} are not part of a summary")
+
+    # The legacy index has no keyword ID to break ties on
+    sort: list[dict[str, Any]] = [{"date": {"order": "desc", "missing": "_last"}}]
+    if not legacy_index:
+        sort.append({"id": {"order": "desc"}})
+
+    search: dict[str, Any] = {
+        "size": size,
+        "query": {"match_all": {}},
+        "sort": sort,
+        "source_includes": list(fields),
+        "track_total_hits": False,
+    }
+    if cursor:
+        date, _, article_id = cursor.partition(":")
+        search["search_after"] = [int(date), article_id] if article_id else [int(date)]
+    return search
+
+
+def article_page_from_hits(hits: list[dict[str, Any]], size: int) -> ArticlePage:
+    articles = [
+        ArticleSummary(
+            id=hit["_id"],
+            title=hit["_source"].get("title", ""),
+            source=hit["_source"].get("source", ""),
+            date=hit["_source"].get("date"),
+            hostname=hit["_source"].get("hostname"),
+        )
+        for hit in hits
+    ]
+    next_cursor = None
+    if hits and len(hits) == size:
+        # The cursor goes into callback data, keep it short: "<millis>:<id>"
+        next_cursor = ":".join(str(value) for value in hits[-1]["sort"])
+    return ArticlePage(articles=articles, next_cursor=next_cursor)
 
 
 class ESRepository(IESRepository):
     def __init__(self, host: str, port: int, retries: int = 100, delay: int = 6):
-        self.index = "news"
+        self.index = NEWS_INDEX_ALIAS
+        self.legacy_index = False  # True until the old dynamic index is migrated
         self.es = self.init_elasticsearch(host, port, retries, delay)
 
     def init_elasticsearch(
@@ -25,13 +126,7 @@ class ESRepository(IESRepository):
                 )
                 if es.ping():
                     print("Elasticsearch connected.")
-
-                    # Check if index exists
-                    if not es.indices.exists(index=self.index):
-                        # Create index
-                        es.indices.create(index=self.index, ignore=400)
-                        print(f"Index '{self.index}' created.")
-
+                    self.ensure_index(es)
                     return es
                 else:
                     print("Elasticsearch connection failed.")
@@ -42,106 +137,331 @@ class ESRepository(IESRepository):
                 time.sleep(delay)
         return None
 
-    def article_exists(self, source: str) -> bool:
-        search_results = self.es.search(
-            index=self.index,
-            body={
-                "query": {"bool": {"filter": {"term": {"source.keyword": source}}}},
-                "size": 1,  # we only need to know if at least one article exists
-            },
+    def ensure_index(self, es: Elasticsearch) -> None:
+        target_index = versioned_index_name()
+        if not es.indices.exists(index=self.index):
+            es.indices.create(
+                index=target_index,
+                settings=NEWS_INDEX_SETTINGS,
+                mappings=NEWS_MAPPINGS,
+                aliases={self.index: {}},
+            )
+            print(f"Index '{target_index}' created with alias '{self.index}'.")
+            return
+
+        current_index = self.current_index(es)
+        self.legacy_index = current_index == self.index
+        if current_index != target_index:
+            print(
+                f"Index '{current_index}' uses an outdated mapping. "
+                "Run the 'migrate-es' command to reindex it into "
+                f"'{target_index}'."
+            )
+
+    def current_index(self, es: Optional[Elasticsearch] = None) -> str:
+        """
+        Returns the concrete index behind the alias, or the alias name itself
+        for the legacy index that was created without a mapping.
+        """
+        es = es or self.es
+        if es.indices.exists_alias(name=self.index):
+            return next(iter(es.indices.get_alias(name=self.index)))
+        return self.index
+
+    def migrate_index(self, batch_size: int = 500, delete_old: bool = False) -> int:
+        """
+        Reindexes all articles into the current versioned index, assigning the
+        deterministic URL-based IDs, and points the alias at it.
+        Returns the number of migrated articles.
+
+        Rejected documents, e.g. 429s from a busy node, are retried a few
+        times. If any still fail, nothing is switched or deleted and a
+        RuntimeError is raised; running the migration again resumes it.
+        """
+        source_index = self.current_index()
+        target_index = versioned_index_name()
+        if source_index == target_index:
+            print(f"Index '{target_index}' is up to date.")
+            return 0
+
+        if not self.es.indices.exists(index=target_index):
+            self.es.indices.create(
+                index=target_index, settings=NEWS_INDEX_SETTINGS, mappings=NEWS_MAPPINGS
+            )
+
+        def actions():
+            for hit in helpers.scan(self.es, index=source_index, size=batch_size):
+                document = hit["_source"]
+                doc_id = document_id(document["source"])
+                document["id"] = doc_id
+                yield {
+                    "_op_type": "create",
+                    "_index": target_index,
+                    "_id": doc_id,
+                    "_source": document,
+                }
+
+        migrated = failed = 0
+        for ok, item in helpers.streaming_bulk(
+            self.es,
+            actions(),
+            chunk_size=batch_size,
+            max_retries=5,
+            raise_on_error=False,
+        ):
+            if ok:
+                migrated += 1
+            elif item["create"]["status"] != 409:  # 409: duplicate source, skip it
+                failed += 1
+                print(f"Error migrating document: {item}")
+        self.es.indices.refresh(index=target_index)
+        if failed:
+            raise RuntimeError(
+                f"{failed} articles could not be copied to '{target_index}', "
+                f"'{source_index}' is left in place. Run the migration again."
+            )
+
+        if source_index == self.index:
+            # The legacy index owns the alias name, it has to go before the alias
+            # can be created.
+            self.es.indices.delete(index=source_index)
+            self.es.indices.put_alias(index=target_index, name=self.index)
+        else:
+            self.es.indices.update_aliases(
+                actions=[
+                    {"remove": {"index": source_index, "alias": self.index}},
+                    {"add": {"index": target_index, "alias": self.index}},
+                ]
+            )
+            if delete_old:
+                self.es.indices.delete(index=source_index)
+        self.legacy_index = False
+        print(
+            f"Migrated {migrated} articles from '{source_index}' to '{target_index}'."
         )
-        return (
-            search_results["hits"]["total"]["value"] > 0
-        )  # returns True if an article exists, False otherwise
-
-    def save_news_article(self, news_article: NewsArticle) -> Optional[NewsArticle]:
-        print(f"Saving article with source {news_article.source}")
-        if self.article_exists(news_article.source):
-            print(f"Article with source {news_article.source} already exists.")
-            return None  # or update the existing article, or handle this situation in some other way
+        return migrated
+
+
+class AsyncESRepository(IAsyncESRepository):
+    """
+    Elasticsearch repository on the native asyncio client, so queries never
+    block the event loop that serves the bot and the crawler.
+    Call ``connect`` from within the running loop before use.
+    """
+
+    CONFLICT_RETRIES = 3
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        retries: int = 100,
+        delay: int = 6,
+        connections_per_node: int = 10,
+    ):
+        self.index = NEWS_INDEX_ALIAS
+        self.legacy_index = False  # True until the old dynamic index is migrated
+        self.host = host
+        self.port = port
+        self.retries = retries
+        self.delay = delay
+        self.connections_per_node = connections_per_node
+        self.es: Optional[AsyncElasticsearch] = None
+
+    async def connect(self) -> None:
+        for attempt in range(self.retries):
+            es = AsyncElasticsearch(
+                [{"host": self.host, "port": self.port, "scheme": "http"}],
+                basic_auth=("elastic", "elastic"),
+                connections_per_node=self.connections_per_node,
+            )
+            try:
+                if await es.ping():
+                    print("Elasticsearch connected.")
+                    await self.ensure_index(es)
+                    self.es = es
+                    return
+                else:
+                    print("Elasticsearch connection failed.")
+            except Exception as e:
+                print(f"Attempt {attempt + 1} - Error connecting to Elasticsearch: {e}")
+            await es.close()
+            # If this is not the last attempt, sleep for the specified delay before retrying
+            if attempt < self.retries - 1:
+                await asyncio.sleep(self.delay)
+
+    async def close(self) -> None:
+        if self.es is not None:
+            await self.es.close()
+            self.es = None
+
+    async def ensure_index(self, es: AsyncElasticsearch) -> None:
+        target_index = versioned_index_name()
+        if not await es.indices.exists(index=self.index):
+            await es.indices.create(
+                index=target_index,
+                settings=NEWS_INDEX_SETTINGS,
+                mappings=NEWS_MAPPINGS,
+                aliases={self.index: {}},
+            )
+            print(f"Index '{target_index}' created with alias '{self.index}'.")
+            return
+
+        if await es.indices.exists_alias(name=self.index):
+            current_index = next(iter(await es.indices.get_alias(name=self.index)))
         else:
-            document = news_article.__dict__
-            doc_id = self.index_document(document)
-            news_article.id = doc_id
+            current_index = self.index
+        self.legacy_index = current_index == self.index
+        if current_index != target_index:
+            print(
+                f"Index '{current_index}' uses an outdated mapping. "
+                "Run the 'migrate-es' command to reindex it into "
+                f"'{target_index}'."
+            )
+
+    async def existing_sources(self, sources: list[str]) -> set[str]:
+        unique_sources = list(set(sources))
+        if not unique_sources:
+            return set()
+        if self.legacy_index:
+            search_results = await self.es.search(
+                index=self.index,
+                query={
+                    "bool": {"filter": {"terms": {"source.keyword": unique_sources}}}
+                },
+                size=len(unique_sources),
+                source_includes=["source"],
+            )
+            return {hit["_source"]["source"] for hit in search_results["hits"]["hits"]}
+
+        ids = {document_id(source): source for source in unique_sources}
+        response = await self.es.mget(index=self.index, ids=list(ids), source=False)
+        return {ids[doc["_id"]] for doc in response["docs"] if doc.get("found")}
+
+    async def bulk_create_news_articles(
+        self, news_articles: list[NewsArticle]
+    ) -> dict[str, int]:
+        operations: list[dict[str, Any]] = []
+        for news_article in news_articles:
+            news_article.id = document_id(news_article.source)
             if news_article.posts is None:
                 news_article.posts = []
-            return news_article
+            operations.append(
+                {"create": {"_index": self.index, "_id": news_article.id}}
+            )
+            operations.append(news_article_to_document(news_article))
+        if not operations:
+            return {}
 
-    def index_document(self, document: dict[str, Any]) -> Optional[str]:
-        try:
-            response = self.es.index(index=self.index, document=document)
-            return response["_id"]
-        except Exception as e:
-            print(f"Error indexing document: {e}")
-            return None
-
-    def get_latest_news(self, count: int) -> list[NewsArticle]:
-        return self.get_latest_news_articles(size=count)
-
-    def get_latest_news_articles(self, size: int = 10) -> list[NewsArticle]:
-        search_results = self.es.search(
-            index=self.index,
-            size=size,
-            query={"match_all": {}},
-            sort=[{"date": {"order": "desc"}}],
-        )
+        response = await self.es.bulk(operations=operations)
+        return {
+            item["create"]["_id"]: item["create"]["status"]
+            for item in response["items"]
+        }
 
-        articles = []
-        for hit in search_results["hits"]["hits"]:
-            source = hit["_source"]
-            source["id"] = hit["_id"]
-            article = NewsArticle(**source)
-            articles.append(article)
+    async def list_latest_articles(
+        self,
+        size: int = 10,
+        fields: Optional[Sequence[str]] = None,
+        cursor: Optional[str] = None,
+    ) -> ArticlePage:
+        search = latest_articles_search(size, fields, cursor, self.legacy_index)
+        search_results = await self.es.search(index=self.index, **search)
+        return article_page_from_hits(search_results["hits"]["hits"], size)
 
-        return articles
+    async def append_post(self, news_article: NewsArticle, post: Post) -> int:
+        return await self.append_posts(news_article, [post])
 
-    def update_news_article(self, news_article: NewsArticle) -> NewsArticle:
-        doc_id = news_article.id
-        document = copy.deepcopy(news_article.__dict__)
-        try:
-            # Convert Post objects to dictionaries
-            document["posts"] = [
-                post.__dict__ if isinstance(post, Post) else post
-                for post in document["posts"]
-            ]
-        except Exception as e:
-            print(f"Error converting posts to dictionaries: {e}")
-            raise e
+    async def append_posts(self, news_article: NewsArticle, posts: list[Post]) -> int:
+        script = {
+            "source": (
+                "if (ctx._source.posts == null) { ctx._source.posts = []; } "
+                "ctx._source.posts.addAll(params.posts);"
+            ),
+            "params": {"posts": [post.__dict__ for post in posts]},
+        }
+        await self._update_with_script(news_article, script)
+        post_index = len(news_article.posts)
+        news_article.posts.extend(posts)
+        return post_index
 
-        try:
-            self.update_document(doc_id, document)
-        except Exception as e:
-            print(f"Error updating document: {e}")
-            raise e
-        return news_article
+    async def set_post_images(
+        self,
+        news_article: NewsArticle,
+        post_index: int,
+        images_id: Optional[list[str]] = None,
+        images_url: Optional[list[str]] = None,
+    ) -> None:
+        script = {
+            "source": (
+                "def post = ctx._source.posts[params.index]; "
+                "if (params.images_id != null) { post.images_id = params.images_id; } "
+                "if (params.images_url != null) { post.images_url = params.images_url; }"
+            ),
+            "params": {
+                "index": post_index,
+                "images_id": images_id,
+                "images_url": images_url,
+            },
+        }
+        await self._update_with_script(news_article, script)
+        post = news_article.posts[post_index]
+        if images_id is not None:
+            post.images_id = images_id
+        if images_url is not None:
+            post.images_url = images_url
 
-    def update_document(
-        self, doc_id: str, document: dict[str, Any]
-    ) -> Optional[dict[str, Any]]:
-        try:
-            response = self.es.update(
-                index=self.index, id=doc_id, body={"doc": document}
-            )
-            return response
-        except Exception as e:
-            print(f"Error updating document: {e}")
-            return None
+    async def _update_with_script(
+        self, news_article: NewsArticle, script: dict[str, Any]
+    ) -> None:
+        """
+        Runs a scripted update against the version of the article the caller has
+        seen. If somebody else changed the article in the meantime, the posts
+        are reloaded and the update is retried, so concurrent edits are never
+        overwritten.
+        """
+        for attempt in range(self.CONFLICT_RETRIES):
+            if news_article.seq_no is None:
+                await self._reload_posts(news_article)
+            try:
+                response = await self.es.update(
+                    index=self.index,
+                    id=news_article.id,
+                    script=script,
+                    if_seq_no=news_article.seq_no,
+                    if_primary_term=news_article.primary_term,
+                )
+                news_article.seq_no = response["_seq_no"]
+                news_article.primary_term = response["_primary_term"]
+                return
+            except ConflictError:
+                print(
+                    f"Article {news_article.id} was changed concurrently, "
+                    f"retrying (attempt {attempt + 1})"
+                )
+                news_article.seq_no = None
+        raise RuntimeError(f"Could not update article {news_article.id}")
+
+    async def _reload_posts(self, news_article: NewsArticle) -> None:
+        response = await self.es.get(
+            index=self.index, id=news_article.id, source_includes=["posts"]
+        )
+        news_article.posts = [
+            Post(**post_data) for post_data in response["_source"].get("posts") or []
+        ]
+        news_article.seq_no = response["_seq_no"]
+        news_article.primary_term = response["_primary_term"]
 
-    def get_news_article_by_id(self, article_id: str) -> Optional[NewsArticle]:
+    async def get_news_article_by_id(self, article_id: str) -> Optional[NewsArticle]:
         try:
-            response = self.es.get(index=self.index, id=article_id)
+            response = await self.es.get(index=self.index, id=article_id)
             if response["found"]:
-                article_data = response["_source"]
-                article_data["id"] = response["_id"]
-                # Convert list of dictionaries to list of Post objects
-                if "posts" in article_data and isinstance(article_data["posts"], list):
-                    article_data["posts"] = [
-                        Post(**post_data) for post_data in article_data["posts"]
-                    ]
-                else:
-                    article_data["posts"] = []
-
-                return NewsArticle(**article_data)
+                return news_article_from_document(
+                    response["_id"],
+                    response["_source"],
+                    response["_seq_no"],
+                    response["_primary_term"],
+                )
         except Exception as e:
             print(f"Error retrieving document by ID: {e}")
 
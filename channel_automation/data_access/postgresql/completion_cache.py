@@ -0,0 +1,137 @@
+from typing import Callable, Optional
+
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlmodel import Session, create_engine
+
+from channel_automation.assistant.models import Completion
+from channel_automation.cache import CacheStats
+from channel_automation.interfaces.completion_cache_interface import ICompletionCache
+from channel_automation.models.completion import CachedCompletion
+
+
+class PGCompletionCache(ICompletionCache):
+    """
+    Keeps LLM answers in Postgres, so they survive restarts and are shared by
+    the bot and the crawler.
+
+    Entries expire ``ttl`` seconds after they were written. When there are more
+    than ``max_entries`` the least recently used ones are deleted. The table is
+    created by the alembic migrations that Repository runs on start.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        ttl: float = 7 * 24 * 3600,
+        max_entries: int = 5000,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        self.engine = create_engine(database_url)
+        self.ttl = timedelta(seconds=ttl)
+        self.max_entries = max_entries
+        self.clock = clock
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @contextmanager
+    def _get_session(self):
+        session = Session(self.engine)
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def get(self, key: str) -> Optional[Completion]:
+        try:
+            return await asyncio.to_thread(self._get, key)
+        except Exception as e:
+            # The cache is an optimisation, a broken one must not stop generation
+            print(f"Error reading the completion cache: {e}")
+            return None
+
+    async def set(self, key: str, completion: Completion) -> None:
+        try:
+            await asyncio.to_thread(self._set, key, completion)
+        except Exception as e:
+            print(f"Error writing the completion cache: {e}")
+
+    def _get(self, key: str) -> Optional[Completion]:
+        with self._get_session() as session:
+            entry = session.get(CachedCompletion, key)
+            if entry is None:
+                self._misses += 1
+                return None
+            now = self.clock()
+            if entry.created_at + self.ttl <= now:
+                session.delete(entry)
+                session.commit()
+                self._expirations += 1
+                self._misses += 1
+                return None
+            entry.hits += 1
+            entry.last_used_at = now
+            session.commit()
+            self._hits += 1
+            return Completion(
+                content=entry.content,
+                input_tokens=entry.input_tokens,
+                output_tokens=entry.output_tokens,
+            )
+
+    def _set(self, key: str, completion: Completion) -> None:
+        with self._get_session() as session:
+            now = self.clock()
+            entry = session.get(CachedCompletion, key)
+            if entry is None:
+                entry = CachedCompletion(key=key, content=completion.content)
+                session.add(entry)
+            entry.content = completion.content
+            entry.input_tokens = completion.input_tokens
+            entry.output_tokens = completion.output_tokens
+            entry.created_at = now
+            entry.last_used_at = now
+            session.commit()
+            self._evict(session, now)
+
+    def _evict(self, session: Session, now: datetime) -> None:
+        expired = (
+            session.query(CachedCompletion)
+            .filter(CachedCompletion.created_at <= now - self.ttl)
+            .delete(synchronize_session=False)
+        )
+        self._expirations += expired
+        over_limit = (
+            session.query(CachedCompletion.key)
+            .order_by(CachedCompletion.last_used_at.desc())
+            .offset(self.max_entries)
+            .all()
+        )
+        if over_limit:
+            session.query(CachedCompletion).filter(
+                CachedCompletion.key.in_([key for key, in over_limit])
+            ).delete(synchronize_session=False)
+            self._evictions += len(over_limit)
+        session.commit()
+
+    def stats(self) -> CacheStats:
+        with self._get_session() as session:
+            entries, size = session.query(
+                func.count(CachedCompletion.key),
+                func.coalesce(func.sum(func.length(CachedCompletion.content)), 0),
+            ).one()
+        return CacheStats(
+            entries=entries,
+            size=size,
+            max_entries=self.max_entries,
+            max_size=0,
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            expirations=self._expirations,
+        )
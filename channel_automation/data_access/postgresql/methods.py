@@ -1,17 +1,42 @@
 from typing import List, Optional
 
+import hashlib
 from contextlib import contextmanager
+from datetime import datetime
 
-from sqlmodel import Session, create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, col, create_engine, delete, select, update
 
 from alembic import command
 from alembic.config import Config
 from channel_automation.interfaces.pg_repository_interface import IRepository
 from channel_automation.models import ChannelInfo
 from channel_automation.models.admin import Admin
+from channel_automation.models.digest import Digest, DigestItem
+from channel_automation.models.image import ImageFileId, ImageFingerprint
 from channel_automation.models.source import Source
 
 
+def url_hash(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def to_signed64(value: int) -> int:
+    """
+    >>> to_signed64(2**64 - 1)
+    -1
+    """
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned64(value: int) -> int:
+    """
+    >>> to_unsigned64(-1) == 2**64 - 1
+    True
+    """
+    return value & ((1 << 64) - 1)
+
+
 class Repository(IRepository):
     def __init__(self, database_url: str):
         alembic_cfg = Config("alembic.ini")
@@ -136,3 +161,139 @@ class Repository(IRepository):
     def get_active_admins(self) -> list[Admin]:
         with self._get_session() as session:
             return session.query(Admin).filter(Admin.is_active == True).all()
+
+    def set_admin_notification_mode(self, user_id: str, mode: str) -> bool:
+        with self._get_session() as session:
+            admin = session.query(Admin).filter(Admin.user_id == user_id).one_or_none()
+            if admin is None:
+                return False
+            admin.notification_mode = mode
+            session.commit()
+            return True
+
+    def get_image_file_id(self, url: str) -> Optional[str]:
+        with self._get_session() as session:
+            image = session.get(ImageFileId, url_hash(url))
+            return image.file_id if image else None
+
+    def save_image_file_id(self, url: str, file_id: str) -> None:
+        with self._get_session() as session:
+            image = session.get(ImageFileId, url_hash(url))
+            if image:
+                image.file_id = file_id
+            else:
+                session.add(
+                    ImageFileId(url_hash=url_hash(url), url=url, file_id=file_id)
+                )
+            session.commit()
+
+    def delete_image_file_id(self, url: str) -> None:
+        with self._get_session() as session:
+            image = session.get(ImageFileId, url_hash(url))
+            if image:
+                session.delete(image)
+                session.commit()
+
+    def add_image_fingerprint(self, channel_id: str, phash: int) -> None:
+        with self._get_session() as session:
+            session.add(
+                ImageFingerprint(channel_id=channel_id, phash=to_signed64(phash))
+            )
+            session.commit()
+
+    def get_image_fingerprints(self, since: datetime) -> list[ImageFingerprint]:
+        with self._get_session() as session:
+            fingerprints = (
+                session.query(ImageFingerprint)
+                .filter(ImageFingerprint.published_at >= since)
+                .order_by(ImageFingerprint.published_at)
+                .all()
+            )
+            return [
+                ImageFingerprint(
+                    id=fingerprint.id,
+                    channel_id=fingerprint.channel_id,
+                    phash=to_unsigned64(fingerprint.phash),
+                    published_at=fingerprint.published_at,
+                )
+                for fingerprint in fingerprints
+            ]
+
+    def add_digest_item(self, item: DigestItem) -> None:
+        with self._get_session() as session:
+            session.add(item)
+            try:
+                session.commit()
+            except IntegrityError:
+                # Already listed, e.g. the article was delivered twice
+                session.rollback()
+
+    def get_pending_digest_items(self) -> list[DigestItem]:
+        with self._get_session() as session:
+            return (
+                session.query(DigestItem)
+                .filter(DigestItem.digest_id == None)
+                .order_by(DigestItem.id)
+                .all()
+            )
+
+    def create_digest(self, chat_id: str, item_ids: list[int]) -> Digest:
+        with self._get_session() as session:
+            digest = Digest(chat_id=chat_id)
+            session.add(digest)
+            session.flush()
+            session.exec(
+                update(DigestItem)
+                .where(col(DigestItem.id).in_(item_ids))
+                .values(digest_id=digest.id)
+            )
+            session.commit()
+            session.refresh(digest)
+            return digest
+
+    def get_digest_items(self, digest_id: int) -> list[DigestItem]:
+        with self._get_session() as session:
+            return (
+                session.query(DigestItem)
+                .filter(DigestItem.digest_id == digest_id)
+                .order_by(DigestItem.id)
+                .all()
+            )
+
+    def delete_digest(self, digest_id: int, max_attempts: int) -> int:
+        with self._get_session() as session:
+            dropped = session.exec(
+                delete(DigestItem).where(
+                    DigestItem.digest_id == digest_id,
+                    DigestItem.attempts >= max_attempts - 1,
+                )
+            ).rowcount
+            session.exec(
+                update(DigestItem)
+                .where(DigestItem.digest_id == digest_id)
+                .values(digest_id=None, attempts=DigestItem.attempts + 1)
+            )
+            session.exec(delete(Digest).where(Digest.id == digest_id))
+            session.commit()
+            return dropped
+
+    def delete_pending_digest_items(self, chat_ids: list[str]) -> None:
+        with self._get_session() as session:
+            session.exec(
+                delete(DigestItem).where(
+                    col(DigestItem.chat_id).in_(chat_ids),
+                    col(DigestItem.digest_id).is_(None),
+                )
+            )
+            session.commit()
+
+    def delete_digests_before(self, before: datetime) -> None:
+        with self._get_session() as session:
+            old_digests = select(Digest.id).where(Digest.created_at < before)
+            session.exec(
+                delete(DigestItem)
+                .where(col(DigestItem.digest_id).in_(old_digests))
+                .execution_options(synchronize_session=False)
+            )
+            session.exec(delete(Digest).where(Digest.created_at < before))
+            session.commit()
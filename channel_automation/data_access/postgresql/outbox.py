@@ -0,0 +1,226 @@
+from typing import Callable, Optional
+
+import asyncio
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, col, create_engine, delete, select, update
+
+from channel_automation.interfaces.outbox_interface import IOutbox, OutboxStats
+from channel_automation.models.outbox import OutboxMessage
+
+# Postgres channel the crawler notifies and the bot listens on
+NOTIFY_CHANNEL = "outbox"
+RETRY_DELAY = timedelta(seconds=30)
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+
+class PGOutbox(IOutbox):
+    """
+    Messages from the crawler to the bot, kept in Postgres until the bot has
+    delivered them.
+
+    A claimed message is leased for ``lease`` seconds: if the bot dies before
+    marking it delivered, it is handed out again afterwards, so delivery is
+    at least once. Failed messages are retried with exponential backoff and
+    given up on after ``max_attempts``. Delivered ones are deleted after
+    ``retention``, their keys block duplicates until then.
+
+    Enqueuing sends a NOTIFY in the same transaction; ``wait`` listens for it
+    on a dedicated connection, so the bot does not have to poll quickly.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        lease: float = 600.0,
+        max_attempts: int = 10,
+        retention: timedelta = timedelta(days=7),
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        self.engine = create_engine(database_url)
+        self.lease = timedelta(seconds=lease)
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self.clock = clock
+        # LISTEN/NOTIFY is Postgres only, other databases are polled
+        self.notifies = self.engine.dialect.name == "postgresql"
+        self._listener = None
+        self._listener_fd: Optional[int] = None
+        self._notified: Optional[asyncio.Event] = None
+        self._enqueued = 0
+        self._duplicates = 0
+        self._claimed = 0
+        self._delivered = 0
+        self._failed = 0
+
+    @contextmanager
+    def _get_session(self):
+        session = Session(self.engine)
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def enqueue(self, kind: str, dedup_key: str, payload: dict) -> bool:
+        return await asyncio.to_thread(self._enqueue, kind, dedup_key, payload)
+
+    async def claim(self, batch_size: int) -> list[OutboxMessage]:
+        return await asyncio.to_thread(self._claim, batch_size)
+
+    async def mark_delivered(self, message_ids: list[int]) -> None:
+        await asyncio.to_thread(self._mark_delivered, message_ids)
+
+    async def mark_failed(self, message_id: int, error: str) -> None:
+        await asyncio.to_thread(self._mark_failed, message_id, error)
+
+    def _enqueue(self, kind: str, dedup_key: str, payload: dict) -> bool:
+        with self._get_session() as session:
+            session.add(
+                OutboxMessage(
+                    dedup_key=dedup_key,
+                    kind=kind,
+                    payload=json.dumps(payload),
+                    created_at=self.clock(),
+                    available_at=self.clock(),
+                )
+            )
+            if self.notifies:
+                # Only sent on commit, a duplicate notifies nobody
+                session.execute(text(f"NOTIFY {NOTIFY_CHANNEL}"))
+            try:
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+                self._duplicates += 1
+                return False
+        self._enqueued += 1
+        return True
+
+    def _claim(self, batch_size: int) -> list[OutboxMessage]:
+        now = self.clock()
+        with self._get_session() as session:
+            messages = session.exec(
+                select(OutboxMessage)
+                .where(
+                    col(OutboxMessage.delivered_at).is_(None),
+                    OutboxMessage.available_at <= now,
+                    OutboxMessage.attempts < self.max_attempts,
+                )
+                .order_by(OutboxMessage.id)
+                .limit(batch_size)
+                # A second bot process takes the next messages instead
+                .with_for_update(skip_locked=True)
+            ).all()
+            for message in messages:
+                message.available_at = now + self.lease
+                message.attempts += 1
+            session.commit()
+            for message in messages:
+                session.refresh(message)
+        self._claimed += len(messages)
+        return messages
+
+    def _mark_delivered(self, message_ids: list[int]) -> None:
+        now = self.clock()
+        with self._get_session() as session:
+            session.exec(
+                update(OutboxMessage)
+                .where(col(OutboxMessage.id).in_(message_ids))
+                .values(delivered_at=now)
+            )
+            session.exec(
+                delete(OutboxMessage).where(
+                    OutboxMessage.delivered_at < now - self.retention
+                )
+            )
+            session.commit()
+        self._delivered += len(message_ids)
+
+    def _mark_failed(self, message_id: int, error: str) -> None:
+        with self._get_session() as session:
+            message = session.get(OutboxMessage, message_id)
+            if message is None:
+                return
+            delay = min(RETRY_DELAY * 2 ** (message.attempts - 1), MAX_RETRY_DELAY)
+            message.available_at = self.clock() + delay
+            message.last_error = error
+            session.commit()
+            if message.attempts >= self.max_attempts:
+                print(f"Giving up on outbox message {message.dedup_key}: {error}")
+        self._failed += 1
+
+    async def wait(self, timeout: float) -> None:
+        if self.notifies and self._listener is None:
+            await self._listen()
+        if self._notified is None:
+            await asyncio.sleep(timeout)
+            return
+        try:
+            await asyncio.wait_for(self._notified.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        if self._notified is not None:
+            self._notified.clear()
+
+    async def _listen(self) -> None:
+        try:
+            listener = await asyncio.to_thread(self._connect_listener)
+        except Exception as e:
+            print(f"Could not listen for outbox messages, polling instead: {e}")
+            return
+        self._listener = listener
+        self._listener_fd = listener.fileno()
+        self._notified = asyncio.Event()
+        asyncio.get_running_loop().add_reader(self._listener_fd, self._on_notify)
+
+    def _connect_listener(self):
+        connection = self.engine.raw_connection()
+        # Kept out of the pool, it stays in LISTEN mode for good
+        connection.detach()
+        listener = connection.connection
+        listener.autocommit = True
+        with listener.cursor() as cursor:
+            cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        return listener
+
+    def _on_notify(self) -> None:
+        try:
+            self._listener.poll()
+        except Exception as e:
+            print(f"Lost the outbox listener connection: {e}")
+            notified = self._notified
+            self._stop_listening()
+            # Wake the waiter up to poll, the next wait reconnects
+            notified.set()
+            return
+        if self._listener.notifies:
+            self._listener.notifies.clear()
+            self._notified.set()
+
+    def _stop_listening(self) -> None:
+        if self._listener is not None:
+            try:
+                asyncio.get_running_loop().remove_reader(self._listener_fd)
+                self._listener.close()
+            except Exception as e:
+                print(f"Error closing the outbox listener: {e}")
+        self._listener = None
+        self._notified = None
+
+    async def close(self) -> None:
+        self._stop_listening()
+        self.engine.dispose()
+
+    def stats(self) -> OutboxStats:
+        return OutboxStats(
+            enqueued=self._enqueued,
+            duplicates=self._duplicates,
+            claimed=self._claimed,
+            delivered=self._delivered,
+            failed=self._failed,
+            listening=self._listener is not None,
+        )
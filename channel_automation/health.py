@@ -0,0 +1,80 @@
+from typing import Callable
+
+import time
+from dataclasses import dataclass
+
+# Skipped for ``cooldown`` seconds after this many failures in a row
+MAX_CONSECUTIVE_FAILURES = 3
+DEFAULT_COOLDOWN = 60.0
+# Weight of the newest call in the moving average latency
+LATENCY_SMOOTHING = 0.2
+
+
+@dataclass
+class HealthStats:
+    requests: int
+    failures: int
+    consecutive_failures: int
+    average_latency: float
+    available: bool
+
+    @property
+    def success_rate(self) -> float:
+        if not self.requests:
+            return 1.0
+        return (self.requests - self.failures) / self.requests
+
+
+class BackendHealth:
+    """
+    Tracks the failures and the latency of one LLM backend or image provider.
+
+    After ``max_failures`` failures in a row the backend is skipped for
+    ``cooldown`` seconds. Then a single call is let through again; it either
+    brings the backend back or starts another cooldown.
+    """
+
+    def __init__(
+        self,
+        max_failures: int = MAX_CONSECUTIVE_FAILURES,
+        cooldown: float = DEFAULT_COOLDOWN,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.clock = clock
+        self._requests = 0
+        self._failures = 0
+        self._consecutive_failures = 0
+        self._average_latency = 0.0
+        self._down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return self.clock() >= self._down_until
+
+    def record_success(self, latency: float) -> None:
+        self._requests += 1
+        self._consecutive_failures = 0
+        if self._average_latency:
+            self._average_latency += LATENCY_SMOOTHING * (
+                latency - self._average_latency
+            )
+        else:
+            self._average_latency = latency
+
+    def record_failure(self) -> None:
+        self._requests += 1
+        self._failures += 1
+        self._consecutive_failures += 1
+        if self._consecutive_failures >= self.max_failures:
+            self._down_until = self.clock() + self.cooldown
+
+    def stats(self) -> HealthStats:
+        return HealthStats(
+            requests=self._requests,
+            failures=self._failures,
+            consecutive_failures=self._consecutive_failures,
+            average_latency=round(self._average_latency, 3),
+            available=self.available,
+        )
@@ -1,7 +1,8 @@
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
 from abc import ABC, abstractmethod
 
+from channel_automation.assistant.models import AssistantStats
 from channel_automation.models import NewsArticle, Post
 
 
@@ -19,6 +20,23 @@ class IAssistant(ABC):
         """
         pass
 
+    @abstractmethod
+    def generate_post_variations(
+        self, news_article: NewsArticle, variation_numbers: list[int]
+    ) -> dict[int, Post]:
+        """
+        Generate social posts for several templates with a single request.
+
+        Args:
+            news_article (NewsArticle): The NewsArticle instance to be processed and translated.
+            variation_numbers (List[int]): The templates to use.
+
+        Returns:
+            Dict[int, Post]: The generated posts by variation number. Variations missing
+            from the answer are left out.
+        """
+        pass
+
     @abstractmethod
     def make_post_fancy(self, post: Post) -> Post:
         """
@@ -44,3 +62,127 @@ class IAssistant(ABC):
         Returns:
             Post: The post with guidence.
         """
+
+
+class IAsyncAssistant(ABC):
+    @abstractmethod
+    async def generate_post(
+        self,
+        news_article: NewsArticle,
+        variation_number: int,
+        on_queued: Optional[Callable[[int], Awaitable[None]]] = None,
+        priority: int = 0,
+        on_progress: Optional[Callable[[str], Awaitable[None]]] = None,
+        use_cache: bool = True,
+    ) -> Post:
+        """
+        Generate a social post for a NewsArticle instance without blocking the event loop.
+
+        Args:
+            news_article (NewsArticle): The NewsArticle instance to be processed and translated.
+            variation_number (int): The template to use.
+            on_queued (Optional[Callable[[int], Awaitable[None]]]): Called with the position
+                in the queue while the request waits for a free slot, and with 0 once it starts.
+            priority (int): Lower runs first. Interactive requests use 0, background ones more.
+            on_progress (Optional[Callable[[str], Awaitable[None]]]): If given, the answer is
+                streamed and this is called with the post text received so far.
+            use_cache (bool): Whether a cached answer may be returned. False forces a new
+                answer, which then replaces the cached one.
+
+        Returns:
+            Post: The generated social post.
+        """
+        pass
+
+    @abstractmethod
+    async def generate_post_variations(
+        self,
+        news_article: NewsArticle,
+        variation_numbers: list[int],
+        on_queued: Optional[Callable[[int], Awaitable[None]]] = None,
+        priority: int = 0,
+        use_cache: bool = True,
+    ) -> dict[int, Post]:
+        """
+        Generate social posts for several templates with a single request.
+
+        Args:
+            news_article (NewsArticle): The NewsArticle instance to be processed and translated.
+            variation_numbers (List[int]): The templates to use.
+            on_queued (Optional[Callable[[int], Awaitable[None]]]): Called with the queue position.
+            priority (int): Lower runs first.
+            use_cache (bool): Whether a cached answer may be returned. False forces a new
+                answer, which then replaces the cached one.
+
+        Returns:
+            Dict[int, Post]: The generated posts by variation number. Variations missing
+            from the answer are left out.
+        """
+        pass
+
+    @abstractmethod
+    async def make_post_fancy(
+        self,
+        post: Post,
+        on_queued: Optional[Callable[[int], Awaitable[None]]] = None,
+        on_progress: Optional[Callable[[str], Awaitable[None]]] = None,
+        use_cache: bool = True,
+    ) -> Post:
+        """
+        Make the specified post fancy.
+
+        Args:
+            post (Post): The post to be made fancy.
+            on_queued (Optional[Callable[[int], Awaitable[None]]]): Called with the queue position.
+            on_progress (Optional[Callable[[str], Awaitable[None]]]): If given, the answer is
+                streamed and this is called with the post text received so far.
+            use_cache (bool): Whether a cached answer may be returned. False forces a new
+                answer, which then replaces the cached one.
+
+        Returns:
+            Post: The fancy post.
+        """
+        pass
+
+    @abstractmethod
+    async def post_guidence(
+        self,
+        post: Post,
+        guidence: str,
+        on_queued: Optional[Callable[[int], Awaitable[None]]] = None,
+        on_progress: Optional[Callable[[str], Awaitable[None]]] = None,
+        use_cache: bool = True,
+    ) -> Post:
+        """
+        Add guidence to the specified post.
+
+        Args:
+            post (Post): The post to be added guidence.
+            guidence (str): The guidence to be added.
+            on_queued (Optional[Callable[[int], Awaitable[None]]]): Called with the queue position.
+            on_progress (Optional[Callable[[str], Awaitable[None]]]): If given, the answer is
+                streamed and this is called with the post text received so far.
+            use_cache (bool): Whether a cached answer may be returned. False forces a new
+                answer, which then replaces the cached one.
+
+        Returns:
+            Post: The post with guidence.
+        """
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """
+        Close the HTTP connection pool.
+        """
+        pass
+
+    @abstractmethod
+    def stats(self) -> AssistantStats:
+        """
+        Get the counters of the assistant.
+
+        Returns:
+            AssistantStats: The governor, parsing, cache and backend statistics.
+        """
+        pass
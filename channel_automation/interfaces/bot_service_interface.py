@@ -14,9 +14,13 @@ class ITelegramBotService(ABC):
     @abstractmethod
     async def send_article_to_admin(self, article: NewsArticle) -> None:
         """
-        Send a NewsArticle to the admin.
+        Send a NewsArticle to the admins and wait until it was delivered.
+        Admins in digest mode get it with the next digest instead.
 
         Args:
             article (NewsArticle): The news article to send.
+
+        Raises:
+            RuntimeError: If the article could not be delivered to every admin.
         """
         pass
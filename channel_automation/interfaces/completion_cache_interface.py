@@ -0,0 +1,42 @@
+from typing import Optional
+
+from abc import ABC, abstractmethod
+
+from channel_automation.assistant.models import Completion
+from channel_automation.cache import CacheStats
+
+
+class ICompletionCache(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Completion]:
+        """
+        Get a stored completion.
+
+        Args:
+            key (str): The cache key of the request.
+
+        Returns:
+            Optional[Completion]: The completion, or None if it is missing or expired.
+        """
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, completion: Completion) -> None:
+        """
+        Store a completion, replacing an older one with the same key.
+
+        Args:
+            key (str): The cache key of the request.
+            completion (Completion): The completion to store.
+        """
+        pass
+
+    @abstractmethod
+    def stats(self) -> CacheStats:
+        """
+        Get the hit and eviction counters of the cache.
+
+        Returns:
+            CacheStats: The cache statistics.
+        """
+        pass
@@ -1,52 +1,161 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
 from abc import ABC, abstractmethod
 
-from channel_automation.models import NewsArticle
+from channel_automation.models import ArticlePage, NewsArticle, Post
 
 
 class IESRepository(ABC):
+    """
+    Synchronous repository for the offline maintenance of the news index.
+    The bot and the crawler use IAsyncESRepository.
+    """
+
+    @abstractmethod
+    def current_index(self) -> str:
+        """
+        Retrieve the concrete index behind the news alias.
+
+        Returns:
+            str: The index name, or the alias name itself for the legacy index.
+        """
+        pass
+
     @abstractmethod
-    def save_news_article(self, news_article: NewsArticle) -> NewsArticle:
+    def migrate_index(self, batch_size: int = 500, delete_old: bool = False) -> int:
         """
-        Save a news article to Elasticsearch.
+        Reindex all news articles into the current versioned index and point
+        the alias at it.
 
         Args:
-            news_article (NewsArticle): A NewsArticle instance to be saved.
+            batch_size (int): The number of documents per scroll page and bulk request.
+            delete_old (bool): Whether to delete the old versioned index afterwards.
 
         Returns:
-            NewsArticle: The saved NewsArticle instance.
+            int: The number of migrated news articles.
         """
         pass
 
+
+class IAsyncESRepository(ABC):
     @abstractmethod
-    def get_latest_news(self, count: int) -> list[NewsArticle]:
+    async def connect(self) -> None:
         """
-        Retrieve the latest news articles from Elasticsearch.
+        Connect to Elasticsearch and make sure the news index exists.
+        Must be awaited from the event loop the repository is used in.
+        """
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """
+        Close the connection pool.
+        """
+        pass
+
+    @abstractmethod
+    async def bulk_create_news_articles(
+        self, news_articles: list[NewsArticle]
+    ) -> dict[str, int]:
+        """
+        Create news articles in Elasticsearch with a single _bulk request.
+        Assigns the document ID to every article.
 
         Args:
-            count (int): The number of latest news articles to retrieve.
+            news_articles (List[NewsArticle]): NewsArticle instances to be created.
 
         Returns:
-            List[NewsArticle]: A list of the latest NewsArticle instances.
+            Dict[str, int]: The HTTP status of every item by article ID,
+            201 when created and 409 when the article already exists.
         """
         pass
 
     @abstractmethod
-    def update_news_article(self, news_article: NewsArticle) -> NewsArticle:
+    async def existing_sources(self, sources: list[str]) -> set[str]:
         """
-        Update an existing news article in Elasticsearch.
+        Check in a single request which of the given source URLs are already stored.
 
         Args:
-            news_article (NewsArticle): A NewsArticle instance with updated data.
+            sources (List[str]): Source URLs of news articles.
 
         Returns:
-            NewsArticle: The updated NewsArticle instance.
+            Set[str]: The subset of sources that already exist in Elasticsearch.
+        """
+        pass
+
+    @abstractmethod
+    async def list_latest_articles(
+        self,
+        size: int = 10,
+        fields: Optional[Sequence[str]] = None,
+        cursor: Optional[str] = None,
+    ) -> ArticlePage:
+        """
+        Retrieve a page of the latest news articles as lightweight summaries.
+        Only the projected fields are fetched from Elasticsearch.
+
+        Args:
+            size (int): The number of articles per page.
+            fields (Sequence[str]): The summary fields to fetch, all of them by default.
+            cursor (Optional[str]): The next_cursor of the previous page, None for the first page.
+
+        Returns:
+            ArticlePage: The article summaries and the cursor of the next page.
+        """
+        pass
+
+    @abstractmethod
+    async def append_post(self, news_article: NewsArticle, post: Post) -> int:
+        """
+        Append a post to the stored article without rewriting the document.
+        Concurrent changes to the article are detected and retried, so posts
+        added by other admins are never lost.
+
+        Args:
+            news_article (NewsArticle): The article the post belongs to. Its posts
+                and version are refreshed in place.
+            post (Post): The post to append.
+
+        Returns:
+            int: The index of the appended post in the article's posts.
+        """
+        pass
+
+    @abstractmethod
+    async def append_posts(self, news_article: NewsArticle, posts: list[Post]) -> int:
+        """
+        Append several posts to the stored article in a single update.
+
+        Args:
+            news_article (NewsArticle): The article the posts belong to.
+            posts (List[Post]): The posts to append.
+
+        Returns:
+            int: The index of the first appended post in the article's posts.
+        """
+        pass
+
+    @abstractmethod
+    async def set_post_images(
+        self,
+        news_article: NewsArticle,
+        post_index: int,
+        images_id: Optional[list[str]] = None,
+        images_url: Optional[list[str]] = None,
+    ) -> None:
+        """
+        Set the images of a single post of the stored article.
+
+        Args:
+            news_article (NewsArticle): The article the post belongs to.
+            post_index (int): The index of the post in the article's posts.
+            images_id (Optional[List[str]]): Telegram file IDs, left unchanged if None.
+            images_url (Optional[List[str]]): Image URLs, left unchanged if None.
         """
         pass
 
     @abstractmethod
-    def get_news_article_by_id(self, article_id: str) -> Optional[NewsArticle]:
+    async def get_news_article_by_id(self, article_id: str) -> Optional[NewsArticle]:
         """
         Retrieve a news article from Elasticsearch by its ID.
 
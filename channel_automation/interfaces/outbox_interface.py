@@ -0,0 +1,94 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from channel_automation.models import OutboxMessage
+
+
+@dataclass
+class OutboxStats:
+    enqueued: int
+    duplicates: int  # enqueued again with a known dedup key
+    claimed: int
+    delivered: int
+    failed: int
+    listening: bool  # woken up by NOTIFY rather than polling
+
+
+class IOutbox(ABC):
+    @abstractmethod
+    async def enqueue(self, kind: str, dedup_key: str, payload: dict) -> bool:
+        """
+        Store a message for the bot and wake up its delivery worker.
+
+        Args:
+            kind (str): What the message is about, e.g. "article".
+            dedup_key (str): Identifies the message, a second message with
+                the same key is ignored.
+            payload (dict): JSON-serializable content of the message.
+
+        Returns:
+            bool: True if the message was stored, False if it was a duplicate.
+        """
+        pass
+
+    @abstractmethod
+    async def claim(self, batch_size: int) -> list[OutboxMessage]:
+        """
+        Take undelivered messages for delivery. They are not handed out again
+        until their lease runs out, unless they are marked as failed.
+
+        Args:
+            batch_size (int): The most messages to take.
+
+        Returns:
+            List[OutboxMessage]: The messages, oldest first.
+        """
+        pass
+
+    @abstractmethod
+    async def mark_delivered(self, message_ids: list[int]) -> None:
+        """
+        Mark messages as delivered, they are never handed out again.
+
+        Args:
+            message_ids (List[int]): The IDs of the delivered messages.
+        """
+        pass
+
+    @abstractmethod
+    async def mark_failed(self, message_id: int, error: str) -> None:
+        """
+        Record a failed delivery, the message is retried later.
+
+        Args:
+            message_id (int): The ID of the message.
+            error (str): What went wrong.
+        """
+        pass
+
+    @abstractmethod
+    async def wait(self, timeout: float) -> None:
+        """
+        Wait until a message is enqueued, or at most ``timeout`` seconds.
+
+        Args:
+            timeout (float): The longest wait, in seconds.
+        """
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """
+        Release the connections of the outbox.
+        """
+        pass
+
+    @abstractmethod
+    def stats(self) -> OutboxStats:
+        """
+        Get the counters of this outbox instance.
+
+        Returns:
+            OutboxStats: The outbox statistics.
+        """
+        pass
@@ -1,9 +1,12 @@
 from typing import List, Optional
 
 from abc import ABC, abstractmethod
+from datetime import datetime
 
 from channel_automation.models import ChannelInfo
 from channel_automation.models.admin import Admin
+from channel_automation.models.digest import Digest, DigestItem
+from channel_automation.models.image import ImageFingerprint
 from channel_automation.models.source import Source
 
 
@@ -122,3 +125,159 @@ class IRepository(ABC):
             List[Admin]: A list of active admins.
         """
         pass
+
+    @abstractmethod
+    def set_admin_notification_mode(self, user_id: str, mode: str) -> bool:
+        """
+        Choose how an admin is told about new articles.
+
+        Args:
+            user_id (str): The Telegram user ID of the admin.
+            mode (str): "instant" or "digest".
+
+        Returns:
+            bool: False if there is no such admin.
+        """
+        pass
+
+    @abstractmethod
+    def get_image_file_id(self, url: str) -> Optional[str]:
+        """
+        Get the Telegram file_id of a photo that was sent from an image URL.
+
+        Args:
+            url (str): The image URL.
+
+        Returns:
+            Optional[str]: The file_id, or None if the URL was never sent.
+        """
+        pass
+
+    @abstractmethod
+    def save_image_file_id(self, url: str, file_id: str) -> None:
+        """
+        Remember the Telegram file_id of a photo sent from an image URL.
+
+        Args:
+            url (str): The image URL.
+            file_id (str): The file_id Telegram returned for the photo.
+        """
+        pass
+
+    @abstractmethod
+    def delete_image_file_id(self, url: str) -> None:
+        """
+        Forget the file_id of an image URL, e.g. after Telegram rejected it.
+
+        Args:
+            url (str): The image URL.
+        """
+        pass
+
+    @abstractmethod
+    def add_image_fingerprint(self, channel_id: str, phash: int) -> None:
+        """
+        Record the perceptual hash of an image published in a channel.
+
+        Args:
+            channel_id (str): The channel the image was published in.
+            phash (int): The 64-bit perceptual hash of the image.
+        """
+        pass
+
+    @abstractmethod
+    def get_image_fingerprints(self, since: datetime) -> list[ImageFingerprint]:
+        """
+        Get the hashes of the images published in any channel since a moment.
+
+        Args:
+            since (datetime): The earliest publication time, in UTC.
+
+        Returns:
+            List[ImageFingerprint]: The fingerprints, oldest first.
+        """
+        pass
+
+    @abstractmethod
+    def add_digest_item(self, item: DigestItem) -> None:
+        """
+        Put an article on the next digest of a chat. An article already on it
+        is not added twice.
+
+        Args:
+            item (DigestItem): The article and the chat.
+        """
+        pass
+
+    @abstractmethod
+    def get_pending_digest_items(self) -> list[DigestItem]:
+        """
+        Get the items of every chat that were not sent in a digest yet.
+
+        Returns:
+            List[DigestItem]: The items, oldest first.
+        """
+        pass
+
+    @abstractmethod
+    def create_digest(self, chat_id: str, item_ids: list[int]) -> Digest:
+        """
+        Group pending items into a digest.
+
+        Args:
+            chat_id (str): The chat the digest is for.
+            item_ids (List[int]): The IDs of its items.
+
+        Returns:
+            Digest: The new digest.
+        """
+        pass
+
+    @abstractmethod
+    def get_digest_items(self, digest_id: int) -> list[DigestItem]:
+        """
+        Get the items of a digest.
+
+        Args:
+            digest_id (int): The ID of the digest.
+
+        Returns:
+            List[DigestItem]: The items in digest order, empty if the digest
+                does not exist.
+        """
+        pass
+
+    @abstractmethod
+    def delete_digest(self, digest_id: int, max_attempts: int) -> int:
+        """
+        Delete a digest that could not be sent, its items are pending again.
+        Items that were in ``max_attempts`` unsent digests are deleted instead.
+
+        Args:
+            digest_id (int): The ID of the digest.
+            max_attempts (int): How many unsent digests an item may be in.
+
+        Returns:
+            int: How many items were deleted.
+        """
+        pass
+
+    @abstractmethod
+    def delete_pending_digest_items(self, chat_ids: list[str]) -> None:
+        """
+        Delete the items waiting for a digest in the given chats.
+
+        Args:
+            chat_ids (list[str]): The chats, e.g. of admins no longer active.
+        """
+        pass
+
+    @abstractmethod
+    def delete_digests_before(self, before: datetime) -> None:
+        """
+        Delete old digests together with their items.
+
+        Args:
+            before (datetime): Digests created before this are deleted.
+        """
+        pass
@@ -10,3 +10,26 @@ class IImageSearch(ABC):
     @abstractmethod
     def search_images(self, query: str, num_images: int) -> list[str]:
         pass
+
+
+class IAsyncImageSearch(ABC):
+    @abstractmethod
+    async def search_images(self, query: str, num_images: int) -> list[str]:
+        """
+        Search images without blocking the event loop.
+
+        Args:
+            query (str): The search phrase.
+            num_images (int): The maximum number of image URLs to return.
+
+        Returns:
+            List[str]: The image URLs, best match first.
+        """
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """
+        Close the HTTP connection pool.
+        """
+        pass
@@ -1,4 +1,8 @@
 from .admin import Admin
 from .channel import ChannelInfo
-from .news import NewsArticle, Post
+from .completion import CachedCompletion
+from .digest import Digest, DigestItem
+from .image import ImageFileId, ImageFingerprint
+from .news import ArticlePage, ArticleSummary, NewsArticle, Post
+from .outbox import OutboxMessage
 from .source import Source
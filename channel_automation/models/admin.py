@@ -1,5 +1,10 @@
 from sqlmodel import Field, SQLModel
 
+# How an admin hears about new articles: a message per article, or a digest
+INSTANT = "instant"
+DIGEST = "digest"
+NOTIFICATION_MODES = (INSTANT, DIGEST)
+
 
 class Admin(SQLModel, table=True):
     id: int = Field(primary_key=True)
@@ -10,3 +15,4 @@ class Admin(SQLModel, table=True):
     is_active: bool = Field(
         default=True
     )  # Whether the admin is currently active or not.
+    notification_mode: str = Field(default=INSTANT)
@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class CachedCompletion(SQLModel, table=True):
+    # sha256 of the prompt (or article fingerprint), template and model params
+    key: str = Field(primary_key=True)
+    content: str
+    input_tokens: int = Field(default=0)
+    output_tokens: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    last_used_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    hits: int = Field(default=0)
@@ -0,0 +1,28 @@
+from typing import Optional
+
+from datetime import datetime
+
+from sqlalchemy import UniqueConstraint
+from sqlmodel import Field, SQLModel
+
+
+class Digest(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    chat_id: str = Field(index=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class DigestItem(SQLModel, table=True):
+    # An article redelivered from the outbox is listed once
+    __table_args__ = (UniqueConstraint("chat_id", "article_id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    chat_id: str = Field(index=True)
+    article_id: str
+    title: str
+    source: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Digests with the item that could not be sent
+    attempts: int = Field(default=0)
+    # Set once the item went out in a digest
+    digest_id: Optional[int] = Field(default=None, foreign_key="digest.id", index=True)
@@ -0,0 +1,23 @@
+from typing import Optional
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column
+from sqlmodel import Field, SQLModel
+
+
+class ImageFileId(SQLModel, table=True):
+    # sha256 of the URL, image URLs are too long for an index
+    url_hash: str = Field(primary_key=True)
+    url: str
+    # What Telegram returned for the first photo sent from this URL
+    file_id: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ImageFingerprint(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    channel_id: str = Field(index=True)
+    # 64-bit perceptual hash, stored as a signed BIGINT
+    phash: int = Field(sa_column=Column(BigInteger, nullable=False))
+    published_at: datetime = Field(default_factory=datetime.utcnow, index=True)
@@ -9,6 +9,9 @@ class Post:
     images_search: Optional[str] = None
     images_id: list[str] = field(default_factory=list)
     images_url: list[str] = field(default_factory=list)
+    # Tokens spent on generating this post
+    input_tokens: int = 0
+    output_tokens: int = 0
 
 
 @dataclass
@@ -34,3 +37,25 @@ class NewsArticle:
     # we don't need this field. Keep it here because we have these fields in database
     russian_abstract: Optional[str] = field(default=None)
     images_search: Optional[str] = field(default=None)
+    # Version of the stored document, used for optimistic concurrency control.
+    # Not part of the document itself.
+    seq_no: Optional[int] = field(default=None, metadata={"persist": False})
+    primary_term: Optional[int] = field(default=None, metadata={"persist": False})
+
+
+@dataclass
+class ArticleSummary:
+    """The part of a news article needed to list it."""
+
+    id: str
+    title: str
+    source: str
+    date: Optional[str] = None
+    hostname: Optional[str] = None
+
+
+@dataclass
+class ArticlePage:
+    articles: list[ArticleSummary]
+    # Pass back to get the next page, None on the last page
+    next_cursor: Optional[str] = None
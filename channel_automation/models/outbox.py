@@ -0,0 +1,19 @@
+from typing import Optional
+
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class OutboxMessage(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Enqueuing a second message with the same key does nothing
+    dedup_key: str = Field(unique=True)
+    kind: str
+    payload: str  # JSON
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Not handed out before, pushed back while claimed and after failures
+    available_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    attempts: int = Field(default=0)
+    delivered_at: Optional[datetime] = Field(default=None, index=True)
+    last_error: Optional[str] = None
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from channel_automation.health import BackendHealth, HealthStats
+from channel_automation.interfaces.search_interface import (
+    IAsyncImageSearch,
+    IImageSearch,
+)
+
+
+def normalize_image_url(url: str) -> str:
+    """
+    Reduces an image URL to what identifies the image, so that the same
+    picture found by two providers is only offered once.
+
+    >>> normalize_image_url("HTTPS://www.Example.com/a/photo.jpg/?utm_source=x#top")
+    'example.com/a/photo.jpg'
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query)
+            if not key.lower().startswith("utm_")
+        )
+    )
+    return urlunsplit(("", host, parts.path.rstrip("/"), query, "")).lstrip("/")
+
+
+class ThreadedImageSearch(IAsyncImageSearch):
+    """
+    Runs a blocking IImageSearch, e.g. GoogleImageSearch, in a worker thread.
+    """
+
+    def __init__(self, search: IImageSearch) -> None:
+        self.search = search
+
+    async def search_images(self, query: str, num_images: int) -> list[str]:
+        return await asyncio.to_thread(self.search.search_images, query, num_images)
+
+    async def close(self) -> None:
+        pass
+
+
+@dataclass
+class CompositeSearchStats:
+    searches: int
+    deadline_misses: int  # searches that returned at the deadline
+    providers: dict[str, HealthStats]
+
+
+class CompositeImageSearch(IAsyncImageSearch):
+    """
+    Asks several image search providers at once and merges their answers.
+
+    The search returns as soon as ``enough`` distinct images are in, or when
+    ``deadline`` seconds have passed, with whatever arrived by then. Results
+    are interleaved in provider order and deduplicated by normalized URL.
+
+    A provider that fails or misses the deadline several times in a row is
+    skipped for a while, so one slow provider does not cost every search the
+    whole deadline.
+    """
+
+    def __init__(
+        self,
+        providers: dict[str, IAsyncImageSearch],
+        deadline: float = 5.0,
+        enough: int = 5,
+    ) -> None:
+        if not providers:
+            raise ValueError("At least one image search provider is required")
+        self.providers = providers
+        self.deadline = deadline
+        self.enough = enough
+        self.health = {name: BackendHealth() for name in providers}
+        self._searches = 0
+        self._deadline_misses = 0
+
+    async def search_images(self, query: str, num_images: int = 5) -> list[str]:
+        self._searches += 1
+        names = [name for name in self.providers if self.health[name].available]
+        # All of them cooling down, asking anyway beats returning nothing
+        tasks = {
+            asyncio.create_task(self._ask(name, query, num_images)): name
+            for name in names or self.providers
+        }
+        results: dict[str, list[str]] = {}
+        enough = min(num_images, self.enough)
+        pending = set(tasks)
+        deadline = time.monotonic() + self.deadline
+        try:
+            while pending and len(self._merge(results, num_images)) < enough:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        results[tasks[task]] = task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if pending and time.monotonic() >= deadline:
+            self._deadline_misses += 1
+            late = [tasks[task] for task in pending]
+            print(f"Image search deadline passed without {', '.join(late)}")
+            for name in late:
+                self.health[name].record_failure()
+        return self._merge(results, num_images)
+
+    async def _ask(self, name: str, query: str, num_images: int) -> list[str]:
+        started = time.monotonic()
+        try:
+            image_urls = await self.providers[name].search_images(query, num_images)
+        except Exception as e:
+            print(f"Image search provider {name} failed: {e!r}")
+            self.health[name].record_failure()
+            raise
+        self.health[name].record_success(time.monotonic() - started)
+        return image_urls
+
+    def _merge(self, results: dict[str, list[str]], num_images: int) -> list[str]:
+        # Round robin in provider order, so every provider's best match is
+        # near the top
+        ranked = [results[name] for name in self.providers if name in results]
+        merged = []
+        seen = set()
+        for rank in range(max((len(urls) for urls in ranked), default=0)):
+            for urls in ranked:
+                if rank < len(urls):
+                    key = normalize_image_url(urls[rank])
+                    if key not in seen:
+                        seen.add(key)
+                        merged.append(urls[rank])
+                        if len(merged) >= num_images:
+                            return merged
+        return merged
+
+    def stats(self) -> CompositeSearchStats:
+        return CompositeSearchStats(
+            searches=self._searches,
+            deadline_misses=self._deadline_misses,
+            providers={name: health.stats() for name, health in self.health.items()},
+        )
+
+    async def close(self) -> None:
+        for provider in self.providers.values():
+            await provider.close()
@@ -1,33 +1,160 @@
-from typing import List
+from typing import Callable, List
 
+import asyncio
+import html
 import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from urllib.parse import quote_plus
 
+import aiohttp
 import requests
-from bs4 import BeautifulSoup
 from serpapi import GoogleSearch
 
-from channel_automation.interfaces.search_interface import IImageSearch
+from channel_automation.cache import CacheStats, TTLCache
+from channel_automation.interfaces.search_interface import (
+    IAsyncImageSearch,
+    IImageSearch,
+)
+from channel_automation.services.http_client import HTTPClientManager
+
+# The full size image URL is in the HTML escaped JSON of the "m" attribute of
+# every <a class="iusc"> result, no DOM is needed to find it
+_BING_IMAGE_URL = re.compile(
+    r'(?:"|&quot;)murl(?:"|&quot;):(?:"|&quot;)(.*?)(?:"|&quot;)'
+)
+
+
+BING_IMAGES_URL = "https://www.bing.com/images/search"
+
+
+def bing_search_url(query: str, base_url: str = BING_IMAGES_URL) -> str:
+    return f"{base_url}?q={quote_plus(query)}&qft=+filterui%3Aimagesize-large"
+
+
+def parse_bing_image_urls(page: str, num_images: int) -> list[str]:
+    image_urls = []
+    for match in _BING_IMAGE_URL.finditer(page):
+        image_urls.append(html.unescape(match.group(1)))
+        if len(image_urls) >= num_images:
+            break
+    return image_urls
 
 
 class BingImageSearch:
-    def __init__(self):
-        pass
+    def __init__(self, timeout: float = 10.0):
+        self.timeout = timeout
 
     def search_images(self, query: str, num_images: int = 5) -> list[str]:
-        url = f"https://www.bing.com/images/search?q={query.replace(' ', '+')}&qft=+filterui%3Aimagesize-large"
-        soup = BeautifulSoup(requests.get(url).text, "html.parser")
+        response = requests.get(bing_search_url(query), timeout=self.timeout)
+        return parse_bing_image_urls(response.text, num_images)
 
-        image_urls = []
-        for a in soup.find_all("a", {"class": "iusc"}):
-            m = re.search('"murl":"(.*?)"', a.get("m"))
-            if m:
-                image_url = m.group(1)
-                image_urls.append(image_url)
-                if len(image_urls) >= num_images:
-                    break
 
+@dataclass
+class ImageSearchStats:
+    requests: int
+    errors: int
+    timeouts: int
+    average_latency: float  # seconds, of the searches that reached Bing
+    p95_latency: float
+    cache: CacheStats
+
+
+class AsyncBingImageSearch(IAsyncImageSearch):
+    """
+    Bing image search on a pooled aiohttp session.
+
+    Every search is cut off after ``timeout`` seconds, so a slow Bing answer
+    can no longer hang the bot. Results are cached per query for ``ttl``
+    seconds, as the same search phrases come back again and again.
+    """
+
+    # Searches to keep for the latency percentiles
+    LATENCY_WINDOW = 200
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        max_cached_queries: int = 1024,
+        ttl: float = 6 * 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+        base_url: str = BING_IMAGES_URL,
+    ) -> None:
+        self.base_url = base_url
+        self.timeout = aiohttp.ClientTimeout(
+            total=timeout, sock_connect=connect_timeout
+        )
+        self.http_client = HTTPClientManager(limit=8, limit_per_host=4)
+        # query -> (number of images asked for, image URLs)
+        self.cache: TTLCache[tuple[int, list[str]]] = TTLCache(
+            max_entries=max_cached_queries, ttl=ttl, clock=clock
+        )
+        self.clock = clock
+        self._latencies: deque[float] = deque(maxlen=self.LATENCY_WINDOW)
+        self._requests = 0
+        self._errors = 0
+        self._timeouts = 0
+
+    async def search_images(self, query: str, num_images: int = 5) -> list[str]:
+        key = " ".join(query.lower().split())
+        cached = self.cache.get(key)
+        # A search for fewer images than Bing had is not an answer for more
+        if cached is not None:
+            asked_for, image_urls = cached
+            if len(image_urls) >= num_images or asked_for >= num_images:
+                return image_urls[:num_images]
+
+        image_urls = await self._search(query, num_images)
+        if image_urls:
+            self.cache.set(key, (num_images, image_urls))
         return image_urls
 
+    async def _search(self, query: str, num_images: int) -> list[str]:
+        self._requests += 1
+        started = self.clock()
+        try:
+            session = await self.http_client.get_session()
+            async with session.get(
+                bing_search_url(query, self.base_url), timeout=self.timeout
+            ) as response:
+                response.raise_for_status()
+                page = await response.text()
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise
+        except Exception:
+            self._errors += 1
+            raise
+        latency = self.clock() - started
+        self._latencies.append(latency)
+        print(
+            f"Image search for '{query}' took {latency:.2f}s, "
+            f"cache hit rate {self.cache.stats().hit_rate:.0%}"
+        )
+        return parse_bing_image_urls(page, num_images)
+
+    def stats(self) -> ImageSearchStats:
+        latencies = sorted(self._latencies)
+        return ImageSearchStats(
+            requests=self._requests,
+            errors=self._errors,
+            timeouts=self._timeouts,
+            average_latency=(
+                round(sum(latencies) / len(latencies), 3) if latencies else 0.0
+            ),
+            p95_latency=(
+                round(latencies[int(0.95 * (len(latencies) - 1))], 3)
+                if latencies
+                else 0.0
+            ),
+            cache=self.cache.stats(),
+        )
+
+    async def close(self) -> None:
+        await self.http_client.close()
+
 
 # Define the GoogleImageSearch class, which implements the IImageSearch interface
 class GoogleImageSearch(IImageSearch):
@@ -8,14 +8,16 @@ from telegram.ext import (
 )
 
 from channel_automation import assistant
-from channel_automation.interfaces.assistant_interface import IAssistant
-from channel_automation.interfaces.es_repository_interface import IESRepository
+from channel_automation.interfaces.assistant_interface import IAsyncAssistant
+from channel_automation.interfaces.es_repository_interface import IAsyncESRepository
 from channel_automation.interfaces.pg_repository_interface import IRepository
-from channel_automation.interfaces.search_interface import IImageSearch
+from channel_automation.interfaces.search_interface import IAsyncImageSearch
 from channel_automation.models import Admin
+from channel_automation.models.admin import DIGEST, INSTANT, NOTIFICATION_MODES
 from channel_automation.services.bot import AWAITING_SECRET_KEY
 
 from .base import BaseHandlers
+from .utils import admin_required
 
 
 def create_start_menu() -> ReplyKeyboardMarkup:
@@ -29,9 +31,9 @@ class AdminHandlers(BaseHandlers):
         self,
         bot: Bot,
         repo: IRepository,
-        es_repo: IESRepository,
-        assistant: IAssistant,
-        search: IImageSearch,
+        es_repo: IAsyncESRepository,
+        assistant: IAsyncAssistant,
+        search: IAsyncImageSearch,
         admin_chat_ids: list,
     ) -> None:
         super().__init__(bot, repo, es_repo, assistant, search, admin_chat_ids)
@@ -95,6 +97,33 @@ class AdminHandlers(BaseHandlers):
         user_id = update.effective_user.id
         await update.message.reply_text(f"Your user ID is: {user_id}")
 
+    @admin_required
+    async def set_notification_mode(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        user_id = str(update.effective_user.id)
+        if not context.args or context.args[0] not in NOTIFICATION_MODES:
+            admin = next(
+                (a for a in self.repo.get_active_admins() if a.user_id == user_id),
+                None,
+            )
+            mode = admin.notification_mode if admin else INSTANT
+            await update.message.reply_text(
+                f"New articles are sent to you in {mode} mode.\n\n"
+                f"/notifications {INSTANT} - a message for every article\n"
+                f"/notifications {DIGEST} - all new articles in one message "
+                "from time to time"
+            )
+            return
+
+        mode = context.args[0]
+        if self.repo.set_admin_notification_mode(user_id, mode):
+            await update.message.reply_text(
+                f"New articles are now sent in {mode} mode."
+            )
+        else:
+            await update.message.reply_text("Could not change the notification mode.")
+
 
 def register(app, bot, repo, es_repo, assistant, search, admin_chat_ids):
     logic = AdminHandlers(bot, repo, es_repo, assistant, search, admin_chat_ids)
@@ -110,3 +139,4 @@ def register(app, bot, repo, es_repo, assistant, search, admin_chat_ids):
     )
     app.add_handler(conv_handler)
     app.add_handler(CommandHandler("myid", logic.get_user_id))
+    app.add_handler(CommandHandler("notifications", logic.set_notification_mode))
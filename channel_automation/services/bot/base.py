@@ -1,10 +1,31 @@
-from telegram import Bot, Update
+from typing import Callable, Optional
+
+import asyncio
+
+from telegram import Bot, InlineKeyboardMarkup, Message, Update
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 
-from channel_automation.interfaces.assistant_interface import IAssistant
-from channel_automation.interfaces.es_repository_interface import IESRepository
+from channel_automation.interfaces.assistant_interface import IAsyncAssistant
+from channel_automation.interfaces.es_repository_interface import IAsyncESRepository
 from channel_automation.interfaces.pg_repository_interface import IRepository
-from channel_automation.interfaces.search_interface import IImageSearch
+from channel_automation.interfaces.search_interface import IAsyncImageSearch
+from channel_automation.models import Post
+from channel_automation.services.bot.notifications import (
+    Notification,
+    notification_dispatcher,
+)
+from channel_automation.services.images import (
+    MAX_CANDIDATES,
+    PreparedImage,
+    image_pipeline,
+)
+
+
+def is_rejected_file_id(error: BadRequest) -> bool:
+    # e.g. "Wrong file identifier/http url specified" or "Wrong remote file
+    # identifier specified", as opposed to Markdown errors
+    return "file identifier" in error.message.lower()
 
 
 class BaseHandlers:
@@ -12,9 +33,9 @@ class BaseHandlers:
         self,
         bot: Bot,
         repo: IRepository,
-        es_repo: IESRepository,
-        assistant: IAssistant,
-        search: IImageSearch,
+        es_repo: IAsyncESRepository,
+        assistant: IAsyncAssistant,
+        search: IAsyncImageSearch,
         admin_chat_ids: list,
     ) -> None:
         self.bot = bot
@@ -24,6 +45,8 @@ class BaseHandlers:
         self.assistant = assistant
         self.search = search
         self.admin_chat_ids = admin_chat_ids
+        self.images = image_pipeline
+        self.notifications = notification_dispatcher
 
     async def is_user_admin(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -35,4 +58,83 @@ class BaseHandlers:
 
     async def send_message_to_all_admins(self, message_text: str):
         for admin_chat_id in self.admin_chat_ids:
-            await self.bot.send_message(chat_id=admin_chat_id, text=message_text)
+            await self.notify(admin_chat_id, message_text, parse_mode=None)
+
+    async def notify(
+        self,
+        chat_id,
+        text: str,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+        parse_mode: Optional[str] = "Markdown",
+    ) -> Optional[asyncio.Future]:
+        """
+        Queues a message for the notification dispatcher, which delivers it
+        in the background within Telegram's rate limits. The returned future
+        resolves to its Delivery, it is None if the queue was full.
+        """
+        return await self.notifications.submit(
+            self.bot, Notification(chat_id, text, reply_markup, parse_mode)
+        )
+
+    async def send_post_photo(
+        self,
+        chat_id,
+        post: Post,
+        caption: str,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+        accept: Optional[Callable[[PreparedImage], bool]] = None,
+    ) -> Optional[Message]:
+        """
+        Sends the image of a post with a caption, by file_id whenever one is
+        known, so Telegram does not download the image again.
+
+        The post's own images_id comes first, then a file_id cached for one of
+        its image URLs. A file_id that Telegram rejects is forgotten and the
+        next option is tried. Otherwise the image URLs go through the image
+        pipeline, the first usable one is uploaded and its file_id is cached
+        for the next time. Returns None if the post has no usable image.
+
+        With ``accept``, image URLs skip the file_id cache and every candidate
+        is downloaded, so that ``accept`` can see what the image looks like.
+        """
+        urls = post.images_url[:MAX_CANDIDATES]
+        cached_url, cached_file_id = None, None
+        for url in urls if accept is None else []:
+            cached_file_id = self.repo.get_image_file_id(url)
+            if cached_file_id:
+                cached_url = url
+                break
+        file_ids = post.images_id[:1]
+        if cached_file_id and cached_file_id not in file_ids:
+            file_ids.append(cached_file_id)
+
+        for file_id in file_ids:
+            try:
+                return await self.bot.send_photo(
+                    chat_id=chat_id,
+                    photo=file_id,
+                    caption=caption,
+                    parse_mode="Markdown",
+                    reply_markup=reply_markup,
+                )
+            except BadRequest as e:
+                if not is_rejected_file_id(e) or not urls:
+                    raise
+                print(f"Telegram rejected file_id {file_id}: {e}")
+                if file_id == cached_file_id:
+                    self.repo.delete_image_file_id(cached_url)
+
+        # Downloaded, checked and shrunk here, Telegram gets the bytes
+        image = await self.images.prepare_first(urls, accept)
+        if image is None:
+            print(f"None of the images of the post can be sent: {urls}")
+            return None
+        message = await self.bot.send_photo(
+            chat_id=chat_id,
+            photo=image.data,
+            caption=caption,
+            parse_mode="Markdown",
+            reply_markup=reply_markup,
+        )
+        self.repo.save_image_file_id(image.url, message.photo[-1].file_id)
+        return message
@@ -1,3 +1,6 @@
+from typing import Optional
+
+import asyncio
 import html
 import json
 import logging
@@ -5,17 +8,24 @@ import traceback
 
 from telegram import Bot
 from telegram.constants import ParseMode
-from telegram.ext import ApplicationBuilder, ContextTypes
+from telegram.ext import Application, ApplicationBuilder, ContextTypes
 from telegram.request import HTTPXRequest
 
-from channel_automation.interfaces.assistant_interface import IAssistant
+from channel_automation.interfaces.assistant_interface import IAsyncAssistant
 from channel_automation.interfaces.bot_service_interface import ITelegramBotService
-from channel_automation.interfaces.es_repository_interface import IESRepository
+from channel_automation.interfaces.es_repository_interface import IAsyncESRepository
+from channel_automation.interfaces.outbox_interface import IOutbox
 from channel_automation.interfaces.pg_repository_interface import IRepository
-from channel_automation.interfaces.search_interface import IImageSearch
-from channel_automation.models import NewsArticle
+from channel_automation.interfaces.search_interface import IAsyncImageSearch
+from channel_automation.models import DigestItem, NewsArticle
+from channel_automation.models.admin import DIGEST
+from channel_automation.search.composite import CompositeImageSearch
+from channel_automation.services.bot.notifications import notification_dispatcher
+from channel_automation.services.images import image_pipeline
+from channel_automation.services.outbox import ARTICLE, OutboxWorker
+from channel_automation.services.pregeneration import DraftPregenerator
 
-from . import admin, channel, post, source
+from . import admin, channel, digest, post, source
 
 # Enable logging
 logging.basicConfig(
@@ -31,21 +41,54 @@ class TelegramBotService(ITelegramBotService):
         self,
         token: str,
         repo: IRepository,
-        es_repo: IESRepository,
-        assistant: IAssistant,
-        search: IImageSearch,
+        es_repo: IAsyncESRepository,
+        assistant: IAsyncAssistant,
+        search: IAsyncImageSearch,
+        outbox: Optional[IOutbox] = None,
+        outbox_batch_size: int = 50,
+        outbox_poll_interval: float = 30.0,
+        digest_interval: float = 3600.0,
+        pregenerator: Optional[DraftPregenerator] = None,
+        stats_interval: float = 600.0,
     ):
         self.token = token
         self.repo = repo
         self.es_repo = es_repo
         self.assistant = assistant
         self.search = search
+        self.outbox = outbox
+        # Drafts new articles after they are announced
+        self.pregenerator = pregenerator
+        # Delivers what the crawler put in the outbox
+        self.outbox_worker = None
+        if outbox is not None:
+            self.outbox_worker = OutboxWorker(
+                outbox,
+                {ARTICLE: self.deliver_article},
+                batch_size=outbox_batch_size,
+                poll_interval=outbox_poll_interval,
+            )
+        # Admins in digest mode get the new articles every digest_interval
+        self.digest_interval = digest_interval
+        self.digest_handlers = None
+        self.digest_task: Optional[asyncio.Task] = None
+        self.post_handlers = None
+        self.application: Optional[Application] = None
+        # One line with the counters of every component, every stats_interval
+        self.stats_interval = stats_interval
+        self.stats_task: Optional[asyncio.Task] = None
         self.admin_chat_ids = [admin.user_id for admin in self.repo.get_active_admins()]
         request = HTTPXRequest(connection_pool_size=50, connect_timeout=80.0)
         self.bot = Bot(token=self.token, request=request)
 
     def run(self) -> None:
-        app = ApplicationBuilder().token(self.token).build()
+        app = (
+            ApplicationBuilder()
+            .token(self.token)
+            .post_init(self.post_init)
+            .post_shutdown(self.post_shutdown)
+            .build()
+        )
         app.add_error_handler(self.error_handler)
 
         admin.register(
@@ -75,7 +118,16 @@ class TelegramBotService(ITelegramBotService):
             self.search,
             self.admin_chat_ids,
         )
-        post.register(
+        self.post_handlers = post.register(
+            app,
+            self.bot,
+            self.repo,
+            self.es_repo,
+            self.assistant,
+            self.search,
+            self.admin_chat_ids,
+        )
+        self.digest_handlers = digest.register(
             app,
             self.bot,
             self.repo,
@@ -87,6 +139,113 @@ class TelegramBotService(ITelegramBotService):
 
         app.run_polling()
 
+    async def post_init(self, app: Application) -> None:
+        self.application = app
+        # The async ES client has to be created inside the bot's event loop
+        await self.es_repo.connect()
+        if self.pregenerator is not None:
+            await self.pregenerator.start()
+        if self.outbox_worker is not None:
+            await self.outbox_worker.start()
+        if self.digest_handlers is not None:
+            self.digest_task = asyncio.create_task(
+                self.digest_handlers.run(self.digest_interval)
+            )
+        self.stats_task = asyncio.create_task(self.report_stats(self.stats_interval))
+
+    async def post_shutdown(self, app: Application) -> None:
+        for task in (self.digest_task, self.stats_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self.outbox_worker is not None:
+            await self.outbox_worker.close()
+            await self.outbox.close()
+        if self.pregenerator is not None:
+            await self.pregenerator.close()
+        await notification_dispatcher.close()
+        await self.es_repo.close()
+        await self.assistant.close()
+        await self.search.close()
+        await image_pipeline.close()
+
+    async def report_stats(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                print(self.stats_line())
+            except Exception as e:
+                print(f"Error collecting stats: {e}")
+
+    def stats_line(self) -> str:
+        assistant = self.assistant.stats()
+        governor, parsing = assistant.governor, assistant.parsing
+        parts = [
+            f"assistant {governor.active} active, {governor.waiting} waiting, "
+            f"{governor.completed} completed, {parsing.failures} unparsable "
+            f"({parsing.repaired} repaired)"
+        ]
+        if assistant.cache is not None:
+            parts[
+                -1
+            ] += f", cache {assistant.cache.hits} hits, {assistant.cache.misses} misses"
+        if assistant.backends is not None:
+            parts[-1] += (
+                f", {assistant.backends.fallbacks} fallbacks, "
+                f"{assistant.backends.hedge_wins} of {assistant.backends.hedged} "
+                "hedges won"
+            )
+        if isinstance(self.search, CompositeImageSearch):
+            search = self.search.stats()
+            unavailable = [
+                name
+                for name, health in search.providers.items()
+                if not health.available
+            ]
+            parts.append(
+                f"search {search.searches} searches, {search.deadline_misses} "
+                f"at the deadline, unavailable: {', '.join(unavailable) or 'none'}"
+            )
+        images = image_pipeline.stats()
+        parts.append(
+            f"images {images.prepared} prepared, {images.failed_downloads} "
+            f"failed downloads, {images.rejected} rejected"
+        )
+        notifications = notification_dispatcher.stats()
+        parts.append(
+            f"notifications {notifications.sent} sent, {notifications.queued} "
+            f"queued, {notifications.rate_limited} rate limited, "
+            f"{notifications.failed} failed, {notifications.dropped} dropped"
+        )
+        if self.pregenerator is not None:
+            drafts = self.pregenerator.stats()
+            parts.append(
+                f"drafts {drafts.generated} generated, {drafts.queued} queued, "
+                f"{drafts.skipped_full + drafts.skipped_budget} skipped, "
+                f"{drafts.failed} failed, {drafts.budget.tokens} tokens today"
+            )
+        if self.outbox_worker is not None:
+            outbox = self.outbox_worker.stats()
+            parts.append(
+                f"outbox {outbox.delivered} delivered, {outbox.failed} failed "
+                f"in {outbox.batches} batches"
+            )
+        return "Bot stats: " + " | ".join(parts)
+
+    def instant_chat_ids(self) -> list[str]:
+        digest_chat_ids = {
+            admin.user_id
+            for admin in self.repo.get_active_admins()
+            if admin.notification_mode == DIGEST
+        }
+        return [
+            chat_id for chat_id in self.admin_chat_ids if chat_id not in digest_chat_ids
+        ]
+
     async def send_article_to_admin(self, article: NewsArticle) -> None:
         handlers = source.SourceHandlers(
             self.bot,
@@ -96,7 +255,41 @@ class TelegramBotService(ITelegramBotService):
             self.search,
             self.admin_chat_ids,
         )
-        await handlers.send_formatted_article(self.admin_chat_ids, article)
+        instant_chat_ids = self.instant_chat_ids()
+        for chat_id in self.admin_chat_ids:
+            if chat_id in instant_chat_ids:
+                continue
+            # Kept for the next digest, a repeated delivery is ignored
+            self.repo.add_digest_item(
+                DigestItem(
+                    chat_id=chat_id,
+                    article_id=article.id,
+                    title=article.title,
+                    source=article.source,
+                )
+            )
+        if instant_chat_ids and not await handlers.send_formatted_article(
+            instant_chat_ids, article, wait=True
+        ):
+            raise RuntimeError(f"Article {article.id} did not reach every admin")
+
+    async def deliver_article(self, payload: dict) -> None:
+        article = await self.es_repo.get_news_article_by_id(payload["article_id"])
+        if article is None:
+            print(f"Article {payload['article_id']} is gone, not sending it")
+            return
+        await self.send_article_to_admin(article)
+        if self.pregenerator is not None:
+            # Generated in the background, the outbox batch goes on meanwhile
+            await self.pregenerator.add_draft(article, self.send_draft)
+
+    async def send_draft(self, article: NewsArticle, post_index: int) -> None:
+        # Admins in digest mode find the draft behind the digest's button
+        chat_ids = self.instant_chat_ids()
+        if chat_ids and self.post_handlers is not None:
+            await self.post_handlers.send_draft(
+                self.application.chat_data, chat_ids, article, post_index
+            )
 
     async def error_handler(
         self, update: object, context: ContextTypes.DEFAULT_TYPE
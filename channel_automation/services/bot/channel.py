@@ -8,10 +8,10 @@ from telegram.ext import (
     filters,
 )
 
-from channel_automation.interfaces.assistant_interface import IAssistant
-from channel_automation.interfaces.es_repository_interface import IESRepository
+from channel_automation.interfaces.assistant_interface import IAsyncAssistant
+from channel_automation.interfaces.es_repository_interface import IAsyncESRepository
 from channel_automation.interfaces.pg_repository_interface import IRepository
-from channel_automation.interfaces.search_interface import IImageSearch
+from channel_automation.interfaces.search_interface import IAsyncImageSearch
 from channel_automation.models import ChannelInfo
 from channel_automation.services.bot import EDITING_BUTTON_TEXT
 
@@ -24,9 +24,9 @@ class ChannelHandlers(BaseHandlers):
         self,
         bot: Bot,
         repo: IRepository,
-        es_repo: IESRepository,
-        assistant: IAssistant,
-        search: IImageSearch,
+        es_repo: IAsyncESRepository,
+        assistant: IAsyncAssistant,
+        search: IAsyncImageSearch,
         admin_chat_ids: list,
     ) -> None:
         super().__init__(bot, repo, es_repo, assistant, search, admin_chat_ids)
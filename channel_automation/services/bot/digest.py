@@ -0,0 +1,236 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.ext import CallbackQueryHandler, ContextTypes
+from telegram.helpers import escape_markdown
+
+from channel_automation.interfaces.assistant_interface import IAsyncAssistant
+from channel_automation.interfaces.es_repository_interface import IAsyncESRepository
+from channel_automation.interfaces.pg_repository_interface import IRepository
+from channel_automation.interfaces.search_interface import IAsyncImageSearch
+from channel_automation.models import DigestItem
+
+from .base import BaseHandlers
+from .post import create_original_keyboard, create_variations_keyboard
+from .source import SourceHandlers
+
+# https://core.telegram.org/bots/api#sendmessage
+MAX_MESSAGE_LENGTH = 4096
+# One button per article, more would not fit on a phone screen
+DIGEST_PAGE_SIZE = 10
+MAX_TITLE_LENGTH = 200
+# Room for the header of a page
+HEADER_LENGTH = 64
+# Sent digests are kept this long for their buttons to keep working
+DIGEST_RETENTION = timedelta(days=30)
+# Unsent digests an article may be in, e.g. the admin blocked the bot
+MAX_DIGEST_ATTEMPTS = 5
+
+
+def format_digest_item(number: int, item: DigestItem) -> str:
+    title = item.title
+    if len(title) > MAX_TITLE_LENGTH:
+        title = title[: MAX_TITLE_LENGTH - 1] + "…"
+    return f"{number}. *{escape_markdown(title)}*\n[Read article]({item.source})"
+
+
+def paginate_digest(
+    items: list[DigestItem],
+    page_size: int = DIGEST_PAGE_SIZE,
+    max_length: int = MAX_MESSAGE_LENGTH,
+) -> list[list[tuple[int, DigestItem]]]:
+    """
+    Splits a digest into pages of at most ``page_size`` articles whose text
+    fits in one message.
+
+    Returns:
+        list[list[tuple[int, DigestItem]]]: The pages, with the number of
+            every article in the whole digest.
+    """
+    pages = [[]]
+    length = HEADER_LENGTH
+    for number, item in enumerate(items, 1):
+        item_length = len(format_digest_item(number, item)) + 2
+        if pages[-1] and (
+            len(pages[-1]) >= page_size or length + item_length > max_length
+        ):
+            pages.append([])
+            length = HEADER_LENGTH
+        pages[-1].append((number, item))
+        length += item_length
+    return pages
+
+
+def render_digest_page(
+    digest_id: int, items: list[DigestItem], page: int = 0
+) -> tuple[str, InlineKeyboardMarkup]:
+    """
+    Text and keyboard of one page of a digest: a "Generate post" button per
+    article and buttons to the neighbouring pages.
+    """
+    pages = paginate_digest(items)
+    page = max(0, min(page, len(pages) - 1))
+
+    noun = "article" if len(items) == 1 else "articles"
+    header = f"*{len(items)} new {noun}*"
+    if len(pages) > 1:
+        header += f", page {page + 1} of {len(pages)}"
+    text = "\n\n".join(
+        [header] + [format_digest_item(number, item) for number, item in pages[page]]
+    )
+
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                f"{number}. Generate post",
+                callback_data=f"digest_post:{item.article_id}",
+            )
+        ]
+        for number, item in pages[page]
+    ]
+    navigation = []
+    if page > 0:
+        navigation.append(
+            InlineKeyboardButton(
+                "« Previous", callback_data=f"digest_page:{digest_id}:{page - 1}"
+            )
+        )
+    if page < len(pages) - 1:
+        navigation.append(
+            InlineKeyboardButton(
+                "Next »", callback_data=f"digest_page:{digest_id}:{page + 1}"
+            )
+        )
+    if navigation:
+        keyboard.append(navigation)
+    return text, InlineKeyboardMarkup(keyboard)
+
+
+class DigestHandlers(BaseHandlers):
+    """
+    Collects the new articles of the admins in digest mode and sends them
+    every ``interval`` seconds in one paginated message per admin, instead of
+    a message per article.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        repo: IRepository,
+        es_repo: IAsyncESRepository,
+        assistant: IAsyncAssistant,
+        search: IAsyncImageSearch,
+        admin_chat_ids: list,
+    ) -> None:
+        super().__init__(bot, repo, es_repo, assistant, search, admin_chat_ids)
+
+    async def run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.send_due_digests()
+            except Exception as e:
+                print(f"Error sending digests: {e}")
+
+    async def send_due_digests(self) -> int:
+        """
+        Sends every admin the articles collected since their last digest.
+
+        Returns:
+            int: How many digests were delivered.
+        """
+        by_chat: dict[str, list[DigestItem]] = {}
+        for item in self.repo.get_pending_digest_items():
+            by_chat.setdefault(item.chat_id, []).append(item)
+        # Admins switched back to instant mode still get what they collected
+        active_chat_ids = {admin.user_id for admin in self.repo.get_active_admins()}
+        inactive_chat_ids = [
+            chat_id for chat_id in by_chat if chat_id not in active_chat_ids
+        ]
+        if inactive_chat_ids:
+            self.repo.delete_pending_digest_items(inactive_chat_ids)
+            for chat_id in inactive_chat_ids:
+                del by_chat[chat_id]
+        sent = await asyncio.gather(
+            *(self.send_digest(chat_id, items) for chat_id, items in by_chat.items())
+        )
+        self.repo.delete_digests_before(datetime.utcnow() - DIGEST_RETENTION)
+        return sum(sent)
+
+    async def send_digest(self, chat_id: str, items: list[DigestItem]) -> bool:
+        digest = self.repo.create_digest(chat_id, [item.id for item in items])
+        text, keyboard = render_digest_page(digest.id, items)
+        delivery = await self.notify(chat_id, text, keyboard)
+        if delivery is None or not (await delivery).delivered:
+            # Its articles go into the next digest instead, a few times
+            print(f"Could not send a digest to {chat_id}")
+            dropped = self.repo.delete_digest(digest.id, MAX_DIGEST_ATTEMPTS)
+            if dropped:
+                print(f"Gave up on {dropped} digest articles for {chat_id}")
+            return False
+        return True
+
+    async def digest_page_callback(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        query = update.callback_query
+        _, digest_id, page = query.data.split(":", 2)
+
+        items = self.repo.get_digest_items(int(digest_id))
+        if not items:
+            await query.answer("This digest has expired.")
+            return
+
+        text, keyboard = render_digest_page(int(digest_id), items, int(page))
+        await query.edit_message_text(
+            text, reply_markup=keyboard, parse_mode="Markdown"
+        )
+        await query.answer()
+
+    async def digest_post_callback(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        query = update.callback_query
+        _, article_id = query.data.split(":", 1)
+
+        article = await self.es_repo.get_news_article_by_id(article_id)
+        if article is None:
+            await query.answer("Article not found.")
+            return
+        await query.answer()
+
+        # The article on its own, with the buttons "Generate post" leads to
+        chat_id = query.message.chat_id
+        await self.bot.send_message(
+            chat_id=chat_id,
+            text=SourceHandlers.format_news_article(article),
+            reply_markup=create_variations_keyboard(article.id, 0, False),
+            parse_mode="Markdown",
+        )
+        if article.posts:
+            draft = article.posts[0]
+            message = await self.bot.send_message(
+                chat_id=chat_id,
+                text=draft.social_post,
+                reply_markup=create_original_keyboard(
+                    article.id, 0, draft.images_search
+                ),
+                parse_mode="Markdown",
+            )
+            # Replies with a photo or guidance go to the draft
+            context.chat_data[message.message_id] = {
+                "article_id": article.id,
+                "post_index": 0,
+            }
+
+
+def register(app, bot, repo, es_repo, assistant, search, admin_chat_ids):
+    logic = DigestHandlers(bot, repo, es_repo, assistant, search, admin_chat_ids)
+    app.add_handler(
+        CallbackQueryHandler(logic.digest_page_callback, pattern="^digest_page:")
+    )
+    app.add_handler(
+        CallbackQueryHandler(logic.digest_post_callback, pattern="^digest_post:")
+    )
+    return logic
@@ -0,0 +1,243 @@
+from typing import Callable, Optional, Union
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from telegram import Bot, InlineKeyboardMarkup, Message
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+# https://core.telegram.org/bots/faq#my-bot-is-hitting-limits-how-do-i-avoid-this
+GLOBAL_RATE = 25.0  # messages per second, Telegram allows about 30
+PER_CHAT_RATE = 1.0  # messages per second in one chat
+PER_CHAT_BURST = 5  # short bursts in one chat are tolerated
+MAX_ATTEMPTS = 3
+
+
+class RateLimiter:
+    """
+    Token bucket: ``rate`` acquisitions per second on average and at most
+    ``burst`` at once. Waiters are served in arrival order.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = self.clock()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class Notification:
+    chat_id: Union[int, str]
+    text: str
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+    parse_mode: Optional[str] = "Markdown"
+
+
+@dataclass
+class Delivery:
+    delivered: bool
+    message: Optional[Message] = None  # the sent message
+    # Telegram rejected the message, e.g. the admin blocked the bot, sending
+    # it again would fail the same way
+    permanent: bool = False
+
+
+@dataclass
+class DispatcherStats:
+    queued: int
+    chats: int  # chats with messages on the way
+    sent: int
+    rate_limited: int  # RetryAfter answers
+    retried: int
+    failed: int
+    dropped: int  # the queue was full
+
+
+class NotificationDispatcher:
+    """
+    Delivers bot messages in the background, so that whoever submits them,
+    e.g. the crawler, does not wait for Telegram.
+
+    Every chat has its own queue, delivered in order by its own task, so
+    chats are served concurrently while the messages of one chat arrive in
+    the order they were submitted. Sends are limited to ``per_chat_rate`` in
+    each chat and ``global_rate`` in total. A RetryAfter answer pauses all
+    deliveries for as long as Telegram asks, the flood limit is per bot.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = GLOBAL_RATE,
+        per_chat_rate: float = PER_CHAT_RATE,
+        per_chat_burst: int = PER_CHAT_BURST,
+        max_queue_size: int = 1000,
+        max_attempts: int = MAX_ATTEMPTS,
+    ) -> None:
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.max_queue_size = max_queue_size
+        self.max_attempts = max_attempts
+        self._global_limiter = RateLimiter(global_rate, burst=1)
+        self._chat_limiters: dict[Union[int, str], RateLimiter] = {}
+        self._queues: dict[Union[int, str], deque] = {}
+        self._tasks: dict[Union[int, str], asyncio.Task] = {}
+        self._queued = 0
+        self._paused_until = 0.0
+        self._sent = 0
+        self._rate_limited = 0
+        self._retried = 0
+        self._failed = 0
+        self._dropped = 0
+
+    def configure(
+        self, global_rate: float, per_chat_rate: float, max_queue_size: int
+    ) -> None:
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self.max_queue_size = max_queue_size
+        self._global_limiter = RateLimiter(global_rate, burst=1)
+        self._chat_limiters = {}
+
+    async def submit(
+        self, bot: Bot, notification: Notification
+    ) -> Optional[asyncio.Future]:
+        """
+        Queues a message. Never waits for Telegram.
+
+        Returns:
+            Optional[asyncio.Future]: Resolves to a Delivery once the message
+                is delivered or given up on. None if the queue is full and the
+                message was dropped.
+        """
+        if self._queued >= self.max_queue_size:
+            self._dropped += 1
+            print(
+                f"Notification queue is full, dropping a message to {notification.chat_id}"
+            )
+            return None
+        chat_id = notification.chat_id
+        delivered = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(chat_id, deque()).append((bot, notification, delivered))
+        self._queued += 1
+        if chat_id not in self._tasks:
+            self._tasks[chat_id] = asyncio.create_task(self._deliver(chat_id))
+        return delivered
+
+    async def _deliver(self, chat_id: Union[int, str]) -> None:
+        queue = self._queues[chat_id]
+        try:
+            while queue:
+                bot, notification, delivered = queue[0]
+                result = await self._send(bot, notification)
+                queue.popleft()
+                self._queued -= 1
+                delivered.set_result(result)
+        finally:
+            # Nothing is awaited between the last check and here, a message
+            # submitted meanwhile would have found this task still running
+            self._queued -= len(queue)
+            for _, _, delivered in queue:
+                if not delivered.done():
+                    delivered.set_result(Delivery(False))
+            del self._queues[chat_id]
+            del self._tasks[chat_id]
+
+    async def _send(self, bot: Bot, notification: Notification) -> Delivery:
+        chat_limiter = self._chat_limiters.get(notification.chat_id)
+        if chat_limiter is None:
+            chat_limiter = RateLimiter(self.per_chat_rate, self.per_chat_burst)
+            self._chat_limiters[notification.chat_id] = chat_limiter
+
+        for attempt in range(1, self.max_attempts + 1):
+            await chat_limiter.acquire()
+            await self._global_limiter.acquire()
+            while (pause := self._paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(pause)
+            try:
+                message = await bot.send_message(
+                    chat_id=notification.chat_id,
+                    text=notification.text,
+                    reply_markup=notification.reply_markup,
+                    parse_mode=notification.parse_mode,
+                )
+                self._sent += 1
+                return Delivery(True, message)
+            except RetryAfter as e:
+                self._rate_limited += 1
+                print(f"Telegram asked to wait {e.retry_after}s before sending more")
+                self._paused_until = max(
+                    self._paused_until, time.monotonic() + e.retry_after
+                )
+            except (BadRequest, Forbidden) as e:
+                # The message itself is wrong or the chat is closed to the
+                # bot, sending it again won't help
+                self._failed += 1
+                print(f"Error sending a message to {notification.chat_id}: {e}")
+                return Delivery(False, permanent=True)
+            except NetworkError as e:
+                print(f"Network error sending a message to {notification.chat_id}: {e}")
+                await asyncio.sleep(2**attempt)
+            except Exception as e:
+                self._failed += 1
+                print(f"Error sending a message to {notification.chat_id}: {e}")
+                return Delivery(False)
+            if attempt < self.max_attempts:
+                self._retried += 1
+        self._failed += 1
+        print(f"Giving up on a message to {notification.chat_id}")
+        return Delivery(False)
+
+    async def join(self) -> None:
+        """
+        Waits until every queued message is delivered or given up on.
+        """
+        while self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def close(self, timeout: float = 10.0) -> None:
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Dropping {self._queued} undelivered notifications")
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def stats(self) -> DispatcherStats:
+        return DispatcherStats(
+            queued=self._queued,
+            chats=len(self._tasks),
+            sent=self._sent,
+            rate_limited=self._rate_limited,
+            retried=self._retried,
+            failed=self._failed,
+            dropped=self._dropped,
+        )
+
+
+# Shared by every handler, deliveries of the whole process are rate limited
+notification_dispatcher = NotificationDispatcher()
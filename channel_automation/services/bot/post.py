@@ -1,21 +1,29 @@
-from typing import Optional
+from typing import Mapping, Optional
 
 import asyncio
+import copy
 from urllib.parse import quote
 
 from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import CallbackQueryHandler, ContextTypes, MessageHandler, filters
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
 
-from channel_automation.interfaces.assistant_interface import IAssistant
-from channel_automation.interfaces.es_repository_interface import IESRepository
+from channel_automation.interfaces.assistant_interface import IAsyncAssistant
+from channel_automation.interfaces.es_repository_interface import IAsyncESRepository
 from channel_automation.interfaces.pg_repository_interface import IRepository
-from channel_automation.interfaces.search_interface import IImageSearch
-from channel_automation.models import ChannelInfo
+from channel_automation.interfaces.search_interface import IAsyncImageSearch
+from channel_automation.models import ChannelInfo, NewsArticle
+from channel_automation.services.image_index import ImageFingerprintIndex
+from channel_automation.services.images import MAX_CANDIDATES, PreparedImage
 
 from .base import BaseHandlers
+from .streaming import StreamingMessage
 
 ATTEMPTS_GENERATE = 3
+# Appended to the callback data of buttons that must skip the completion cache
+FRESH = "fresh"
+# Templates drafted together by the "All variations" button
+ALL_VARIATIONS = [1, 2, 3]
 
 
 async def send_error_message(retry_state):
@@ -36,6 +44,29 @@ def before_sleep_callback(retry_state):
     )
 
 
+def queue_position_reporter(message):
+    """
+    Returns a callback that keeps the admin informed about their place in the
+    generation queue, editing a single status message instead of sending many.
+    """
+    status_message = None
+
+    async def report(position: int) -> None:
+        nonlocal status_message
+        if position == 0:
+            text = "Your request is being processed now..."
+        else:
+            text = f"The assistant is busy, you are #{position} in the queue."
+        if status_message is None:
+            if position == 0:
+                return  # never had to wait, nothing to report
+            status_message = await message.reply_text(text)
+        else:
+            await status_message.edit_text(text)
+
+    return report
+
+
 def create_channel_keyboard(
     article_id: str, post_index: int, channels: list[ChannelInfo]
 ) -> InlineKeyboardMarkup:
@@ -52,8 +83,39 @@ def create_channel_keyboard(
     return InlineKeyboardMarkup([channel_buttons, [back_button]])
 
 
+def create_flip_buttons(
+    article_id: str, post_index: int, first_index: int, count: int
+) -> list[InlineKeyboardButton]:
+    """
+    Buttons to flip between drafts generated together, stored as the posts
+    first_index .. first_index + count - 1 of the article.
+    """
+    position = post_index - first_index
+    previous_position = (position - 1) % count
+    next_position = (position + 1) % count
+    return [
+        InlineKeyboardButton(
+            f"◀ {previous_position + 1}/{count}",
+            callback_data=(
+                f"flip:{article_id}:{first_index + previous_position}:"
+                f"{first_index}:{count}"
+            ),
+        ),
+        InlineKeyboardButton(
+            f"{next_position + 1}/{count} ▶",
+            callback_data=(
+                f"flip:{article_id}:{first_index + next_position}:"
+                f"{first_index}:{count}"
+            ),
+        ),
+    ]
+
+
 def create_original_keyboard(
-    article_id: str, post_index: int, search_terms: Optional[str] = None
+    article_id: str,
+    post_index: int,
+    search_terms: Optional[str] = None,
+    variations: Optional[tuple[int, int]] = None,
 ) -> InlineKeyboardMarkup:
     buttons = [
         [
@@ -88,24 +150,42 @@ def create_original_keyboard(
             )
         )
 
+    if variations and variations[1] > 1:
+        first_index, count = variations
+        buttons.insert(
+            0, create_flip_buttons(article_id, post_index, first_index, count)
+        )
+
     return InlineKeyboardMarkup(buttons)
 
 
 def create_variations_keyboard(
-    article_id: str, post_index: int, back=True
+    article_id: str, post_index: int, back=True, fresh=False
 ) -> InlineKeyboardMarkup:
+    """
+    Template buttons. With ``fresh`` the posts are generated anew instead of
+    being taken from the completion cache, as "Regenerate" asks for.
+    """
+    suffix = f":{FRESH}" if fresh else ""
     keyboard_layout = [
         [
             InlineKeyboardButton(
-                "Variation One", callback_data=f"variation_one:{article_id}"
+                "Variation One", callback_data=f"variation_one:{article_id}{suffix}"
             ),
             InlineKeyboardButton(
-                "Variation Two", callback_data=f"variation_two:{article_id}"
+                "Variation Two", callback_data=f"variation_two:{article_id}{suffix}"
             ),
         ],
         [
             InlineKeyboardButton(
-                "Variation Event", callback_data=f"variation_event:{article_id}"
+                "Variation Event",
+                callback_data=f"variation_event:{article_id}{suffix}",
+            ),
+        ],
+        [
+            InlineKeyboardButton(
+                "All variations",
+                callback_data=f"all_variations:{article_id}{suffix}",
             ),
         ],
     ]
@@ -126,12 +206,13 @@ class PostHandlers(BaseHandlers):
         self,
         bot: Bot,
         repo: IRepository,
-        es_repo: IESRepository,
-        assistant: IAssistant,
-        search: IImageSearch,
+        es_repo: IAsyncESRepository,
+        assistant: IAsyncAssistant,
+        search: IAsyncImageSearch,
         admin_chat_ids: list,
     ) -> None:
         super().__init__(bot, repo, es_repo, assistant, search, admin_chat_ids)
+        self.fingerprints = ImageFingerprintIndex(repo)
 
     async def send_post(
         self,
@@ -139,40 +220,49 @@ class PostHandlers(BaseHandlers):
         chat_id,
         article_id: str,
         post_index: int,
+        variations: Optional[tuple[int, int]] = None,
+        preview: Optional[StreamingMessage] = None,
+        avoid_duplicates: bool = False,
     ) -> Optional[str]:
-        news_article = self.es_repo.get_news_article_by_id(article_id)
+        """
+        Sends a post with its keyboard. A streamed preview of the post becomes
+        the post itself, unless the post has a photo: a text message cannot
+        turn into a photo, so the preview is replaced.
+
+        With ``avoid_duplicates``, image candidates that look like a recently
+        published image are passed over.
+        """
+        news_article = await self.es_repo.get_news_article_by_id(article_id)
         if news_article:
             post = news_article.posts[post_index]
             if post:
-                await self.bot.send_message(
-                    chat_id=chat_id,
-                    text=f"Here's the generated post for article: *{news_article.title}*",
-                    parse_mode="Markdown",
-                )
+                if preview is None:
+                    await self.bot.send_message(
+                        chat_id=chat_id,
+                        text=f"Here's the generated post for article: *{news_article.title}*",
+                        parse_mode="Markdown",
+                    )
                 print(f"Post: {post}")
                 try:
                     keyboard = create_original_keyboard(
-                        article_id, post_index, post.images_search
+                        article_id, post_index, post.images_search, variations
                     )
-                    if post.images_id:
-                        # Use the first image_id from images_id list
-                        image_to_use = post.images_id[0]
-                    elif post.images_url:
-                        # Use the first image_url from images_url list
-                        image_to_use = post.images_url[0]
-                    else:
-                        image_to_use = None
-
                     image_id = None
-                    if image_to_use:
-                        sent_message = await self.bot.send_photo(
-                            chat_id=chat_id,
-                            photo=image_to_use,
-                            caption=f"{post.social_post}",
-                            parse_mode="Markdown",
-                            reply_markup=keyboard,
+                    sent_message = None
+                    if post.images_id or post.images_url:
+                        sent_message = await self.send_post_photo(
+                            chat_id,
+                            post,
+                            f"{post.social_post}",
+                            keyboard,
+                            self.is_new_image if avoid_duplicates else None,
                         )
+                    if sent_message is not None:
                         image_id = sent_message.photo[-1].file_id
+                        if preview is not None:
+                            await preview.delete()
+                    elif preview is not None:
+                        sent_message = await preview.finish(post.social_post, keyboard)
                     else:
                         sent_message = await self.bot.send_message(
                             chat_id=chat_id,
@@ -209,30 +299,108 @@ class PostHandlers(BaseHandlers):
         query,
         article_id: str,
         variation_number: int,
+        use_cache: bool = True,
     ) -> None:
         print(article_id)
-        news_article = self.es_repo.get_news_article_by_id(article_id)
+        news_article = await self.es_repo.get_news_article_by_id(article_id)
         if not news_article:
             await query.message.reply_text("Article not found.")
             return
 
-        await query.message.reply_text(
+        placeholder = await query.message.reply_text(
             "Processing the article, this may take up to a few minutes..."
         )
+        preview = StreamingMessage(placeholder)
         try:
-            post = self.assistant.generate_post(
+            post = await self.assistant.generate_post(
                 news_article,
                 variation_number,
+                on_queued=queue_position_reporter(query.message),
+                on_progress=preview.update,
+                use_cache=use_cache,
             )
-            if post:
-                news_article.posts.append(post)
-                post_index = len(news_article.posts) - 1
         except Exception as e:
             print(e)
             raise e
 
         print(f"Generated post: {post.social_post}")
 
+        await self.add_first_image(query, news_article, [post])
+        post_index = await self.es_repo.append_post(news_article, post)
+        await self.send_generated_post(
+            context, query, news_article, post_index, preview=preview
+        )
+
+    @retry(
+        stop=stop_after_attempt(ATTEMPTS_GENERATE),
+        wait=wait_fixed(3),
+        retry=retry_if_exception_type(Exception),
+        before_sleep=before_sleep_callback,
+    )
+    async def generate_post_variations(
+        self,
+        context: ContextTypes.DEFAULT_TYPE,
+        query,
+        article_id: str,
+        use_cache: bool = True,
+    ) -> None:
+        news_article = await self.es_repo.get_news_article_by_id(article_id)
+        if not news_article:
+            await query.message.reply_text("Article not found.")
+            return
+
+        await query.message.reply_text(
+            "Drafting all variations at once, this may take up to a few minutes..."
+        )
+        posts = await self.assistant.generate_post_variations(
+            news_article,
+            ALL_VARIATIONS,
+            on_queued=queue_position_reporter(query.message),
+            use_cache=use_cache,
+        )
+        posts = list(posts.values())
+
+        await self.add_first_image(query, news_article, posts)
+        first_index = await self.es_repo.append_posts(news_article, posts)
+        await self.send_generated_post(
+            context, query, news_article, first_index, (first_index, len(posts))
+        )
+
+    def is_new_image(self, image: PreparedImage) -> bool:
+        try:
+            similar = self.fingerprints.find_similar(image.phash)
+        except Exception as e:
+            print(f"Could not look up similar images: {e}")
+            return True
+        if similar:
+            channels = ", ".join(sorted({item.channel_id for item in similar}))
+            print(f"Skipping image {image.url}, already published in {channels}")
+        return not similar
+
+    async def remember_published_image(self, channel_id: str, message) -> None:
+        # Hashes what Telegram actually shows, whatever the photo came from
+        try:
+            file = await self.bot.get_file(message.photo[-1].file_id)
+            data = await file.download_as_bytearray()
+            phash = await self.images.fingerprint(bytes(data))
+            self.fingerprints.add(channel_id, phash)
+        except Exception as e:
+            print(f"Could not fingerprint the published image: {e}")
+
+    async def add_first_image(self, query, news_article, posts: list) -> None:
+        if not await self.find_first_image(news_article, posts):
+            await query.message.reply_text(
+                "Something went wrong with searching images. You can add image manually later."
+            )
+
+    async def find_first_image(self, news_article, posts: list) -> bool:
+        """
+        Adds image candidates to the posts: the article's own images, or the
+        search results for the first post's images_search.
+
+        Returns:
+            bool: False if the images could not be searched.
+        """
         try:
             images = []
             if (
@@ -241,25 +409,96 @@ class PostHandlers(BaseHandlers):
             ):
                 images = news_article.images_url
             else:
-                images = self.search.search_images(post.images_search, 25)
-            if images:
-                first_image_url = images[0]
-                news_article.posts[post_index].images_url.append(first_image_url)
+                images = await self.search.search_images(posts[0].images_search, 25)
+            # A few candidates, the first that downloads and decodes is sent
+            for post in posts:
+                post.images_url.extend(images[:MAX_CANDIDATES])
+            return True
         except Exception as e:
             print(e)
-            await query.message.reply_text(
-                "Something went wrong with searching images. You can add image manually later."
-            )
+            return False
+
+    async def send_draft(
+        self,
+        chat_data: Mapping[int, dict],
+        chat_ids: list[str],
+        news_article: NewsArticle,
+        post_index: int,
+    ) -> None:
+        """
+        Sends a draft generated in the background to the admins, with an
+        image like a generated post. Every draft message is registered in
+        ``chat_data``, the application's chat data, so that replying to it
+        with a photo or guidance works as for a generated post.
+        """
+        post = news_article.posts[post_index]
+        if not post.images_id and not post.images_url:
+            await self.find_first_image(news_article, [post])
+        keyboard = create_original_keyboard(
+            news_article.id, post_index, post.images_search
+        )
+        for chat_id in chat_ids:
+            try:
+                message = None
+                if post.images_id or post.images_url:
+                    message = await self.send_post_photo(
+                        chat_id, post, post.social_post, keyboard
+                    )
+                if message is None:
+                    delivery = await self.notify(chat_id, post.social_post, keyboard)
+                    if delivery is not None:
+                        message = (await delivery).message
+                elif not post.images_id:
+                    # The other admins get the photo Telegram already has
+                    post.images_id = [message.photo[-1].file_id]
+            except Exception as e:
+                print(f"Error sending the draft of {news_article.source}: {e}")
+                continue
+            if message is not None:
+                chat_data[int(chat_id)][message.message_id] = {
+                    "article_id": news_article.id,
+                    "post_index": post_index,
+                }
+        if post.images_id or post.images_url:
+            try:
+                await self.es_repo.set_post_images(
+                    news_article,
+                    post_index,
+                    images_id=post.images_id,
+                    images_url=post.images_url,
+                )
+            except Exception as e:
+                print(f"Error saving the images of the draft: {e}")
 
-        self.es_repo.update_news_article(news_article)
+    async def send_generated_post(
+        self,
+        context,
+        query,
+        news_article,
+        post_index: int,
+        variations: Optional[tuple[int, int]] = None,
+        preview: Optional[StreamingMessage] = None,
+    ) -> None:
+        article_id = news_article.id
         chat_id = query.message.chat_id
-        image_id = await self.send_post(context, chat_id, article_id, post_index)
+        image_id = await self.send_post(
+            context,
+            chat_id,
+            article_id,
+            post_index,
+            variations,
+            preview,
+            avoid_duplicates=True,
+        )
+        # Drafts generated together share the photo that was sent
+        first_index, count = variations or (post_index, 1)
         try:
             if image_id:
-                news_article.posts[post_index].images_id = [
-                    image_id
-                ]  # rewrite images_id with the new image_id
-                self.es_repo.update_news_article(news_article)
+                # rewrite images_id with the new image_id
+                for index in range(first_index, first_index + count):
+                    await self.es_repo.set_post_images(
+                        news_article, index, images_id=[image_id]
+                    )
         except Exception as e:
             print(e)
             await query.message.reply_text(
@@ -273,22 +512,28 @@ class PostHandlers(BaseHandlers):
         before_sleep=before_sleep_callback,  # Custom message function
     )
     async def fancy_post(self, context, query, article_id: str, post_index: int):
-        news_article = self.es_repo.get_news_article_by_id(article_id)
+        news_article = await self.es_repo.get_news_article_by_id(article_id)
         if not news_article:
             await query.message.reply_text("Article not found.")
             return
 
-        await query.message.reply_text(
+        placeholder = await query.message.reply_text(
             "Making the post *fancy*...", parse_mode="Markdown"
         )
-        post = news_article.posts[post_index]
-        fancy_post = self.assistant.make_post_fancy(post)
+        preview = StreamingMessage(placeholder)
+        # The assistant edits the post in place, keep the original intact
+        post = copy.deepcopy(news_article.posts[post_index])
+        fancy_post = await self.assistant.make_post_fancy(
+            post,
+            on_queued=queue_position_reporter(query.message),
+            on_progress=preview.update,
+        )
         print(f"Fancy post: {fancy_post}")
         if fancy_post:
-            news_article.posts.append(fancy_post)
-            post_index = len(news_article.posts) - 1
-            self.es_repo.update_news_article(news_article)
-            await self.send_post(context, query.message.chat_id, article_id, post_index)
+            post_index = await self.es_repo.append_post(news_article, fancy_post)
+            await self.send_post(
+                context, query.message.chat_id, article_id, post_index, preview=preview
+            )
 
     @retry(
         stop=stop_after_attempt(ATTEMPTS_GENERATE),  # Stop after 5 attempts
@@ -299,22 +544,67 @@ class PostHandlers(BaseHandlers):
     async def guidence_post(
         self, context, message, article_id: str, post_index: int, guidence: str
     ):
-        news_article = self.es_repo.get_news_article_by_id(article_id)
+        news_article = await self.es_repo.get_news_article_by_id(article_id)
         if not news_article:
             await message.reply_text("Article not found.")
             return
 
-        await message.reply_text(
+        placeholder = await message.reply_text(
             "Applying your guidence to this post", parse_mode="Markdown"
         )
-        post = news_article.posts[post_index]
-        guided_post = self.assistant.post_guidence(post, guidence)
+        preview = StreamingMessage(placeholder)
+        post = copy.deepcopy(news_article.posts[post_index])
+        guided_post = await self.assistant.post_guidence(
+            post,
+            guidence,
+            on_queued=queue_position_reporter(message),
+            on_progress=preview.update,
+        )
         print(f"Guided post: {guided_post}")
         if guided_post:
-            news_article.posts.append(guided_post)
-            post_index = len(news_article.posts) - 1
-            self.es_repo.update_news_article(news_article)
-            await self.send_post(context, message.chat.id, article_id, post_index)
+            post_index = await self.es_repo.append_post(news_article, guided_post)
+            await self.send_post(
+                context, message.chat.id, article_id, post_index, preview=preview
+            )
+
+    async def all_variations_callback(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        query = update.callback_query
+        _, article_id, *flags = query.data.split(":")
+        print(f"Generating all variations for article: {article_id}")
+
+        await self.generate_post_variations(
+            context, query, article_id, use_cache=FRESH not in flags
+        )
+
+    async def flip_variation_callback(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        query = update.callback_query
+        _, article_id, post_index, first_index, count = query.data.split(":", 4)
+        post_index, first_index, count = int(post_index), int(first_index), int(count)
+
+        article = await self.es_repo.get_news_article_by_id(article_id)
+        post = article.posts[post_index]
+        keyboard = create_original_keyboard(
+            article_id, post_index, post.images_search, (first_index, count)
+        )
+        # The drafts were stored together, flipping needs no LLM call
+        if query.message.photo:
+            await query.edit_message_caption(
+                caption=post.social_post, parse_mode="Markdown", reply_markup=keyboard
+            )
+        else:
+            await query.edit_message_text(
+                text=post.social_post, parse_mode="Markdown", reply_markup=keyboard
+            )
+        # Photo and text replies apply to the draft on screen
+        context.chat_data[query.message.message_id] = {
+            "article_id": article_id,
+            "post_index": post_index,
+        }
+        await query.answer()
 
     async def make_post_fancy_callback(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -330,10 +620,16 @@ class PostHandlers(BaseHandlers):
         self, update: Update, context: ContextTypes.DEFAULT_TYPE, variation_number: int
     ) -> None:
         query = update.callback_query
-        _, article_id = query.data.split(":", 1)
+        _, article_id, *flags = query.data.split(":")
         print(f"Chosen variation: {variation_number} for article: {article_id}")
 
-        await self.generate_post(context, query, article_id, variation_number)
+        await self.generate_post(
+            context,
+            query,
+            article_id,
+            variation_number,
+            use_cache=FRESH not in flags,
+        )
 
     async def regenerate_post_callback(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -341,7 +637,8 @@ class PostHandlers(BaseHandlers):
         query = update.callback_query
         _, article_id, post_index = query.data.split(":", 2)
 
-        new_keyboard = create_variations_keyboard(article_id, post_index)
+        # The admin did not like the post, a cached answer would repeat it
+        new_keyboard = create_variations_keyboard(article_id, post_index, fresh=True)
         await query.edit_message_reply_markup(reply_markup=new_keyboard)
 
     async def generate_post_callback(
@@ -376,7 +673,7 @@ class PostHandlers(BaseHandlers):
         print(f"Publishing post {post_index} for article {article_id}")
 
         try:
-            article = self.es_repo.get_news_article_by_id(article_id)
+            article = await self.es_repo.get_news_article_by_id(article_id)
             post = article.posts[post_index]
 
             # Retrieve the ChannelInfo by channel_id
@@ -391,13 +688,11 @@ class PostHandlers(BaseHandlers):
                 caption = f"{caption}\n\n{channel_info.bottom_text}"
 
             # Publish the article in the specified channel
-            if post.images_id:
-                await self.bot.send_photo(
-                    chat_id=channel_id,
-                    photo=post.images_id[0],
-                    caption=caption,
-                    parse_mode="Markdown",
-                )
+            sent_message = None
+            if post.images_id or post.images_url:
+                sent_message = await self.send_post_photo(channel_id, post, caption)
+            if sent_message is not None:
+                await self.remember_published_image(channel_id, sent_message)
             else:
                 await self.bot.send_message(
                     chat_id=channel_id,
@@ -426,7 +721,7 @@ class PostHandlers(BaseHandlers):
         _, article_id, post_index = query.data.split(":", 2)
         post_index = int(post_index)
 
-        article = self.es_repo.get_news_article_by_id(article_id)
+        article = await self.es_repo.get_news_article_by_id(article_id)
         post = article.posts[post_index]
 
         # Update the inline keyboard markup using the new create_original_keyboard function
@@ -451,9 +746,10 @@ class PostHandlers(BaseHandlers):
                     if data:
                         article_id = data.get("article_id")
                         post_index = data.get("post_index")
-                        article = self.es_repo.get_news_article_by_id(article_id)
-                        article.posts[post_index].images_id = [image_id]
-                        self.es_repo.update_news_article(article)
+                        article = await self.es_repo.get_news_article_by_id(article_id)
+                        await self.es_repo.set_post_images(
+                            article, post_index, images_id=[image_id]
+                        )
                         await self.send_post(
                             context, message.chat_id, article_id, post_index
                         )
@@ -531,6 +827,12 @@ def register(app, bot, repo, es_repo, assistant, search, admin_chat_ids):
             pattern="^variation_event:",
         )
     )
+    app.add_handler(
+        CallbackQueryHandler(logic.all_variations_callback, pattern="^all_variations:")
+    )
+    app.add_handler(
+        CallbackQueryHandler(logic.flip_variation_callback, pattern="^flip:")
+    )
     app.add_handler(
         CallbackQueryHandler(logic.make_post_fancy_callback, pattern="^make_fancy:")
     )
@@ -549,3 +851,4 @@ def register(app, bot, repo, es_repo, assistant, search, admin_chat_ids):
     app.add_handler(
         MessageHandler(filters.TEXT & filters.REPLY, logic.handle_text_reply)
     )
+    return logic
@@ -1,38 +1,59 @@
+from typing import Union
+
+import asyncio
+
 from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, Update
-from telegram.ext import CommandHandler, ContextTypes, MessageHandler, filters
+from telegram.ext import (
+    CallbackQueryHandler,
+    CommandHandler,
+    ContextTypes,
+    MessageHandler,
+    filters,
+)
+from telegram.helpers import escape_markdown
 
-from channel_automation.interfaces.assistant_interface import IAssistant
-from channel_automation.interfaces.es_repository_interface import IESRepository
+from channel_automation.interfaces.assistant_interface import IAsyncAssistant
+from channel_automation.interfaces.es_repository_interface import IAsyncESRepository
 from channel_automation.interfaces.pg_repository_interface import IRepository
-from channel_automation.interfaces.search_interface import IImageSearch
-from channel_automation.models import NewsArticle, Source
+from channel_automation.interfaces.search_interface import IAsyncImageSearch
+from channel_automation.models import ArticlePage, ArticleSummary, NewsArticle, Source
 
 from .base import BaseHandlers
 from .utils import admin_required
 
+LATEST_NEWS_PAGE_SIZE = 10
+
 
 class SourceHandlers(BaseHandlers):
     def __init__(
         self,
         bot: Bot,
         repo: IRepository,
-        es_repo: IESRepository,
-        assistant: IAssistant,
-        search: IImageSearch,
+        es_repo: IAsyncESRepository,
+        assistant: IAsyncAssistant,
+        search: IAsyncImageSearch,
         admin_chat_ids: list,
     ) -> None:
         super().__init__(bot, repo, es_repo, assistant, search, admin_chat_ids)
 
     @staticmethod
-    def format_news_article(article: NewsArticle) -> str:
-        return f"*{article.title}*\n[Read article]({article.source})"
+    def format_news_article(article: Union[NewsArticle, ArticleSummary]) -> str:
+        return f"*{escape_markdown(article.title)}*\n[Read article]({article.source})"
 
     async def send_formatted_article(
         self,
         chat_ids: list[str],
-        article: NewsArticle,
+        article: Union[NewsArticle, ArticleSummary],
         generate_post_button: bool = True,
-    ) -> None:
+        wait: bool = False,
+    ) -> bool:
+        """
+        Queues an article for every chat.
+
+        With ``wait``, returns only once the messages were delivered, and
+        False if any of them is worth sending again. Messages Telegram
+        rejected, e.g. because the admin blocked the bot, are not.
+        """
         formatted_article = self.format_news_article(article)
 
         reply_markup = None
@@ -47,13 +68,19 @@ class SourceHandlers(BaseHandlers):
                 ]
             )
 
-        for admin_chat_id in chat_ids:
-            await self.bot.send_message(
-                chat_id=admin_chat_id,
-                text=formatted_article,
-                reply_markup=reply_markup,
-                parse_mode="Markdown",
-            )
+        # Queued, no chat waits for the others
+        deliveries = [
+            await self.notify(admin_chat_id, formatted_article, reply_markup)
+            for admin_chat_id in chat_ids
+        ]
+        if not wait:
+            return True
+        if None in deliveries:
+            return False
+        return all(
+            delivery.delivered or delivery.permanent
+            for delivery in await asyncio.gather(*deliveries)
+        )
 
     @admin_required
     async def add_source(
@@ -87,14 +114,51 @@ class SourceHandlers(BaseHandlers):
     async def get_latest_news(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
-        latest_articles = self.es_repo.get_latest_news(10)
-        if not latest_articles:
+        page = await self.es_repo.list_latest_articles(LATEST_NEWS_PAGE_SIZE)
+        if not page.articles:
             await update.message.reply_text("No articles found.")
             return
 
-        for article in latest_articles:
+        await self.send_latest_news_page(update.effective_chat.id, page)
+
+    async def older_news_callback(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        query = update.callback_query
+        _, cursor = query.data.split(":", 1)
+        await query.edit_message_reply_markup(reply_markup=None)
+
+        page = await self.es_repo.list_latest_articles(
+            LATEST_NEWS_PAGE_SIZE, cursor=cursor
+        )
+        if not page.articles:
+            await query.message.reply_text("No older articles found.")
+            return
+
+        await self.send_latest_news_page(query.message.chat_id, page)
+
+    async def send_latest_news_page(self, chat_id, page: ArticlePage) -> None:
+        for article in page.articles:
             await self.send_formatted_article(
-                [update.effective_chat.id], article, generate_post_button=True
+                [chat_id], article, generate_post_button=True
+            )
+
+        if page.next_cursor:
+            # Queued as well, to come after the articles
+            await self.notify(
+                chat_id,
+                "Want to see more?",
+                InlineKeyboardMarkup(
+                    [
+                        [
+                            InlineKeyboardButton(
+                                "Older news",
+                                callback_data=f"older_news:{page.next_cursor}",
+                            )
+                        ]
+                    ]
+                ),
+                parse_mode=None,
             )
 
 
@@ -108,3 +172,6 @@ def register(app, bot, repo, es_repo, assistant, search, admin_chat_ids):
     app.add_handler(
         MessageHandler(filters.Regex(r"^Latest News$"), logic.get_latest_news)
     )
+    app.add_handler(
+        CallbackQueryHandler(logic.older_news_callback, pattern="^older_news:")
+    )
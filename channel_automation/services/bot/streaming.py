@@ -0,0 +1,76 @@
+from typing import Callable, Optional
+
+import asyncio
+import time
+
+from telegram import InlineKeyboardMarkup, Message
+from telegram.constants import MessageLimit
+from telegram.error import BadRequest, RetryAfter
+
+# Telegram allows about one edit per second in a chat, leave some headroom
+MIN_EDIT_INTERVAL = 1.5
+
+
+class StreamingMessage:
+    """
+    Shows a post while the assistant is still writing it by editing a
+    placeholder message.
+
+    Edits are throttled to one per ``min_interval`` seconds; text that arrives
+    in between is shown with the next edit or by ``finish``. Partial text is
+    sent without parse mode because unfinished Markdown would be rejected.
+    """
+
+    def __init__(
+        self,
+        message: Message,
+        min_interval: float = MIN_EDIT_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.message = message
+        self.min_interval = min_interval
+        self.clock = clock
+        self._shown = message.text
+        self._next_edit_at = 0.0
+        self.edits = 0
+
+    async def update(self, text: str) -> None:
+        text = text.strip()[: MessageLimit.MAX_TEXT_LENGTH]
+        if not text or text == self._shown or self.clock() < self._next_edit_at:
+            return
+        await self._edit(text)
+
+    async def finish(
+        self, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None
+    ) -> Message:
+        """
+        Replaces the preview with the final post and attaches the keyboard.
+        """
+        try:
+            return await self.message.edit_text(
+                text, parse_mode="Markdown", reply_markup=reply_markup
+            )
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            return await self.finish(text, reply_markup)
+        except BadRequest as e:
+            print(f"Could not show the post as Markdown: {e}")
+            return await self.message.edit_text(text, reply_markup=reply_markup)
+
+    async def delete(self) -> None:
+        try:
+            await self.message.delete()
+        except BadRequest as e:
+            print(f"Could not delete the preview: {e}")
+
+    async def _edit(self, text: str) -> None:
+        self._next_edit_at = self.clock() + self.min_interval
+        try:
+            await self.message.edit_text(text)
+            self._shown = text
+            self.edits += 1
+        except RetryAfter as e:
+            # Skip previews until Telegram lets us edit again
+            self._next_edit_at = self.clock() + e.retry_after
+        except BadRequest as e:
+            print(f"Could not update the preview: {e}")
@@ -0,0 +1,186 @@
+from typing import Awaitable, Callable, Optional
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+
+from channel_automation.interfaces.es_repository_interface import IAsyncESRepository
+from channel_automation.models import NewsArticle
+
+CREATED = 201
+ALREADY_EXISTS = 409
+TOO_MANY_REQUESTS = 429
+
+
+@dataclass
+class PendingArticle:
+    article: NewsArticle
+    attempts: int = 0
+    # A request failed without an answer, it may have been written anyway
+    maybe_written: bool = False
+
+
+@dataclass
+class BulkWriterStats:
+    buffered: int
+    flushes: int
+    created: int
+    duplicates: int
+    retried: int
+    dropped: int
+    unannounced: int  # written, but not handed over yet
+    handover_failures: int
+
+
+class BulkArticleWriter:
+    """
+    Buffers newly crawled articles from every crawler job and writes them with
+    the Elasticsearch _bulk API.
+
+    A flush happens when ``max_batch_size`` articles are buffered or when the
+    oldest buffered article has waited ``flush_interval`` seconds. Items that
+    fail with a retryable status (429 or 5xx) stay buffered for the next flush,
+    up to ``max_attempts`` times. Only articles that were actually created are
+    handed to ``on_saved``; a failed hand-over is retried on every flush until
+    it succeeds, the article is already in Elasticsearch and would not be
+    crawled again.
+    """
+
+    def __init__(
+        self,
+        repository: IAsyncESRepository,
+        on_saved: Callable[[NewsArticle], Awaitable[None]],
+        max_batch_size: int = 50,
+        flush_interval: float = 5.0,
+        max_attempts: int = 3,
+    ) -> None:
+        self.repository = repository
+        self.on_saved = on_saved
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._buffer: dict[str, PendingArticle] = {}
+        # Written, but not handed over yet
+        self._saved: deque[NewsArticle] = deque()
+        self._lock: Optional[asyncio.Lock] = None
+        self._closing: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = BulkWriterStats(0, 0, 0, 0, 0, 0, 0, 0)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._lock = asyncio.Lock()
+            self._closing = asyncio.Event()
+            self._task = asyncio.create_task(self._flush_periodically())
+
+    async def close(self, timeout: float = 30.0) -> None:
+        if self._task is not None:
+            # Not cancelled, a write or hand-over in progress is finished
+            self._closing.set()
+            await self._task
+            self._task = None
+        # A flush writes at most a batch, and every item either leaves the
+        # buffer or uses up one of its attempts
+        await self.flush()
+        while self._buffer:
+            await self.flush()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = 1.0
+        while self._saved and loop.time() < deadline:
+            await asyncio.sleep(min(delay, max(0.0, deadline - loop.time())))
+            delay *= 2
+            await self._hand_over()
+        for article in self._saved:
+            print(
+                f"Article {article.id} ({article.source}) was saved but never announced"
+            )
+
+    async def add(self, article: NewsArticle) -> None:
+        # Keyed by source so the same article from two jobs is written once
+        self._buffer.setdefault(article.source, PendingArticle(article))
+        if len(self._buffer) >= self.max_batch_size:
+            await self.flush()
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._closing.wait(), self.flush_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing articles: {e}")
+
+    async def flush(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._buffer:
+                batch = list(self._buffer.values())[: self.max_batch_size]
+                self._saved.extend(await self._write(batch))
+        await self._hand_over()
+
+    async def _hand_over(self) -> None:
+        while self._saved:
+            article = self._saved[0]
+            try:
+                await self.on_saved(article)
+            except Exception as e:
+                # Kept in order, the next flush tries again
+                self._stats.handover_failures += 1
+                print(f"Error handing over article {article.id}, will retry: {e}")
+                return
+            # Removed only now, a cancelled hand-over is tried again as well
+            if self._saved and self._saved[0] is article:
+                self._saved.popleft()
+
+    async def _write(self, batch: list[PendingArticle]) -> list[NewsArticle]:
+        self._stats.flushes += 1
+        for pending in batch:
+            pending.attempts += 1
+        try:
+            statuses = await self.repository.bulk_create_news_articles(
+                [pending.article for pending in batch]
+            )
+        except Exception as e:
+            print(f"Bulk request failed: {e}")
+            statuses = {}
+
+        saved_articles = []
+        for pending in batch:
+            article = pending.article
+            status = statuses.get(article.id)
+            if status == CREATED or (
+                status == ALREADY_EXISTS and pending.maybe_written
+            ):
+                # A 409 after a request without an answer is most likely that
+                # request's write, the outbox ignores a repeated hand-over
+                self._stats.created += 1
+                saved_articles.append(article)
+            elif status == ALREADY_EXISTS:
+                self._stats.duplicates += 1
+            elif self._is_retryable(status) and pending.attempts < self.max_attempts:
+                self._stats.retried += 1
+                if status is None:
+                    pending.maybe_written = True
+                continue  # keep it buffered for the next flush
+            else:
+                self._stats.dropped += 1
+                print(f"Giving up on article {article.source} (status {status})")
+            del self._buffer[article.source]
+        print(f"Flushed {len(batch)} articles, {len(saved_articles)} created")
+        return saved_articles
+
+    @staticmethod
+    def _is_retryable(status: Optional[int]) -> bool:
+        # No status means the whole request failed
+        return status is None or status == TOO_MANY_REQUESTS or status >= 500
+
+    def stats(self) -> BulkWriterStats:
+        self._stats.buffered = len(self._buffer)
+        self._stats.unannounced = len(self._saved)
+        return BulkWriterStats(**self._stats.__dict__)
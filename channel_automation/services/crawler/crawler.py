@@ -1,12 +1,15 @@
 import datetime
 import logging
+from functools import partial
 
 import pytz
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from channel_automation.data_access.elasticsearch.methods import ESRepository
 from channel_automation.data_access.postgresql.methods import Repository
-from channel_automation.interfaces.bot_service_interface import ITelegramBotService
+from channel_automation.interfaces.es_repository_interface import IAsyncESRepository
+from channel_automation.interfaces.outbox_interface import IOutbox
+from channel_automation.services.crawler.bulk_writer import BulkArticleWriter
+from channel_automation.services.crawler.extraction import extraction_executor
 from channel_automation.services.crawler.sources.bangkokpost import BangkokpostCrawler
 from channel_automation.services.crawler.sources.clubbingthailand import (
     ClubbingThailandCrawler,
@@ -27,6 +30,8 @@ from channel_automation.services.crawler.sources.tourismthailand import (
     TourismthailandCrawler,
 )
 from channel_automation.services.crawler.sources.tourprom import TourpromNewsCrawler
+from channel_automation.services.http_client import http_client_manager
+from channel_automation.services.outbox import announce_article
 
 # Initialize logging
 logging.basicConfig()
@@ -37,18 +42,24 @@ logging.getLogger("apscheduler").setLevel(logging.DEBUG)
 class NewsCrawlerService:
     def __init__(
         self,
-        news_article_repository: ESRepository,
+        news_article_repository: IAsyncESRepository,
         repo: Repository,
-        bot_service: ITelegramBotService,
+        outbox: IOutbox,
     ):
         self.news_article_repository = news_article_repository
         self.repo = repo
-        self.bot_service = bot_service
+        self.outbox = outbox
+        # Articles are handed to the bot as soon as they were written, the bot
+        # pre-generates their drafts
+        self.bulk_writer = BulkArticleWriter(
+            news_article_repository, on_saved=partial(announce_article, outbox)
+        )
         bangkok_tz = pytz.timezone("Asia/Bangkok")
         self.scheduler = AsyncIOScheduler(timezone=bangkok_tz)
         self.scheduler.start()
 
     async def start_crawling(self):
+        await self.bulk_writer.start()
         self.scheduler.add_job(
             self.refresh_sources,
             "interval",
@@ -74,7 +85,6 @@ class NewsCrawlerService:
 
     async def crawl_and_extract_news_articles(self, main_page: str):
         print(f"Crawling and extracting articles from {main_page}")
-        extracted_articles = []
         crawler_class = None
 
         # Map domain names to crawler classes
@@ -121,15 +131,27 @@ class NewsCrawlerService:
         # Use the crawler class with an async context manager
         async with crawler_class() as crawler:
             articles_urls = await crawler.crawl()
-            new_urls = []
-            for url in articles_urls:
-                if not self.news_article_repository.article_exists(url):
-                    new_urls.append(url)
+            existing_urls = await self.news_article_repository.existing_sources(
+                articles_urls
+            )
+            new_urls = [url for url in articles_urls if url not in existing_urls]
             print(f"Found {len(new_urls)} new articles that don't exist in ES")
             extracted_articles = await crawler.extract_articles(new_urls)
             for article in extracted_articles:
-                self.news_article_repository.save_news_article(article)
-                await self.bot_service.send_article_to_admin(article)
+                await self.bulk_writer.add(article)
+
+        pool = http_client_manager.stats()
+        extraction = extraction_executor.stats()
+        writer = self.bulk_writer.stats()
+        outbox = self.outbox.stats()
+        print(
+            f"Crawled {main_page}: {len(extracted_articles)} extracted | "
+            f"HTTP {pool.in_use} in use, {pool.idle} idle | "
+            f"extraction {extraction.running} running, {extraction.waiting} waiting | "
+            f"writer {writer.buffered} buffered, {writer.created} created, "
+            f"{writer.unannounced} unannounced | "
+            f"outbox {outbox.enqueued} enqueued, {outbox.duplicates} duplicates"
+        )
 
     async def refresh_sources(self):
         print("Refreshing sources...")
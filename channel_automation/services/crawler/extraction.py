@@ -0,0 +1,162 @@
+from typing import Optional
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+
+import trafilatura
+
+
+def extract_with_trafilatura(content: str) -> tuple[Optional[str], float]:
+    """
+    Runs trafilatura on a downloaded page and returns the JSON output together
+    with the CPU time spent on it. Module-level so it can be pickled for a
+    process pool.
+    """
+    started = time.thread_time()
+    extracted_data = trafilatura.extract(
+        content,
+        include_comments=False,
+        with_metadata=True,
+        favor_precision=True,
+        deduplicate=True,
+        output_format="json",
+    )
+    return extracted_data, time.thread_time() - started
+
+
+@dataclass
+class ExtractionStats:
+    mode: str
+    max_workers: int
+    max_queue_size: int
+    running: int
+    waiting: int
+    extractions: int
+    failures: int
+    total_cpu_seconds: float
+    max_cpu_seconds: float
+
+
+class ExtractionExecutor:
+    """
+    Runs article extraction off the event loop.
+
+    Modes:
+        process: a process pool, so lxml work runs in parallel and never holds
+            the crawler's GIL (default).
+        thread: a thread pool, cheaper to start but shares the GIL.
+        inline: runs in the calling coroutine, as before; useful for debugging.
+
+    At most ``max_workers`` extractions run at once and at most
+    ``max_queue_size`` more wait for a worker; further callers are suspended
+    until a slot frees up, so a burst from one site cannot pile up unbounded.
+    """
+
+    MODES = ("process", "thread", "inline")
+
+    def __init__(
+        self, mode: str = "process", max_workers: int = 2, max_queue_size: int = 16
+    ) -> None:
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.configure(mode, max_workers, max_queue_size)
+        self._running = 0
+        self._waiting = 0
+        self._extractions = 0
+        self._failures = 0
+        self._total_cpu_seconds = 0.0
+        self._max_cpu_seconds = 0.0
+
+    def configure(self, mode: str, max_workers: int, max_queue_size: int) -> None:
+        """
+        Changes the executor settings. Takes effect for the next extraction.
+        """
+        if mode not in self.MODES:
+            raise ValueError(
+                f"Unknown extraction mode '{mode}', expected one of {self.MODES}"
+            )
+        if max_workers < 1 or max_queue_size < 0:
+            raise ValueError("max_workers must be positive and max_queue_size >= 0")
+        self.shutdown()
+        self._slots = None
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.mode == "inline":
+            return None
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="extraction"
+                )
+        return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue_size)
+            self._slots_loop = loop
+        return self._slots
+
+    async def extract(self, content: str, label: Optional[str] = None) -> Optional[str]:
+        """
+        Extracts an article from HTML content and returns trafilatura's JSON output.
+        """
+        slots = self._get_slots()
+        self._waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._running += 1
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                extracted_data, cpu_seconds = extract_with_trafilatura(content)
+            else:
+                loop = asyncio.get_running_loop()
+                extracted_data, cpu_seconds = await loop.run_in_executor(
+                    executor, extract_with_trafilatura, content
+                )
+        except Exception:
+            self._failures += 1
+            raise
+        finally:
+            self._running -= 1
+            slots.release()
+
+        self._extractions += 1
+        self._total_cpu_seconds += cpu_seconds
+        self._max_cpu_seconds = max(self._max_cpu_seconds, cpu_seconds)
+        print(f"Extracted {label or 'article'} using {cpu_seconds:.3f}s of CPU")
+        return extracted_data
+
+    def stats(self) -> ExtractionStats:
+        return ExtractionStats(
+            mode=self.mode,
+            max_workers=self.max_workers,
+            max_queue_size=self.max_queue_size,
+            running=self._running,
+            waiting=self._waiting,
+            extractions=self._extractions,
+            failures=self._failures,
+            total_cpu_seconds=round(self._total_cpu_seconds, 3),
+            max_cpu_seconds=round(self._max_cpu_seconds, 3),
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Shared by every crawler in the process, configured at startup
+extraction_executor = ExtractionExecutor()
@@ -6,11 +6,15 @@ from abc import ABC, abstractmethod
 from urllib.parse import urlparse
 
 import aiohttp
-import trafilatura
 from tenacity import retry, stop_after_attempt, wait_random_exponential
 
 from channel_automation.models import NewsArticle
+from channel_automation.services.http_client import (
+    HTTPClientManager,
+    http_client_manager,
+)
 
+from ..extraction import ExtractionExecutor, extraction_executor
 from ..utils import news_article_from_json
 
 
@@ -26,6 +30,8 @@ class BaseWebCrawler(ABC):
         base_url: str,
         headers: Optional[dict[str, str]] = None,
         timeout_seconds: int = DEFAULT_TIMEOUT_SECONDS,
+        http_client: Optional[HTTPClientManager] = None,
+        extractor: Optional[ExtractionExecutor] = None,
     ) -> None:
         """
         Initializes the web crawler with a base URL, optional headers, and a timeout.
@@ -34,21 +40,23 @@ class BaseWebCrawler(ABC):
         self.headers = headers if headers is not None else {}
         self.timeout = aiohttp.ClientTimeout(total=timeout_seconds)
         self.filters: list[Callable[[str], bool]] = []
-        self.session = None  # Session will be created when needed
+        self.http_client = http_client or http_client_manager
+        self.extractor = extractor or extraction_executor
+        self.session = None  # Session is borrowed from the shared pool when needed
 
     async def __aenter__(self):
         """
-        Asynchronous context manager entry point that ensures a session is created.
+        Asynchronous context manager entry point that borrows the shared session.
         """
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession(timeout=self.timeout)
+        self.session = await self.http_client.get_session()
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
         """
-        Asynchronous context manager exit point that closes the session.
+        Asynchronous context manager exit point that returns the shared session.
+        The session stays open so pooled connections are reused by the next run.
         """
-        await self.session.close()
+        self.session = None
 
     async def crawl(self) -> list[str]:
         """
@@ -92,7 +100,9 @@ class BaseWebCrawler(ABC):
                 "Session has not been created. Use 'async with' block or call '__aenter__' manually."
             )
         try:
-            async with self.session.get(url, headers=self.headers) as response:
+            async with self.session.get(
+                url, headers=self.headers, timeout=self.timeout
+            ) as response:
                 response.raise_for_status()
                 if response.status == 200:
                     return await response.text()
@@ -137,21 +147,17 @@ class BaseWebCrawler(ABC):
         """
         downloaded = await self.fetch(url)
         if downloaded:
-            return await self.create_article_from_content(downloaded)
+            return await self.create_article_from_content(downloaded, url)
 
-    async def create_article_from_content(self, content: str) -> Optional[NewsArticle]:
+    async def create_article_from_content(
+        self, content: str, url: Optional[str] = None
+    ) -> Optional[NewsArticle]:
         """
         Creates a NewsArticle object from the downloaded content string.
+        The heavy extraction runs on the shared extraction executor, off the event loop.
         """
         main_image_url = self.extract_main_image(content)
-        extracted_data = trafilatura.extract(
-            content,
-            include_comments=False,
-            with_metadata=True,
-            favor_precision=True,
-            deduplicate=True,
-            output_format="json",
-        )
+        extracted_data = await self.extractor.extract(content, label=url)
         if extracted_data:
             data = json.loads(extracted_data)
             article = await news_article_from_json(data)
@@ -0,0 +1,138 @@
+from typing import Optional
+
+import asyncio
+from dataclasses import dataclass
+
+import aiohttp
+
+
+@dataclass
+class PoolStats:
+    open: int
+    idle: int
+    in_use: int
+    created: int
+    reused: int
+    requests: int
+
+
+class HTTPClientManager:
+    """
+    Process-wide owner of a pooled aiohttp session.
+
+    Every caller borrows the same session, so TCP/TLS connections, keep-alive
+    sockets and resolved DNS entries survive between crawl cycles instead of
+    being thrown away with a per-run ClientSession.
+    """
+
+    DEFAULT_LIMIT = 100  # Total number of simultaneous connections
+    DEFAULT_LIMIT_PER_HOST = 4  # Be polite to every single news site
+    DEFAULT_DNS_CACHE_TTL = 600  # Seconds to keep resolved hostnames
+    DEFAULT_KEEPALIVE_TIMEOUT = 120.0  # Seconds to keep idle sockets open
+
+    def __init__(
+        self,
+        limit: int = DEFAULT_LIMIT,
+        limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+        dns_cache_ttl: int = DEFAULT_DNS_CACHE_TTL,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+    ) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._created = 0
+        self._reused = 0
+        self._requests = 0
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the shared session, creating it on first use in the running loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._is_usable(loop):
+            return self._session
+
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        async with self._lock:
+            if not self._is_usable(loop):
+                self._session = self._create_session()
+                self._session_loop = loop
+        return self._session
+
+    def _is_usable(self, loop: asyncio.AbstractEventLoop) -> bool:
+        # A session is bound to the loop it was created in, so a new loop
+        # (e.g. a fresh asyncio.run) needs a new pool as well.
+        return (
+            self._session is not None
+            and not self._session.closed
+            and self._session_loop is loop
+        )
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        return aiohttp.ClientSession(
+            connector=connector, trace_configs=[self._create_trace_config()]
+        )
+
+    def _create_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self._requests += 1
+
+        async def on_connection_create_end(session, context, params):
+            self._created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self._reused += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def stats(self) -> PoolStats:
+        """
+        Returns a snapshot of the connection pool.
+        """
+        idle = in_use = 0
+        if self._session is not None and not self._session.closed:
+            connector = self._session.connector
+            # aiohttp does not expose pool occupancy publicly
+            idle = sum(
+                len(conns) for conns in getattr(connector, "_conns", {}).values()
+            )
+            in_use = len(getattr(connector, "_acquired", ()))
+        return PoolStats(
+            open=idle + in_use,
+            idle=idle,
+            in_use=in_use,
+            created=self._created,
+            reused=self._reused,
+            requests=self._requests,
+        )
+
+    async def close(self) -> None:
+        """
+        Closes the shared session and every pooled connection.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# Shared by every crawler in the process
+http_client_manager = HTTPClientManager()
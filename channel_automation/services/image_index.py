@@ -0,0 +1,152 @@
+from typing import Callable, Optional
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from channel_automation.interfaces.pg_repository_interface import IRepository
+from channel_automation.services.images import hamming_distance
+
+# Bits out of 64 that may differ between two copies of the same picture
+DEFAULT_MAX_DISTANCE = 10
+DEFAULT_WINDOW = timedelta(days=30)
+# Expired fingerprints are only dropped when the tree is rebuilt
+REBUILD_INTERVAL = timedelta(days=1)
+
+
+@dataclass
+class Fingerprint:
+    channel_id: str
+    phash: int
+    published_at: datetime
+
+
+@dataclass
+class _Node:
+    phash: int
+    fingerprints: list[Fingerprint] = field(default_factory=list)
+    children: dict[int, "_Node"] = field(default_factory=dict)
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree of perceptual hashes under the Hamming distance.
+
+    Every child hangs off its parent at their distance, so by the triangle
+    inequality a search only descends into children whose distance to the
+    parent is within ``max_distance`` of the query's.
+    """
+
+    def __init__(self) -> None:
+        self.root: Optional[_Node] = None
+        self.size = 0
+
+    def add(self, fingerprint: Fingerprint) -> None:
+        self.size += 1
+        if self.root is None:
+            self.root = _Node(fingerprint.phash, [fingerprint])
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(fingerprint.phash, node.phash)
+            if distance == 0:
+                node.fingerprints.append(fingerprint)
+                return
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = _Node(fingerprint.phash, [fingerprint])
+                return
+            node = child
+
+    def search(self, phash: int, max_distance: int) -> list[Fingerprint]:
+        found = []
+        nodes = [self.root] if self.root else []
+        while nodes:
+            node = nodes.pop()
+            distance = hamming_distance(phash, node.phash)
+            if distance <= max_distance:
+                found.extend(node.fingerprints)
+            for child_distance, child in node.children.items():
+                if abs(child_distance - distance) <= max_distance:
+                    nodes.append(child)
+        return found
+
+
+@dataclass
+class ImageIndexStats:
+    fingerprints: int
+    lookups: int
+    duplicates: int
+
+
+class ImageFingerprintIndex:
+    """
+    Perceptual hashes of the images published in the last ``window``, per
+    channel, to keep the same stock photo from being published again.
+
+    The hashes live in Postgres and in a BK-tree built from them on first
+    use and rebuilt once a day, which drops the expired ones.
+    """
+
+    def __init__(
+        self,
+        repo: IRepository,
+        window: timedelta = DEFAULT_WINDOW,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        self.repo = repo
+        self.window = window
+        self.max_distance = max_distance
+        self.clock = clock
+        self._tree: Optional[BKTree] = None
+        self._built_at: Optional[datetime] = None
+        self._lookups = 0
+        self._duplicates = 0
+
+    def find_similar(
+        self, phash: int, channel_id: Optional[str] = None
+    ) -> list[Fingerprint]:
+        """
+        Recent fingerprints close to ``phash``, in one channel or in any.
+        """
+        self._lookups += 1
+        cutoff = self.clock() - self.window
+        similar = [
+            fingerprint
+            for fingerprint in self._get_tree().search(phash, self.max_distance)
+            if fingerprint.published_at >= cutoff
+            and channel_id in (None, fingerprint.channel_id)
+        ]
+        if similar:
+            self._duplicates += 1
+        return similar
+
+    def is_duplicate(self, phash: int, channel_id: Optional[str] = None) -> bool:
+        return bool(self.find_similar(phash, channel_id))
+
+    def add(self, channel_id: str, phash: int) -> None:
+        self.repo.add_image_fingerprint(channel_id, phash)
+        if self._tree is not None:
+            self._tree.add(Fingerprint(channel_id, phash, self.clock()))
+
+    def _get_tree(self) -> BKTree:
+        now = self.clock()
+        if self._tree is None or now - self._built_at >= REBUILD_INTERVAL:
+            tree = BKTree()
+            for fingerprint in self.repo.get_image_fingerprints(now - self.window):
+                tree.add(
+                    Fingerprint(
+                        fingerprint.channel_id,
+                        fingerprint.phash,
+                        fingerprint.published_at,
+                    )
+                )
+            self._tree, self._built_at = tree, now
+        return self._tree
+
+    def stats(self) -> ImageIndexStats:
+        return ImageIndexStats(
+            fingerprints=self._tree.size if self._tree else 0,
+            lookups=self._lookups,
+            duplicates=self._duplicates,
+        )
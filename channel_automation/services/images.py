@@ -0,0 +1,318 @@
+from typing import Callable, Optional
+
+import asyncio
+import io
+import math
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import aiohttp
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from channel_automation.services.http_client import HTTPClientManager
+
+# https://core.telegram.org/bots/api#sending-files
+TELEGRAM_MAX_PHOTO_BYTES = 10 * 1024 * 1024
+TELEGRAM_MAX_ASPECT_RATIO = 20
+# Telegram shows photos at most 1280 pixels wide, larger ones are scaled down
+DEFAULT_MAX_SIDE = 1280
+DEFAULT_MIN_SIDE = 200
+DEFAULT_QUALITY = 85
+MIN_QUALITY = 50
+# Candidates tried for one photo
+MAX_CANDIDATES = 5
+# Perceptual hashes keep the 8x8 lowest frequencies of a 32x32 thumbnail
+HASH_SIZE = 8
+HASH_SAMPLE = 32
+_DCT = [
+    [
+        math.cos((2 * x + 1) * u * math.pi / (2 * HASH_SAMPLE))
+        for x in range(HASH_SAMPLE)
+    ]
+    for u in range(HASH_SIZE)
+]
+
+
+class ImageRejected(ValueError):
+    pass
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """
+    64-bit DCT hash of an image: one bit per low frequency of its grayscale
+    32x32 thumbnail, set if the frequency is above the median. Resizing,
+    recompression and small edits flip only a few bits, so near-identical
+    images are a small Hamming distance apart.
+    """
+    small = image.convert("L").resize((HASH_SAMPLE, HASH_SAMPLE), Image.LANCZOS)
+    pixels = list(small.getdata())
+    rows = [pixels[y * HASH_SAMPLE : (y + 1) * HASH_SAMPLE] for y in range(HASH_SAMPLE)]
+    # The 2D DCT is separable: transform the rows, then the columns of that
+    by_row = [[sum(c * p for c, p in zip(cos, row)) for cos in _DCT] for row in rows]
+    coefficients = [
+        sum(cos[y] * by_row[y][v] for y in range(HASH_SAMPLE))
+        for cos in _DCT
+        for v in range(HASH_SIZE)
+    ]
+    # The DC term is the overall brightness, it would skew the median
+    median = statistics.median(coefficients[1:])
+    phash = 0
+    for coefficient in coefficients:
+        phash = (phash << 1) | (coefficient > median)
+    return phash
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """
+    >>> hamming_distance(0b1011, 0b0010)
+    2
+    """
+    return (a ^ b).bit_count()
+
+
+def open_image(data: bytes) -> Image.Image:
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.verify()
+        # verify() leaves the image unusable, decode it again
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (
+        UnidentifiedImageError,
+        Image.DecompressionBombError,
+        OSError,
+        SyntaxError,
+        ValueError,
+    ) as e:
+        raise ImageRejected(f"Not a valid image: {e}")
+    return ImageOps.exif_transpose(image)
+
+
+def image_hash(data: bytes) -> int:
+    return perceptual_hash(open_image(data))
+
+
+def process_image(
+    data: bytes,
+    min_side: int = DEFAULT_MIN_SIDE,
+    max_side: int = DEFAULT_MAX_SIDE,
+    quality: int = DEFAULT_QUALITY,
+) -> tuple[bytes, int, int, int]:
+    """
+    Validates a downloaded image and re-encodes it as a JPEG that Telegram
+    accepts as a photo. Raises ImageRejected for broken, tiny or extremely
+    narrow images.
+
+    Returns:
+        The JPEG bytes, its width, its height and its perceptual hash.
+    """
+    image = open_image(data)
+    width, height = image.size
+    if min(width, height) < min_side:
+        raise ImageRejected(f"Image is too small: {width}x{height}")
+    if max(width, height) / min(width, height) > TELEGRAM_MAX_ASPECT_RATIO:
+        raise ImageRejected(f"Image is too narrow: {width}x{height}")
+
+    if image.mode in ("RGBA", "LA", "P"):
+        # JPEG has no transparency, put it on white instead of black
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    phash = perceptual_hash(image)
+
+    while True:
+        output = io.BytesIO()
+        image.save(output, "JPEG", quality=quality, optimize=True, progressive=True)
+        if output.tell() <= TELEGRAM_MAX_PHOTO_BYTES or quality <= MIN_QUALITY:
+            break
+        quality -= 10
+    if output.tell() > TELEGRAM_MAX_PHOTO_BYTES:
+        raise ImageRejected("Image is too large even after compression")
+    return output.getvalue(), image.width, image.height, phash
+
+
+@dataclass
+class PreparedImage:
+    url: str
+    data: bytes
+    width: int
+    height: int
+    phash: int
+
+
+@dataclass
+class ImagePipelineStats:
+    downloads: int
+    failed_downloads: int
+    rejected: int
+    skipped: int  # usable, but turned down by the caller
+    prepared: int
+    bytes_downloaded: int
+    bytes_prepared: int
+
+
+class ImagePipeline:
+    """
+    Turns image URLs into photos that Telegram accepts.
+
+    Candidates are downloaded concurrently, each cut off at
+    ``max_download_bytes`` and ``timeout`` seconds. Decoding, validation,
+    downscaling and re-encoding run in a thread pool of ``max_workers``;
+    Pillow releases the GIL while it works, so the event loop stays free.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_download_bytes: int = 20 * 1024 * 1024,
+        timeout: float = 15.0,
+        min_side: int = DEFAULT_MIN_SIDE,
+        max_side: int = DEFAULT_MAX_SIDE,
+        quality: int = DEFAULT_QUALITY,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_download_bytes = max_download_bytes
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=5)
+        self.min_side = min_side
+        self.max_side = max_side
+        self.quality = quality
+        self.http_client = HTTPClientManager(
+            limit=MAX_CANDIDATES * 2, limit_per_host=MAX_CANDIDATES
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._downloads = 0
+        self._failed_downloads = 0
+        self._rejected = 0
+        self._skipped = 0
+        self._prepared = 0
+        self._bytes_downloaded = 0
+        self._bytes_prepared = 0
+
+    def configure(
+        self, max_workers: int, max_download_bytes: int, max_side: int
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_download_bytes = max_download_bytes
+        self.max_side = max_side
+        self.shutdown()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="images"
+            )
+        return self._executor
+
+    async def prepare_first(
+        self,
+        urls: list[str],
+        accept: Optional[Callable[[PreparedImage], bool]] = None,
+    ) -> Optional[PreparedImage]:
+        """
+        Prepares the first usable image of ``urls``, in their order. All
+        candidates are fetched at once; the rest are cancelled as soon as the
+        answer is known.
+
+        Args:
+            urls (list[str]): Candidate image URLs, best first.
+            accept (Optional[Callable]): Turns down prepared images that are
+                usable but unwanted, e.g. already published ones.
+
+        Returns:
+            Optional[PreparedImage]: The image, or None if no candidate is
+                usable and accepted.
+        """
+        candidates = list(dict.fromkeys(urls))[:MAX_CANDIDATES]
+        tasks = [asyncio.create_task(self._prepare(url)) for url in candidates]
+        try:
+            for task in tasks:
+                prepared = await task
+                if prepared is None:
+                    continue
+                if accept is None or accept(prepared):
+                    return prepared
+                self._skipped += 1
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _prepare(self, url: str) -> Optional[PreparedImage]:
+        try:
+            data = await self.download(url)
+            loop = asyncio.get_running_loop()
+            jpeg, width, height, phash = await loop.run_in_executor(
+                self.executor,
+                process_image,
+                data,
+                self.min_side,
+                self.max_side,
+                self.quality,
+            )
+        except ImageRejected as e:
+            self._rejected += 1
+            print(f"Skipping image {url}: {e}")
+            return None
+        except Exception as e:
+            self._failed_downloads += 1
+            print(f"Could not download image {url}: {e!r}")
+            return None
+        self._prepared += 1
+        self._bytes_prepared += len(jpeg)
+        return PreparedImage(url, jpeg, width, height, phash)
+
+    async def fingerprint(self, data: bytes) -> int:
+        """
+        Perceptual hash of an image, e.g. a photo downloaded from Telegram.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, image_hash, data)
+
+    async def download(self, url: str) -> bytes:
+        self._downloads += 1
+        session = await self.http_client.get_session()
+        async with session.get(url, timeout=self.timeout) as response:
+            response.raise_for_status()
+            if response.content_type.startswith("text/"):
+                raise ImageRejected(f"Got {response.content_type} instead of an image")
+            if (response.content_length or 0) > self.max_download_bytes:
+                raise ImageRejected(f"Image is {response.content_length} bytes")
+            data = bytearray()
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                data.extend(chunk)
+                if len(data) > self.max_download_bytes:
+                    raise ImageRejected(
+                        f"Image is larger than {self.max_download_bytes} bytes"
+                    )
+        self._bytes_downloaded += len(data)
+        return bytes(data)
+
+    def stats(self) -> ImagePipelineStats:
+        return ImagePipelineStats(
+            downloads=self._downloads,
+            failed_downloads=self._failed_downloads,
+            rejected=self._rejected,
+            skipped=self._skipped,
+            prepared=self._prepared,
+            bytes_downloaded=self._bytes_downloaded,
+            bytes_prepared=self._bytes_prepared,
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def close(self) -> None:
+        await self.http_client.close()
+        self.shutdown()
+
+
+# Shared by every handler that sends photos
+image_pipeline = ImagePipeline()
@@ -0,0 +1,121 @@
+from typing import Awaitable, Callable, Optional
+
+import asyncio
+import json
+from dataclasses import dataclass
+
+from channel_automation.interfaces.outbox_interface import IOutbox
+from channel_automation.models import NewsArticle, OutboxMessage
+
+# A newly saved article, for the admins
+ARTICLE = "article"
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+async def announce_article(outbox: IOutbox, article: NewsArticle) -> None:
+    """
+    Hands a saved article over to the bot. The bot loads it from
+    Elasticsearch, with the draft generated meanwhile if there is one.
+    """
+    await outbox.enqueue(ARTICLE, f"{ARTICLE}:{article.id}", {"article_id": article.id})
+
+
+@dataclass
+class OutboxWorkerStats:
+    batches: int
+    delivered: int
+    failed: int
+
+
+class OutboxWorker:
+    """
+    Drains the outbox in the bot process, ``batch_size`` messages at a time.
+
+    Every message goes to the handler of its kind; the messages of a batch are
+    handled concurrently and marked delivered together once their handlers
+    returned. A handler that raises leaves its message for a retry. Between
+    batches the worker sleeps until the outbox is notified of a new message,
+    or for ``poll_interval`` seconds at most.
+    """
+
+    def __init__(
+        self,
+        outbox: IOutbox,
+        handlers: dict[str, Handler],
+        batch_size: int = 50,
+        poll_interval: float = 30.0,
+    ) -> None:
+        self.outbox = outbox
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+        self._batches = 0
+        self._delivered = 0
+        self._failed = 0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await self.drain_once()
+            except Exception as e:
+                print(f"Error draining the outbox: {e}")
+                claimed = 0
+            # A full batch means there may be more waiting
+            if claimed < self.batch_size:
+                await self.outbox.wait(self.poll_interval)
+
+    async def drain_once(self) -> int:
+        """
+        Handles one batch of messages.
+
+        Returns:
+            int: How many messages were claimed.
+        """
+        messages = await self.outbox.claim(self.batch_size)
+        if not messages:
+            return 0
+        self._batches += 1
+        handled = await asyncio.gather(*(self._handle(message) for message in messages))
+        delivered = [message.id for message, ok in zip(messages, handled) if ok]
+        if delivered:
+            await self.outbox.mark_delivered(delivered)
+        self._delivered += len(delivered)
+        return len(messages)
+
+    async def _handle(self, message: OutboxMessage) -> bool:
+        try:
+            handler = self.handlers.get(message.kind)
+            if handler is None:
+                raise ValueError(f"No handler for {message.kind} messages")
+            await handler(json.loads(message.payload))
+            return True
+        except Exception as e:
+            self._failed += 1
+            print(f"Error delivering outbox message {message.dedup_key}: {e}")
+            try:
+                await self.outbox.mark_failed(message.id, repr(e))
+            except Exception as e:
+                print(f"Error recording the failure of {message.dedup_key}: {e}")
+            return False
+
+    def stats(self) -> OutboxWorkerStats:
+        return OutboxWorkerStats(
+            batches=self._batches,
+            delivered=self._delivered,
+            failed=self._failed,
+        )
@@ -0,0 +1,163 @@
+from typing import Awaitable, Callable, Optional
+
+import asyncio
+import itertools
+from dataclasses import dataclass
+
+from channel_automation.assistant.budget import BudgetStats, DailyTokenBudget
+from channel_automation.assistant.governor import BACKGROUND
+from channel_automation.interfaces.assistant_interface import IAsyncAssistant
+from channel_automation.interfaces.es_repository_interface import IAsyncESRepository
+from channel_automation.models import NewsArticle
+
+DRAFT_VARIATION = 1
+# Rough size of the template and the answer, on top of the article itself
+PROMPT_OVERHEAD_TOKENS = 1500
+
+# Gets the article and the index of its new draft
+DraftCallback = Callable[[NewsArticle, int], Awaitable[None]]
+
+
+def estimate_tokens(news_article: NewsArticle) -> int:
+    # About four characters per token for English text
+    return (
+        len(news_article.title or "") + len(news_article.text or "")
+    ) // 4 + PROMPT_OVERHEAD_TOKENS
+
+
+@dataclass
+class PregenerationStats:
+    queued: int
+    generated: int
+    skipped_full: int
+    skipped_budget: int
+    failed: int
+    budget: BudgetStats
+
+
+class DraftPregenerator:
+    """
+    Generates the template 1 draft of every new article after the bot
+    announced it, so the admins get a ready post shortly after the article.
+
+    Runs in the bot process on the bot's assistant: drafts are generated with
+    background priority in the same governor as the admins' requests, so an
+    admin pressing a button is always served first. Articles wait in a
+    bounded priority queue, the newest first. When the queue is full, today's
+    token or cost budget is spent or the bot is shutting down, the article
+    simply gets no draft.
+    """
+
+    def __init__(
+        self,
+        assistant: IAsyncAssistant,
+        repository: IAsyncESRepository,
+        budget: Optional[DailyTokenBudget] = None,
+        max_queue_size: int = 20,
+        workers: int = 1,
+    ) -> None:
+        self.assistant = assistant
+        self.repository = repository
+        self.budget = budget or DailyTokenBudget()
+        self.max_queue_size = max_queue_size
+        self.workers = workers
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._closed = False
+        self._order = itertools.count()
+        self._generated = 0
+        self._skipped_full = 0
+        self._skipped_budget = 0
+        self._failed = 0
+
+    async def start(self) -> None:
+        if not self._tasks:
+            self._queue = asyncio.PriorityQueue(maxsize=self.max_queue_size)
+            self._tasks = [
+                asyncio.create_task(self._work()) for _ in range(self.workers)
+            ]
+
+    async def close(self, timeout: float = 30.0) -> None:
+        """
+        Drops the queued articles and gives the drafts being generated
+        ``timeout`` seconds to finish.
+        """
+        self._closed = True
+        while self._queue is not None and not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print("Gave up waiting for the drafts being generated")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def add_draft(self, article: NewsArticle, on_drafted: DraftCallback) -> bool:
+        """
+        Queues ``article`` for a draft, unless it already has one. Never waits
+        for the draft: once it is appended to the article, ``on_drafted`` is
+        awaited with the article and the index of the draft.
+
+        Returns:
+            bool: Whether the article was queued.
+        """
+        if article.posts or self._closed:
+            return False
+        if self._queue is None:
+            await self.start()
+        try:
+            # Newest first, a stale article is the first to lose its draft
+            self._queue.put_nowait(
+                (-next(self._order), article.id, article, on_drafted)
+            )
+        except asyncio.QueueFull:
+            self._skipped_full += 1
+            print(f"Draft queue is full, skipping the draft of {article.source}")
+            return False
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            _, _, article, on_drafted = await self._queue.get()
+            try:
+                await self._pregenerate(article, on_drafted)
+            finally:
+                self._queue.task_done()
+
+    async def _pregenerate(
+        self, article: NewsArticle, on_drafted: DraftCallback
+    ) -> None:
+        if not self.budget.allows(estimate_tokens(article)):
+            self._skipped_budget += 1
+            print(f"Daily draft budget spent, skipping {article.source}")
+            return
+        try:
+            post = await self.assistant.generate_post(
+                article, DRAFT_VARIATION, priority=BACKGROUND
+            )
+            self.budget.record(post.input_tokens, post.output_tokens)
+            post_index = await self.repository.append_post(article, post)
+            self._generated += 1
+        except Exception as e:
+            self._failed += 1
+            print(f"Error pre-generating a draft for {article.source}: {e}")
+            return
+        try:
+            await on_drafted(article, post_index)
+        except Exception as e:
+            print(f"Error sending the draft of {article.source}: {e}")
+
+    def stats(self) -> PregenerationStats:
+        return PregenerationStats(
+            queued=self._queue.qsize() if self._queue is not None else 0,
+            generated=self._generated,
+            skipped_full=self._skipped_full,
+            skipped_budget=self._skipped_budget,
+            failed=self._failed,
+            budget=self.budget.stats(),
+        )
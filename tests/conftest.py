@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import pytest
+
+from channel_automation.models import NewsArticle
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2023, 11, 29, 12, 0)
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def make_article():
+    def make(source="https://example.com/article", **fields):
+        values = dict(
+            title="Title",
+            author="Author",
+            hostname="example.com",
+            date="2023-11-08",
+            categories="",
+            tags="",
+            fingerprint="fingerprint",
+            id=None,
+            license=None,
+            comments=None,
+            raw_text="raw text",
+            text="text",
+            language="en",
+            source=source,
+            source_hostname="example.com",
+            excerpt="excerpt",
+        )
+        values.update(fields)
+        return NewsArticle(**values)
+
+    return make
@@ -0,0 +1,179 @@
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from channel_automation.assistant.backends import (
+    BackendHealth,
+    BackendRouter,
+    ChatBackend,
+)
+from channel_automation.assistant.methods import AsyncAssistant
+from channel_automation.models import NewsArticle
+
+
+class StubLLMServer:
+    """
+    A local server speaking the OpenAI chat completions API. Every model
+    answers after its own delay, or fails with a 500.
+    """
+
+    def __init__(self):
+        self.delays = {}
+        self.failing = set()
+        self.requests = []
+
+    async def chat_completions(self, request):
+        body = await request.json()
+        model = body["model"]
+        self.requests.append(body)
+        await asyncio.sleep(self.delays.get(model, 0))
+        if model in self.failing:
+            return web.json_response(
+                {"error": {"message": "overloaded", "type": "server_error"}},
+                status=500,
+            )
+        arguments = json.dumps({"social_post": f"By {model}", "images_search": "x"})
+        return web.json_response(
+            {
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {
+                            "role": "assistant",
+                            "content": None,
+                            "function_call": {
+                                "name": "create_social_post",
+                                "arguments": arguments,
+                            },
+                        },
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 20},
+            }
+        )
+
+
+@pytest_asyncio.fixture
+async def stub():
+    stub = StubLLMServer()
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", stub.chat_completions)
+    server = TestServer(app)
+    await server.start_server()
+    stub.api_base = str(server.make_url("/v1"))
+    yield stub
+    await server.close()
+
+
+ARTICLE = NewsArticle(
+    title="Title",
+    author="Author",
+    hostname="example.com",
+    date="2023-11-21",
+    categories="",
+    tags="",
+    fingerprint="fingerprint",
+    id="id",
+    license=None,
+    comments=None,
+    raw_text="raw text",
+    text="text",
+    language="en",
+    source="https://example.com/1",
+    source_hostname="example.com",
+    excerpt="excerpt",
+)
+
+
+def backend(stub, model, timeout=5.0):
+    return ChatBackend(
+        model, model, "test-key", api_base=stub.api_base, timeout=timeout
+    )
+
+
+@pytest.mark.asyncio
+async def test_a_failing_backend_falls_back_and_is_skipped_later(stub):
+    stub.failing.add("broken")
+    broken = backend(stub, "broken")
+    broken.health = BackendHealth(max_failures=1, cooldown=60)
+    router = BackendRouter([broken, backend(stub, "local")])
+    assistant = AsyncAssistant("unused", router=router)
+
+    post = await assistant.generate_post(ARTICLE, 1)
+    second = await assistant.generate_post(ARTICLE, 1)
+    await assistant.close()
+
+    assert post.social_post == second.social_post == "By local"
+    assert post.input_tokens == 100
+    # The broken backend is cooling down, the second post did not try it
+    assert [request["model"] for request in stub.requests] == [
+        "broken",
+        "local",
+        "local",
+    ]
+    stats = router.stats()
+    assert stats.fallbacks == 1
+    assert not stats.backends["broken"].available
+
+
+class DictCache:
+    def __init__(self):
+        self.entries = {}
+
+    async def get(self, key):
+        return self.entries.get(key)
+
+    async def set(self, key, completion):
+        self.entries[key] = completion
+
+
+@pytest.mark.asyncio
+async def test_only_answers_of_the_primary_model_are_cached(stub):
+    stub.failing.add("primary")
+    cache = DictCache()
+    router = BackendRouter([backend(stub, "primary"), backend(stub, "local")])
+    assistant = AsyncAssistant("unused", router=router, cache=cache)
+
+    fallback = await assistant.generate_post(ARTICLE, 1)
+    stub.failing.clear()
+    primary = await assistant.generate_post(ARTICLE, 1)
+    cached = await assistant.generate_post(ARTICLE, 1)
+    await assistant.close()
+
+    assert fallback.social_post == "By local"
+    assert primary.social_post == cached.social_post == "By primary"
+    assert len(cache.entries) == 1
+    assert len(stub.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_a_slow_backend_is_hedged_with_a_faster_model(stub):
+    stub.delays["slow"] = 2.0
+    router = BackendRouter(
+        [backend(stub, "slow")], hedge=backend(stub, "fast"), hedge_after=0.1
+    )
+
+    response = await router.create(messages=[{"role": "user", "content": "Hi"}])
+
+    assert response.model == "fast"
+    assert router.stats().hedge_wins == 1
+
+
+@pytest.mark.asyncio
+async def test_a_backend_slower_than_its_timeout_counts_as_failed(stub):
+    stub.delays["slow"] = 1.0
+    slow = backend(stub, "slow", timeout=0.1)
+    router = BackendRouter([slow, backend(stub, "local")])
+
+    response = await router.create(messages=[{"role": "user", "content": "Hi"}])
+
+    assert response.model == "local"
+    assert slow.health.stats().failures == 1
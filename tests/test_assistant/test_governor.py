@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from channel_automation.assistant.governor import (
+    BACKGROUND,
+    INTERACTIVE,
+    ConcurrencyGovernor,
+)
+
+
+@pytest.mark.asyncio
+async def test_callers_beyond_the_limit_wait_in_order_and_see_their_position():
+    governor = ConcurrencyGovernor(max_concurrent=1)
+    release_first = asyncio.Event()
+    release_second = asyncio.Event()
+    positions = {"second": [], "third": []}
+    order = []
+
+    async def call(name, wait_for=None):
+        async def report(position):
+            positions[name].append(position)
+
+        async with governor.slot(report):
+            order.append(name)
+            if wait_for is not None:
+                await wait_for.wait()
+
+    first = asyncio.create_task(call("first", release_first))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(call("second", release_second))
+    await asyncio.sleep(0)
+    third = asyncio.create_task(call("third"))
+    await asyncio.sleep(0)
+
+    assert governor.stats().waiting == 2
+    release_first.set()
+    await first
+    await asyncio.sleep(0)
+    assert positions["third"] == [2, 1]
+
+    release_second.set()
+    await asyncio.gather(second, third)
+
+    assert order == ["first", "second", "third"]
+    assert positions["second"] == [1, 0]
+    assert positions["third"] == [2, 1, 0]
+    stats = governor.stats()
+    assert (stats.active, stats.waiting, stats.completed) == (0, 0, 3)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    governor = ConcurrencyGovernor(max_concurrent=1)
+    await governor.acquire()
+    waiter = asyncio.create_task(governor.acquire())
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert governor.stats().waiting == 0
+    governor.release()
+    assert governor.stats().active == 0
+
+
+@pytest.mark.asyncio
+async def test_cancellation_while_reporting_the_position_frees_the_slot():
+    governor = ConcurrencyGovernor(max_concurrent=1)
+    await governor.acquire()
+    reporting = asyncio.Event()
+
+    async def report(position):
+        reporting.set()
+        await asyncio.sleep(10)
+
+    waiter = asyncio.create_task(governor.acquire(report))
+    await reporting.wait()
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert governor.stats().waiting == 0
+    governor.release()
+    assert governor.stats().active == 0
+
+
+@pytest.mark.asyncio
+async def test_interactive_callers_jump_ahead_of_background_ones():
+    governor = ConcurrencyGovernor(max_concurrent=1)
+    await governor.acquire()
+    order = []
+
+    async def call(name, priority):
+        async with governor.slot(priority=priority):
+            order.append(name)
+
+    background = asyncio.create_task(call("background", BACKGROUND))
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(call("interactive", INTERACTIVE))
+    await asyncio.sleep(0)
+
+    governor.release()
+    await asyncio.gather(background, interactive)
+    assert order == ["interactive", "background"]
@@ -0,0 +1,79 @@
+import pytest
+from openai.openai_object import OpenAIObject
+
+from channel_automation.assistant.json_repair import (
+    JSONRepairError,
+    TolerantJSONParser,
+    repair_json,
+)
+from channel_automation.assistant.methods import (
+    completion_content,
+    parse_json_to_dataclass,
+)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"social_post": "Hi", "images_search": "beach"}', {"social_post": "Hi"}),
+        ('```json\n{"social_post": "Line\none"}\n```', {"social_post": "Line\none"}),
+        ('Here you go: {"social_post": "Hi",} Enjoy!', {"social_post": "Hi"}),
+        (
+            '{"social_post": "Cut off by the token li',
+            {"social_post": "Cut off by the token li"},
+        ),
+        ('{"tags": ["a", "b",', {"tags": ["a", "b"]}),
+        (
+            '{"social_post": "Quote \\" and tab\t"}',
+            {"social_post": 'Quote " and tab\t'},
+        ),
+    ],
+)
+def test_parser_repairs_common_model_mistakes(text, expected):
+    parsed = TolerantJSONParser().loads(text)
+    assert {key: parsed[key] for key in expected} == expected
+
+
+def test_parser_counts_failures_and_repairs():
+    parser = TolerantJSONParser()
+    parser.loads('{"a": 1}')
+    parser.loads('{"a": 1,}')
+    with pytest.raises(ValueError):
+        parser.loads("no json at all")
+
+    stats = parser.stats()
+    assert (stats.parsed, stats.failures, stats.repaired, stats.unrepairable) == (
+        3,
+        2,
+        1,
+        1,
+    )
+    assert stats.repair_rate == 0.5
+
+
+def test_unbalanced_brackets_are_not_guessed():
+    with pytest.raises(JSONRepairError):
+        repair_json('{"a": [1}')
+
+
+def test_function_call_arguments_are_parsed_into_post_data():
+    response = {
+        "choices": [
+            {
+                "message": {
+                    "content": None,
+                    "function_call": {
+                        "name": "create_social_post",
+                        "arguments": '{"social_post": "Пост", "images_search": "beach"}',
+                    },
+                }
+            }
+        ]
+    }
+
+    post_data = parse_json_to_dataclass(
+        completion_content(OpenAIObject.construct_from(response))
+    )
+
+    assert post_data.social_post == "Пост"
+    assert post_data.images_search == "beach"
@@ -0,0 +1,47 @@
+from channel_automation.assistant.prompt_budget import PromptBudget, TokenCounter
+
+counter = TokenCounter(use_tiktoken=False)
+
+
+def make_paragraph(number, words=40):
+    return " ".join(f"word{number}" for _ in range(words)) + "."
+
+
+def test_short_articles_are_sent_unchanged():
+    budget = PromptBudget(max_input_tokens=1000, counter=counter)
+
+    prompt = budget.fit("Title", "Short text.")
+
+    assert prompt.text == "Title\n\nShort text."
+    assert not prompt.trimmed
+
+
+def test_long_articles_keep_the_lead_and_drop_boilerplate():
+    paragraphs = [make_paragraph(number) for number in range(20)]
+    text = "\n\n".join(
+        [paragraphs[0], "Read more: other news", paragraphs[0], *paragraphs[1:]]
+    )
+    budget = PromptBudget(max_input_tokens=300, counter=counter)
+
+    prompt = budget.fit("Title", text)
+
+    assert prompt.trimmed
+    assert prompt.tokens <= 300
+    kept = prompt.text.split("\n\n")
+    assert kept[0] == "Title"
+    assert kept[1:] == paragraphs[: len(kept) - 1]
+    assert "Read more" not in prompt.text
+
+
+def test_an_oversized_lead_paragraph_is_cut():
+    budget = PromptBudget(max_input_tokens=50, counter=counter)
+
+    prompt = budget.fit("Title", make_paragraph(1, words=500))
+
+    assert 0 < prompt.tokens <= 50
+    assert prompt.text.startswith("Title\n\nword1")
+
+
+def test_estimate_counts_cyrillic_denser_than_latin():
+    assert counter.count("a" * 40) == 10
+    assert counter.count("я" * 40) == 20
@@ -0,0 +1,31 @@
+import pytest
+
+from channel_automation.assistant.methods import AsyncAssistant, partial_post_text
+
+
+async def stream(pieces):
+    for piece in pieces:
+        yield {"choices": [{"delta": {"function_call": {"arguments": piece}}}]}
+    yield {"choices": [{"delta": {}, "finish_reason": "stop"}]}
+
+
+def test_partial_post_text_reads_an_unfinished_function_call():
+    assert partial_post_text('{"social_post": "Пхукет откры') == "Пхукет откры"
+    assert partial_post_text('{"social_post": "Line\\') == "Line"
+    assert partial_post_text('{"images_se') == ""
+    assert partial_post_text("") == ""
+
+
+@pytest.mark.asyncio
+async def test_streamed_chunks_are_reported_and_joined():
+    progress = []
+
+    async def on_progress(text):
+        progress.append(text)
+
+    content = await AsyncAssistant._read_stream(
+        stream(['{"social_post": ', '"Hi', ' there"}']), on_progress
+    )
+
+    assert content == '{"social_post": "Hi there"}'
+    assert [partial_post_text(text) for text in progress] == ["", "Hi", "Hi there"]
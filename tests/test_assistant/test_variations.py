@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from channel_automation.assistant.methods import (
+    parse_variations,
+    posts_from_variations,
+    variations_function_params,
+    variations_template,
+)
+from channel_automation.assistant.models import Completion
+from channel_automation.services.bot.post import create_original_keyboard
+
+
+def test_one_schema_covers_every_requested_variation():
+    params = variations_function_params([1, 3])
+
+    schema = params["functions"][0]["parameters"]
+    assert schema["required"] == ["variation_1", "variation_3"]
+    assert params["function_call"] == {"name": params["functions"][0]["name"]}
+    assert "### Variation 3" in variations_template([1, 3])
+
+
+def test_variations_become_posts_sharing_the_usage():
+    answer = json.dumps(
+        {
+            "variation_1": {"social_post": "One", "images_search": "beach"},
+            "variation_2": {"social_post": "Two", "images_search": "sea"},
+        }
+    )
+    completion = Completion(answer, input_tokens=3000, output_tokens=600)
+
+    posts = posts_from_variations(parse_variations(answer, [1, 2, 3]), completion)
+
+    assert [post.social_post for post in posts.values()] == ["One", "Two"]
+    assert posts[2].input_tokens == 1500 and posts[2].output_tokens == 300
+
+
+def test_no_variations_is_an_error():
+    with pytest.raises(ValueError):
+        parse_variations('{"something": "else"}', [1, 2])
+
+
+def test_flip_buttons_wrap_around_the_drafts():
+    keyboard = create_original_keyboard("article", 6, variations=(4, 3))
+
+    previous_button, next_button = keyboard.inline_keyboard[0]
+    assert previous_button.callback_data == "flip:article:5:4:3"
+    assert next_button.callback_data == "flip:article:4:4:3"
+    assert len(next_button.callback_data.encode()) <= 64
@@ -0,0 +1,162 @@
+import pytest
+from telegram.error import BadRequest
+
+from channel_automation.models import Admin, Digest, DigestItem
+from channel_automation.services.bot.digest import (
+    MAX_DIGEST_ATTEMPTS,
+    DigestHandlers,
+    paginate_digest,
+    render_digest_page,
+)
+from channel_automation.services.bot.notifications import NotificationDispatcher
+
+
+def make_item(number, title=None, chat_id="1"):
+    return DigestItem(
+        id=number,
+        chat_id=chat_id,
+        article_id=f"{number:020d}",
+        title=title or f"Article {number}",
+        source=f"https://news.example.com/{number}",
+    )
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.errors = []
+
+    async def send_message(self, chat_id, text, reply_markup, parse_mode):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, text, reply_markup))
+
+
+class FakeRepository:
+    def __init__(self, items, admins=("1", "2")):
+        self.items = items
+        self.digests = {}
+        self.admins = [Admin(user_id=user_id, name=user_id) for user_id in admins]
+
+    def get_active_admins(self):
+        return self.admins
+
+    def get_pending_digest_items(self):
+        return [item for item in self.items if item.digest_id is None]
+
+    def create_digest(self, chat_id, item_ids):
+        digest = Digest(id=len(self.digests) + 1, chat_id=chat_id)
+        self.digests[digest.id] = digest
+        for item in self.items:
+            if item.id in item_ids:
+                item.digest_id = digest.id
+        return digest
+
+    def delete_digest(self, digest_id, max_attempts):
+        del self.digests[digest_id]
+        dropped = [
+            item
+            for item in self.items
+            if item.digest_id == digest_id and item.attempts >= max_attempts - 1
+        ]
+        self.items = [item for item in self.items if item not in dropped]
+        for item in self.items:
+            if item.digest_id == digest_id:
+                item.digest_id = None
+                item.attempts += 1
+        return len(dropped)
+
+    def delete_pending_digest_items(self, chat_ids):
+        self.items = [
+            item
+            for item in self.items
+            if item.chat_id not in chat_ids or item.digest_id is not None
+        ]
+
+    def delete_digests_before(self, before):
+        pass
+
+
+@pytest.fixture
+def handlers():
+    handlers = DigestHandlers(FakeBot(), None, None, None, None, [])
+    handlers.notifications = NotificationDispatcher(global_rate=1000)
+    return handlers
+
+
+def test_a_digest_is_split_by_count_and_length():
+    items = [make_item(number) for number in range(1, 26)]
+    assert [len(page) for page in paginate_digest(items, page_size=10)] == [10, 10, 5]
+
+    long_items = [make_item(number, "x" * 180) for number in range(1, 9)]
+    pages = paginate_digest(long_items, page_size=10, max_length=900)
+
+    assert [len(page) for page in pages] == [3, 3, 2]
+    assert [number for number, _ in pages[1]] == [4, 5, 6]
+
+
+def test_a_digest_page_fits_telegram_limits():
+    items = [make_item(number, "_" * 500) for number in range(1, 40)]
+
+    text, keyboard = render_digest_page(123456, items, page=1)
+    first, _ = paginate_digest(items)[1][0]
+
+    assert len(text) <= 4096
+    # Escaped, the title is twice as long
+    assert first < 11
+    assert "page 2 of" in text
+    buttons = [button for row in keyboard.inline_keyboard for button in row]
+    assert buttons[0].callback_data == f"digest_post:{items[first - 1].article_id}"
+    assert [button.text for button in buttons[-2:]] == ["« Previous", "Next »"]
+    assert all(len(button.callback_data.encode()) <= 64 for button in buttons)
+
+
+@pytest.mark.asyncio
+async def test_pending_articles_are_sent_as_one_digest_per_chat(handlers):
+    handlers.repo = FakeRepository(
+        [make_item(1), make_item(2), make_item(3, chat_id="2")]
+    )
+
+    assert await handlers.send_due_digests() == 2
+
+    assert sorted(chat_id for chat_id, _, _ in handlers.bot.sent) == ["1", "2"]
+    assert handlers.repo.get_pending_digest_items() == []
+    # Nothing new, nothing sent
+    assert await handlers.send_due_digests() == 0
+
+
+@pytest.mark.asyncio
+async def test_an_undelivered_digest_is_sent_again(handlers):
+    handlers.repo = FakeRepository([make_item(1), make_item(2)])
+    handlers.bot.errors = [BadRequest("Chat not found")]
+
+    assert await handlers.send_due_digests() == 0
+    assert len(handlers.repo.get_pending_digest_items()) == 2
+
+    assert await handlers.send_due_digests() == 1
+    assert "*2 new articles*" in handlers.bot.sent[0][1]
+
+
+@pytest.mark.asyncio
+async def test_articles_are_dropped_after_too_many_unsent_digests(handlers):
+    handlers.repo = FakeRepository([make_item(1)])
+    handlers.bot.errors = [
+        BadRequest("Forbidden: bot was blocked by the user")
+    ] * MAX_DIGEST_ATTEMPTS
+
+    for _ in range(MAX_DIGEST_ATTEMPTS):
+        assert await handlers.send_due_digests() == 0
+
+    assert handlers.repo.items == []
+
+
+@pytest.mark.asyncio
+async def test_articles_of_inactive_admins_are_deleted(handlers):
+    handlers.repo = FakeRepository(
+        [make_item(1), make_item(2, chat_id="2")], admins=["1"]
+    )
+
+    assert await handlers.send_due_digests() == 1
+
+    assert [chat_id for chat_id, _, _ in handlers.bot.sent] == ["1"]
+    assert handlers.repo.get_pending_digest_items() == []
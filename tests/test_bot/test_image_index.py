@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import io
+import random
+from datetime import datetime, timedelta
+
+from PIL import Image, ImageDraw
+
+from channel_automation.services.image_index import (
+    BKTree,
+    Fingerprint,
+    ImageFingerprintIndex,
+)
+from channel_automation.services.images import (
+    hamming_distance,
+    image_hash,
+    perceptual_hash,
+)
+
+
+def picture(seed):
+    rng = random.Random(seed)
+    image = Image.new("RGB", (640, 480), "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randrange(600), rng.randrange(440)
+        colour = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse(
+            (x, y, x + rng.randrange(40, 200), y + rng.randrange(40, 200)), colour
+        )
+    return image
+
+
+def test_copies_of_a_picture_hash_alike():
+    original = picture(1)
+    copy = io.BytesIO()
+    original.resize((320, 240)).save(copy, "JPEG", quality=60)
+
+    distance = hamming_distance(perceptual_hash(original), image_hash(copy.getvalue()))
+
+    assert distance <= 4
+    assert hamming_distance(perceptual_hash(original), perceptual_hash(picture(2))) > 16
+
+
+def test_the_tree_finds_what_a_linear_scan_finds():
+    rng = random.Random(7)
+    now = datetime(2023, 11, 27)
+    fingerprints = [Fingerprint("c", rng.getrandbits(64), now) for _ in range(500)]
+    # Near copies of a few of them
+    fingerprints += [
+        Fingerprint("c", item.phash ^ (1 << rng.randrange(64)), now)
+        for item in fingerprints[:50]
+    ]
+    tree = BKTree()
+    for fingerprint in fingerprints:
+        tree.add(fingerprint)
+
+    for query in fingerprints[:60]:
+        expected = [
+            item
+            for item in fingerprints
+            if hamming_distance(item.phash, query.phash) <= 10
+        ]
+        found = tree.search(query.phash, 10)
+        assert sorted(id(item) for item in found) == sorted(
+            id(item) for item in expected
+        )
+
+
+class FakeRepository:
+    def __init__(self, clock):
+        self.clock = clock
+        self.rows = []
+
+    def add_image_fingerprint(self, channel_id, phash):
+        self.rows.append(
+            SimpleNamespace(
+                channel_id=channel_id, phash=phash, published_at=self.clock()
+            )
+        )
+
+    def get_image_fingerprints(self, since):
+        return [row for row in self.rows if row.published_at >= since]
+
+
+def test_published_images_are_found_per_channel_within_the_window():
+    now = [datetime(2023, 11, 27)]
+    clock = lambda: now[0]
+    index = ImageFingerprintIndex(
+        FakeRepository(clock), window=timedelta(days=30), clock=clock
+    )
+    index.add("@travel", 0b1111)
+
+    assert index.is_duplicate(0b0111)
+    assert index.is_duplicate(0b0111, "@travel")
+    assert not index.is_duplicate(0b0111, "@news")
+    assert not index.is_duplicate(2**64 - 1)
+
+    now[0] += timedelta(days=31)
+    assert not index.is_duplicate(0b1111)
+    assert index.stats().fingerprints == 0
@@ -0,0 +1,89 @@
+import io
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from PIL import Image
+
+from channel_automation.services.images import (
+    ImagePipeline,
+    ImageRejected,
+    process_image,
+)
+
+
+def encode(size, mode="RGB", format="PNG"):
+    output = io.BytesIO()
+    Image.new(mode, size, "red").save(output, format)
+    return output.getvalue()
+
+
+def test_large_images_are_scaled_down_to_a_jpeg():
+    jpeg, width, height, _ = process_image(encode((4000, 2000)), max_side=1280)
+
+    assert (width, height) == (1280, 640)
+    with Image.open(io.BytesIO(jpeg)) as image:
+        assert (image.format, image.mode) == ("JPEG", "RGB")
+
+
+def test_transparent_images_are_flattened():
+    jpeg, _, _, _ = process_image(encode((400, 400), mode="RGBA"))
+
+    with Image.open(io.BytesIO(jpeg)) as image:
+        assert image.mode == "RGB"
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"<html>not an image</html>", encode((100, 100)), encode((4200, 200))],
+    ids=["broken", "tiny", "narrow"],
+)
+def test_unusable_images_are_rejected(data):
+    with pytest.raises(ImageRejected):
+        process_image(data)
+
+
+@pytest_asyncio.fixture
+async def images():
+    files = {
+        "small.png": encode((50, 50)),
+        "photo.png": encode((2000, 1500)),
+        "huge.png": b"0" * 64 * 1024,
+    }
+
+    async def serve(request):
+        name = request.match_info["name"]
+        if name not in files:
+            raise web.HTTPNotFound()
+        return web.Response(body=files[name], content_type="image/png")
+
+    app = web.Application()
+    app.router.add_get("/{name}", serve)
+    server = TestServer(app)
+    await server.start_server()
+    yield lambda name: str(server.make_url(f"/{name}"))
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_the_first_usable_image_is_prepared(images):
+    pipeline = ImagePipeline(max_download_bytes=32 * 1024, max_side=1000)
+    urls = [images(name) for name in ["missing.png", "huge.png", "small.png"]]
+    urls.append(images("photo.png"))
+
+    prepared = await pipeline.prepare_first(urls)
+    await pipeline.close()
+
+    assert prepared.url == images("photo.png")
+    assert (prepared.width, prepared.height) == (1000, 750)
+    stats = pipeline.stats()
+    assert (stats.failed_downloads, stats.rejected, stats.prepared) == (1, 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_nothing_is_prepared_without_a_usable_image(images):
+    pipeline = ImagePipeline()
+
+    assert await pipeline.prepare_first([images("small.png")]) is None
+    await pipeline.close()
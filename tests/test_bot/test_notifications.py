@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import pytest
+from telegram.error import BadRequest, Forbidden, RetryAfter
+
+from channel_automation.services.bot.notifications import (
+    Notification,
+    NotificationDispatcher,
+    RateLimiter,
+)
+
+
+class FakeBot:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+        self.errors = []
+
+    async def send_message(self, chat_id, text, reply_markup, parse_mode):
+        await asyncio.sleep(self.delay)
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, text, time.monotonic()))
+
+
+@pytest.mark.asyncio
+async def test_the_limiter_allows_a_burst_then_the_rate():
+    limiter = RateLimiter(rate=20, burst=2)
+    started = time.monotonic()
+
+    for _ in range(4):
+        await limiter.acquire()
+
+    assert 0.09 <= time.monotonic() - started < 0.3
+
+
+@pytest.mark.asyncio
+async def test_chats_are_served_concurrently_and_in_order():
+    bot = FakeBot(delay=0.1)
+    dispatcher = NotificationDispatcher(global_rate=1000)
+    started = time.monotonic()
+
+    for chat_id in (1, 2, 3):
+        for number in range(2):
+            assert await dispatcher.submit(bot, Notification(chat_id, f"{number}"))
+    # Submitting never waits for Telegram
+    assert time.monotonic() - started < 0.05
+    await dispatcher.join()
+
+    assert time.monotonic() - started < 0.35
+    for chat_id in (1, 2, 3):
+        assert [text for chat, text, _ in bot.sent if chat == chat_id] == ["0", "1"]
+    assert dispatcher.stats().sent == 6
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_deliveries():
+    bot = FakeBot()
+    bot.errors = [RetryAfter(1)]
+    dispatcher = NotificationDispatcher(global_rate=1000)
+    started = time.monotonic()
+
+    await dispatcher.submit(bot, Notification(1, "article"))
+    await dispatcher.submit(bot, Notification(2, "article"))
+    await dispatcher.join()
+
+    assert len(bot.sent) == 2
+    assert all(sent_at - started >= 1 for _, _, sent_at in bot.sent)
+    stats = dispatcher.stats()
+    assert (stats.rate_limited, stats.retried, stats.failed) == (1, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_a_bad_message_does_not_block_the_chat():
+    bot = FakeBot()
+    bot.errors = [BadRequest("Can't parse entities")]
+    dispatcher = NotificationDispatcher(global_rate=1000)
+
+    broken = await dispatcher.submit(bot, Notification(1, "*broken"))
+    fine = await dispatcher.submit(bot, Notification(1, "fine"))
+
+    broken, fine = await broken, await fine
+    assert (broken.delivered, broken.permanent, fine.delivered) == (False, True, True)
+    assert [text for _, text, _ in bot.sent] == ["fine"]
+    assert dispatcher.stats().failed == 1
+
+
+@pytest.mark.asyncio
+async def test_a_blocked_chat_is_not_retried():
+    bot = FakeBot()
+    bot.errors = [Forbidden("Forbidden: bot was blocked by the user")]
+    dispatcher = NotificationDispatcher(global_rate=1000)
+
+    delivery = await (await dispatcher.submit(bot, Notification(1, "article")))
+
+    assert delivery.permanent and not bot.sent
+    assert dispatcher.stats().retried == 0
+
+
+@pytest.mark.asyncio
+async def test_a_full_queue_drops_messages():
+    dispatcher = NotificationDispatcher(max_queue_size=1)
+    bot = FakeBot(delay=0.1)
+
+    assert await dispatcher.submit(bot, Notification(1, "first"))
+    assert not await dispatcher.submit(bot, Notification(2, "second"))
+    await dispatcher.close()
+
+    assert dispatcher.stats().dropped == 1
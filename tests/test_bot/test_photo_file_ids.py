@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import BadRequest
+
+from channel_automation.models import Post
+from channel_automation.services.bot.base import BaseHandlers
+from channel_automation.services.images import PreparedImage
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.rejected = set()
+
+    async def send_photo(self, chat_id, photo, caption, parse_mode, reply_markup):
+        self.sent.append(photo)
+        if photo in self.rejected:
+            raise BadRequest("Wrong file identifier/http url specified")
+        return SimpleNamespace(
+            photo=[SimpleNamespace(file_id=f"file-{len(self.sent)}")]
+        )
+
+
+class FakeRepository:
+    def __init__(self):
+        self.file_ids = {}
+
+    def get_image_file_id(self, url):
+        return self.file_ids.get(url)
+
+    def save_image_file_id(self, url, file_id):
+        self.file_ids[url] = file_id
+
+    def delete_image_file_id(self, url):
+        self.file_ids.pop(url, None)
+
+
+class FakePipeline:
+    def __init__(self):
+        self.broken = set()
+
+    async def prepare_first(self, urls, accept=None):
+        for url in urls:
+            image = PreparedImage(url, f"jpeg of {url}".encode(), 800, 600, 0)
+            if url not in self.broken and (accept is None or accept(image)):
+                return image
+        return None
+
+
+@pytest.fixture
+def handlers():
+    handlers = BaseHandlers(FakeBot(), FakeRepository(), None, None, None, [])
+    handlers.images = FakePipeline()
+    return handlers
+
+
+@pytest.mark.asyncio
+async def test_an_image_url_is_uploaded_once(handlers):
+    post = Post("Post", images_url=["https://img.example.com/1.jpg"])
+
+    await handlers.send_post_photo(1, post, "Post")
+    await handlers.send_post_photo(-100, post, "Post in the channel")
+
+    assert handlers.bot.sent == [b"jpeg of https://img.example.com/1.jpg", "file-1"]
+
+
+@pytest.mark.asyncio
+async def test_a_rejected_file_id_is_replaced(handlers):
+    url = "https://img.example.com/1.jpg"
+    handlers.repo.save_image_file_id(url, "expired")
+    handlers.bot.rejected.add("expired")
+
+    await handlers.send_post_photo(1, Post("Post", images_url=[url]), "Post")
+
+    assert handlers.bot.sent == ["expired", b"jpeg of " + url.encode()]
+    assert handlers.repo.file_ids[url] == "file-2"
+
+
+@pytest.mark.asyncio
+async def test_markdown_errors_are_not_blamed_on_the_file_id(handlers):
+    url = "https://img.example.com/1.jpg"
+    handlers.repo.save_image_file_id(url, "file-0")
+
+    async def send_photo(**kwargs):
+        raise BadRequest("Can't parse entities: can't find end of the entity")
+
+    handlers.bot.send_photo = send_photo
+    with pytest.raises(BadRequest):
+        await handlers.send_post_photo(1, Post("*Post", images_url=[url]), "*Post")
+
+    assert handlers.repo.file_ids[url] == "file-0"
+
+
+@pytest.mark.asyncio
+async def test_the_first_usable_candidate_is_uploaded(handlers):
+    broken, good = "https://a.example.com/1.jpg", "https://b.example.com/2.jpg"
+    handlers.images.broken.add(broken)
+
+    await handlers.send_post_photo(1, Post("Post", images_url=[broken, good]), "Post")
+
+    assert handlers.repo.file_ids == {good: "file-1"}
+
+
+@pytest.mark.asyncio
+async def test_no_usable_image_sends_nothing(handlers):
+    url = "https://img.example.com/1.jpg"
+    handlers.images.broken.add(url)
+
+    message = await handlers.send_post_photo(1, Post("Post", images_url=[url]), "Post")
+
+    assert message is None
+    assert handlers.bot.sent == []
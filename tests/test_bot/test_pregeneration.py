@@ -0,0 +1,169 @@
+from types import SimpleNamespace
+
+import asyncio
+import datetime
+from collections import defaultdict
+
+import pytest
+
+from channel_automation.assistant.budget import DailyTokenBudget
+from channel_automation.assistant.governor import BACKGROUND
+from channel_automation.models import Post
+from channel_automation.services.bot.post import PostHandlers
+from channel_automation.services.pregeneration import DraftPregenerator
+
+
+class FakeAssistant:
+    def __init__(self):
+        self.priorities = []
+
+    async def generate_post(self, news_article, variation_number, priority=0):
+        self.priorities.append(priority)
+        return Post(
+            social_post=f"Draft for {news_article.title}",
+            input_tokens=900,
+            output_tokens=100,
+        )
+
+
+class FakeRepository:
+    async def append_post(self, news_article, post):
+        news_article.posts.append(post)
+        return len(news_article.posts) - 1
+
+
+@pytest.mark.asyncio
+async def test_drafts_are_generated_within_the_daily_budget(make_article):
+    assistant = FakeAssistant()
+    pregenerator = DraftPregenerator(
+        assistant,
+        FakeRepository(),
+        budget=DailyTokenBudget(daily_tokens=2500),
+    )
+    await pregenerator.start()
+    articles = [
+        make_article(f"https://example.com/{number}", id=f"id{number}")
+        for number in range(2)
+    ]
+
+    drafted = []
+
+    async def on_drafted(article, post_index):
+        drafted.append((article.id, post_index))
+
+    for article in articles:
+        assert await pregenerator.add_draft(article, on_drafted)
+    await pregenerator._queue.join()
+    await pregenerator.close()
+    # Already drafted, e.g. delivered again
+    assert not await pregenerator.add_draft(articles[1], on_drafted)
+
+    # Newest first, the budget ran out on the older article
+    assert [len(article.posts) for article in articles] == [0, 1]
+    assert drafted == [("id1", 0)]
+    assert articles[1].posts[0].social_post.startswith("Draft for")
+    assert assistant.priorities == [BACKGROUND]
+    stats = pregenerator.stats()
+    assert (stats.generated, stats.skipped_budget) == (1, 1)
+    assert stats.budget.tokens == 1000
+
+
+@pytest.mark.asyncio
+async def test_full_queue_skips_the_draft(make_article):
+    pregenerator = DraftPregenerator(
+        FakeAssistant(), FakeRepository(), max_queue_size=1
+    )
+    # Not started, so nothing drains the queue
+    pregenerator._queue = asyncio.PriorityQueue(maxsize=1)
+    on_drafted = None  # never called
+    first = make_article("https://example.com/0", id="id0")
+    assert await pregenerator.add_draft(first, on_drafted)
+
+    article = make_article("https://example.com/1", id="id1")
+    assert not await pregenerator.add_draft(article, on_drafted)
+
+    assert pregenerator.stats().skipped_full == 1
+
+
+def test_budget_resets_every_day():
+    day = [datetime.date(2023, 11, 8)]
+    budget = DailyTokenBudget(daily_tokens=1000, today=lambda: day[0])
+    budget.record(900, 100)
+    assert not budget.allows(1)
+
+    day[0] = datetime.date(2023, 11, 9)
+    assert budget.allows(1000)
+
+
+class SlowAssistant(FakeAssistant):
+    async def generate_post(self, news_article, variation_number, priority=0):
+        await asyncio.sleep(10)
+
+
+@pytest.mark.asyncio
+async def test_adding_a_draft_never_waits_for_it(make_article):
+    pregenerator = DraftPregenerator(SlowAssistant(), FakeRepository())
+    await pregenerator.start()
+    drafted = []
+
+    async def on_drafted(article, post_index):
+        drafted.append(article.id)
+
+    for number in range(3):
+        article = make_article(f"https://example.com/{number}", id=f"id{number}")
+        await asyncio.wait_for(pregenerator.add_draft(article, on_drafted), 0.01)
+    # The worker takes the newest article, the others wait in the queue
+    await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(pregenerator.close(timeout=0.05), 1)
+    assert drafted == []
+    assert pregenerator.stats().queued == 0
+
+
+class FakeBot:
+    def __init__(self):
+        self.photos = []
+
+    async def send_photo(self, chat_id, photo, caption, parse_mode, reply_markup):
+        self.photos.append(photo)
+        return SimpleNamespace(
+            message_id=100 + len(self.photos),
+            photo=[SimpleNamespace(file_id=f"file-{len(self.photos)}")],
+        )
+
+
+class FakeImageRepository:
+    def __init__(self):
+        self.images = {}
+
+    async def set_post_images(self, news_article, post_index, images_id, images_url):
+        self.images[post_index] = (images_id, images_url)
+
+    def get_image_file_id(self, url):
+        return None
+
+    def save_image_file_id(self, url, file_id):
+        pass
+
+
+class FakePipeline:
+    async def prepare_first(self, urls, accept=None):
+        return SimpleNamespace(url=urls[0], data=f"jpeg of {urls[0]}".encode())
+
+
+@pytest.mark.asyncio
+async def test_a_draft_is_sent_with_an_image_and_answers_replies(make_article):
+    repository = FakeImageRepository()
+    handlers = PostHandlers(FakeBot(), repository, repository, None, None, [])
+    handlers.images = FakePipeline()
+    article = make_article(id="id0", images_url=["https://img.example.com/1.jpg"])
+    article.posts = [Post(social_post="Draft")]
+    chat_data = defaultdict(dict)
+
+    await handlers.send_draft(chat_data, ["1", "2"], article, 0)
+
+    # Uploaded once, the second admin gets the file Telegram already has
+    assert handlers.bot.photos == [b"jpeg of https://img.example.com/1.jpg", "file-1"]
+    assert chat_data[1][101] == {"article_id": "id0", "post_index": 0}
+    assert chat_data[2][102] == {"article_id": "id0", "post_index": 0}
+    assert repository.images[0][0] == ["file-1"]
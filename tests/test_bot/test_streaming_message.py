@@ -0,0 +1,36 @@
+import pytest
+
+from channel_automation.services.bot.streaming import StreamingMessage
+
+
+class FakeMessage:
+    def __init__(self, text):
+        self.text = text
+        self.edits = []
+
+    async def edit_text(self, text, parse_mode=None, reply_markup=None):
+        self.edits.append((text, parse_mode, reply_markup))
+        return self
+
+
+@pytest.mark.asyncio
+async def test_previews_are_throttled_and_the_keyboard_comes_last():
+    now = [0.0]
+    message = FakeMessage("Processing...")
+    preview = StreamingMessage(message, min_interval=1.5, clock=lambda: now[0])
+
+    await preview.update("Hello")
+    await preview.update("Hello wor")  # too soon, skipped
+    now[0] = 1.0
+    await preview.update("Hello world")  # still too soon
+    now[0] = 1.6
+    await preview.update("Hello world!")
+    await preview.update("Hello world!")  # unchanged
+    await preview.finish("*Hello world!*", reply_markup="keyboard")
+
+    assert message.edits == [
+        ("Hello", None, None),
+        ("Hello world!", None, None),
+        ("*Hello world!*", "Markdown", "keyboard"),
+    ]
+    assert preview.edits == 2
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from channel_automation.services.crawler.bulk_writer import (
+    BulkArticleWriter,
+    PendingArticle,
+)
+
+
+class FakeRepository:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.batches = []
+
+    async def bulk_create_news_articles(self, news_articles):
+        self.batches.append([article.source for article in news_articles])
+        statuses = self.responses.pop(0)
+        for article in news_articles:
+            article.id = f"id:{article.source}"
+        return {f"id:{source}": status for source, status in statuses.items()}
+
+
+@pytest.mark.asyncio
+async def test_flush_on_size_hands_over_created_articles_only(make_article):
+    repository = FakeRepository([{"a": 201, "b": 409}])
+    saved = []
+
+    async def on_saved(article):
+        saved.append(article.source)
+
+    writer = BulkArticleWriter(repository, on_saved, max_batch_size=2)
+    await writer.add(make_article("a"))
+    assert not repository.batches
+    await writer.add(make_article("b"))
+
+    assert repository.batches == [["a", "b"]]
+    assert saved == ["a"]
+    assert writer.stats().duplicates == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_items_are_retried_on_the_next_flush(make_article):
+    repository = FakeRepository([{"a": 201, "b": 429}, {"b": 201}])
+    saved = []
+
+    async def on_saved(article):
+        saved.append(article.source)
+
+    writer = BulkArticleWriter(repository, on_saved, flush_interval=0.01)
+    await writer.start()
+    await writer.add(make_article("a"))
+    await writer.add(make_article("b"))
+    for _ in range(100):
+        if len(saved) == 2:
+            break
+        await asyncio.sleep(0.01)
+    await writer.close()
+
+    assert repository.batches == [["a", "b"], ["b"]]
+    assert saved == ["a", "b"]
+    assert writer.stats().retried == 1
+    assert writer.stats().buffered == 0
+
+
+@pytest.mark.asyncio
+async def test_close_writes_everything_still_buffered(make_article):
+    sources = [f"s{number}" for number in range(8)]
+    repository = FakeRepository(
+        [
+            {source: 201 for source in sources[:5]},
+            {source: 201 for source in sources[5:]},
+        ]
+    )
+    saved = []
+
+    async def on_saved(article):
+        saved.append(article.source)
+
+    writer = BulkArticleWriter(
+        repository, on_saved, max_batch_size=5, flush_interval=60
+    )
+    await writer.start()
+    # Below the batch size, nothing is written before closing
+    for source in sources[:4]:
+        await writer.add(make_article(source))
+    writer._buffer.update(
+        (source, PendingArticle(make_article(source))) for source in sources[4:]
+    )
+    await writer.close()
+
+    assert repository.batches == [sources[:5], sources[5:]]
+    assert saved == sources
+    assert writer.stats().buffered == 0
+
+
+@pytest.mark.asyncio
+async def test_a_failed_hand_over_is_retried(make_article):
+    repository = FakeRepository([{"a": 201, "b": 201}])
+    saved = []
+    failures = [ConnectionError("outbox is down")]
+
+    async def on_saved(article):
+        if failures:
+            raise failures.pop()
+        saved.append(article.source)
+
+    writer = BulkArticleWriter(repository, on_saved, max_batch_size=2)
+    await writer.add(make_article("a"))
+    await writer.add(make_article("b"))
+    assert saved == [] and writer.stats().unannounced == 2
+
+    await writer.flush()
+
+    assert saved == ["a", "b"]
+    assert writer.stats().unannounced == 0
+    assert writer.stats().handover_failures == 1
+
+
+@pytest.mark.asyncio
+async def test_conflict_after_an_unanswered_request_counts_as_written(make_article):
+    repository = FakeRepository([{}, {"a": 409}])
+    saved = []
+
+    async def on_saved(article):
+        saved.append(article.source)
+
+    writer = BulkArticleWriter(repository, on_saved, max_batch_size=1)
+    # The first request got no answer, but Elasticsearch wrote the article
+    await writer.add(make_article("a"))
+    await writer.flush()
+
+    assert saved == ["a"]
+    assert writer.stats().duplicates == 0
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from channel_automation.services.crawler.extraction import ExtractionExecutor
+
+html_content = """
+<html>
+  <head><title>Pattaya beach reopens</title></head>
+  <body>
+    <article>
+      <h1>Pattaya beach reopens</h1>
+      <p>The beach in Pattaya has reopened to tourists after a month of
+      renovation works, the city hall announced on Monday.</p>
+      <p>Officials said the new promenade, the lighting and the showers are
+      ready and the lifeguards are back on duty along the whole shoreline.</p>
+      <p>Visitors are asked to keep the sand clean and to use the new bins
+      that were installed every fifty metres along the beach road.</p>
+    </article>
+  </body>
+</html>
+"""
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ExtractionExecutor.MODES)
+async def test_extract_in_every_mode(mode):
+    executor = ExtractionExecutor(mode=mode, max_workers=1, max_queue_size=1)
+    try:
+        extracted_data = await executor.extract(html_content)
+        assert "renovation works" in json.loads(extracted_data)["text"]
+
+        stats = executor.stats()
+        assert stats.extractions == 1
+        assert stats.running == 0
+        assert stats.total_cpu_seconds >= 0
+    finally:
+        executor.shutdown()
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        ExtractionExecutor(mode="gpu")
@@ -0,0 +1,51 @@
+from typing import Optional
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from channel_automation.services.crawler.sources.base_web_crawler import BaseWebCrawler
+from channel_automation.services.http_client import HTTPClientManager
+
+
+class LocalCrawler(BaseWebCrawler):
+    def extract_news_links(self, html_content: Optional[str]) -> list[str]:
+        return []
+
+    def extract_main_image(self, html_content: Optional[str]) -> Optional[str]:
+        return None
+
+
+@pytest_asyncio.fixture
+async def local_server():
+    async def handler(request):
+        return web.Response(text="<html>ok</html>")
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}/"
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_crawl_runs_share_pooled_connections(local_server):
+    manager = HTTPClientManager()
+    try:
+        # Two separate crawl runs, as the scheduler would do every cycle
+        for _ in range(2):
+            async with LocalCrawler(local_server, http_client=manager) as crawler:
+                assert await crawler.fetch(local_server) == "<html>ok</html>"
+            assert not crawler.session  # the borrowed session is released
+
+        stats = manager.stats()
+        assert stats.requests == 2
+        assert stats.created == 1
+        assert stats.reused == 1
+        assert stats.idle == 1
+    finally:
+        await manager.close()
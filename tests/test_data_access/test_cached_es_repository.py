@@ -0,0 +1,84 @@
+import pytest
+
+from channel_automation.cache import TTLCache
+from channel_automation.data_access.elasticsearch.cached import CachedESRepository
+from channel_automation.models import NewsArticle, Post
+
+
+class FakeRepository:
+    def __init__(self, articles):
+        self.articles = {article.id: article for article in articles}
+        self.reads = 0
+
+    async def get_news_article_by_id(self, article_id):
+        self.reads += 1
+        article = self.articles.get(article_id)
+        if article is None:
+            return None
+        return NewsArticle(**{**article.__dict__, "posts": list(article.posts)})
+
+    async def append_posts(self, news_article, posts):
+        post_index = len(news_article.posts)
+        news_article.posts.extend(posts)
+        self.articles[news_article.id].posts.extend(posts)
+        return post_index
+
+    async def set_post_images(self, news_article, post_index, images_id, images_url):
+        raise ConnectionError("Elasticsearch is down")
+
+
+@pytest.mark.asyncio
+async def test_repeated_reads_hit_the_cache(make_article):
+    repository = CachedESRepository(
+        FakeRepository([make_article("https://example.com/a", id="a")])
+    )
+
+    first = await repository.get_news_article_by_id("a")
+    first.title = "changed locally"
+    second = await repository.get_news_article_by_id("a")
+
+    assert second.title == "Title"
+    assert repository.repository.reads == 1
+    stats = repository.stats()
+    assert (stats.hits, stats.misses) == (1, 1)
+    assert await repository.get_news_article_by_id("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_writes_refresh_or_drop_the_cached_article(make_article):
+    repository = CachedESRepository(
+        FakeRepository([make_article("https://example.com/a", id="a")])
+    )
+    article = await repository.get_news_article_by_id("a")
+
+    post_index = await repository.append_post(article, Post(social_post="post"))
+    cached = await repository.get_news_article_by_id("a")
+    assert cached.posts[post_index].social_post == "post"
+    assert repository.repository.reads == 1
+
+    # The write may have been applied, the next read has to go to Elasticsearch
+    with pytest.raises(ConnectionError):
+        await repository.set_post_images(cached, post_index, images_id=["file-id"])
+    await repository.get_news_article_by_id("a")
+    assert repository.repository.reads == 2
+
+
+def test_ttl_cache_evicts_by_age_count_and_size():
+    now = [0.0]
+    cache = TTLCache(
+        max_entries=2, ttl=10, max_size=10, sizeof=len, clock=lambda: now[0]
+    )
+
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    cache.get("a")
+    cache.set("c", "cccc")  # over the size budget, "b" is least recently used
+    assert "b" not in cache and "a" in cache and "c" in cache
+
+    cache.set("huge", "x" * 11)
+    assert "huge" not in cache
+
+    now[0] = 10
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats.evictions == 1 and stats.expirations == 1
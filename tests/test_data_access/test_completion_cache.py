@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+import openai
+import pytest
+from sqlmodel import SQLModel
+
+from channel_automation.assistant.methods import AsyncAssistant
+from channel_automation.assistant.models import Completion
+from channel_automation.data_access.postgresql.completion_cache import PGCompletionCache
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = PGCompletionCache(
+        f"sqlite:///{tmp_path / 'cache.db'}", ttl=3600, max_entries=2, clock=clock
+    )
+    SQLModel.metadata.create_all(cache.engine)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_and_the_least_recently_used_are_evicted(cache, clock):
+    await cache.set("a", Completion("A", 10, 5))
+    await cache.set("b", Completion("B"))
+    clock.now += timedelta(minutes=1)
+    assert (await cache.get("a")).content == "A"  # b is now the oldest
+
+    await cache.set("c", Completion("C"))
+
+    assert await cache.get("b") is None
+    clock.now += timedelta(hours=1)
+    assert await cache.get("a") is None
+    stats = cache.stats()
+    assert (stats.hits, stats.evictions, stats.expirations) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_duplicate_stories_and_regenerate(cache, monkeypatch, make_article):
+    calls = []
+
+    async def acreate(**kwargs):
+        calls.append(kwargs)
+        arguments = f'{{"social_post": "Post {len(calls)}", "images_search": "sea"}}'
+        return openai.openai_object.OpenAIObject.construct_from(
+            {
+                "choices": [{"message": {"function_call": {"arguments": arguments}}}],
+                "usage": {"prompt_tokens": 1000, "completion_tokens": 200},
+            }
+        )
+
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", acreate)
+    assistant = AsyncAssistant("token", cache=cache)
+
+    first = await assistant.generate_post(make_article("https://a.com/1"), 1)
+    # The same story syndicated by another site has the same fingerprint
+    duplicate = await assistant.generate_post(make_article("https://b.com/2"), 1)
+    regenerated = await assistant.generate_post(
+        make_article("https://a.com/1"), 1, use_cache=False
+    )
+    other_template = await assistant.generate_post(make_article("https://a.com/1"), 2)
+    await assistant.close()
+
+    assert len(calls) == 3
+    assert duplicate.social_post == first.social_post == "Post 1"
+    assert duplicate.input_tokens == duplicate.output_tokens == 0
+    assert regenerated.social_post == "Post 2"
+    assert other_template.social_post == "Post 3"
+    assert (
+        await assistant.generate_post(make_article("https://c.com/3"), 1)
+    ).social_post == "Post 2"
@@ -0,0 +1,236 @@
+import pytest
+from elasticsearch import ConflictError
+
+from channel_automation.data_access.elasticsearch.mapping import document_id
+from channel_automation.data_access.elasticsearch.methods import (
+    AsyncESRepository,
+    ESRepository,
+)
+from channel_automation.models import Post
+
+
+class FakeElasticsearch:
+    def __init__(self, stored_sources):
+        self.stored_sources = set(stored_sources)
+        self.documents = {document_id(source): {} for source in stored_sources}
+        self.searches = []
+        self.mgets = []
+
+    def search(self, index, query, size, source_includes):
+        self.searches.append(query)
+        requested = query["bool"]["filter"]["terms"]["source.keyword"]
+        hits = [
+            {"_source": {"source": source}}
+            for source in requested
+            if source in self.stored_sources
+        ]
+        return {"hits": {"hits": hits[:size]}}
+
+    def mget(self, index, ids, source):
+        self.mgets.append(ids)
+        return {"docs": [{"_id": id, "found": id in self.documents} for id in ids]}
+
+    def create(self, index, id, document):
+        if id in self.documents:
+            raise ConflictError("version_conflict_engine_exception", None, {})
+        self.documents[id] = document
+        return {"_id": id, "result": "created"}
+
+
+class FakeAsyncElasticsearch(FakeElasticsearch):
+    async def search(self, index, query, size, source_includes):
+        return super().search(index, query, size, source_includes)
+
+    async def mget(self, index, ids, source):
+        return super().mget(index, ids, source)
+
+    async def bulk(self, operations):
+        items = []
+        for action, document in zip(operations[::2], operations[1::2]):
+            doc_id = action["create"]["_id"]
+            try:
+                self.create(action["create"]["_index"], doc_id, document)
+                items.append({"create": {"_id": doc_id, "status": 201}})
+            except ConflictError:
+                items.append({"create": {"_id": doc_id, "status": 409}})
+        return {"items": items}
+
+
+def make_repository(stored_sources, legacy_index=False):
+    repository = ESRepository.__new__(ESRepository)
+    repository.index = "news"
+    repository.legacy_index = legacy_index
+    repository.es = FakeElasticsearch(stored_sources)
+    return repository
+
+
+def make_async_repository(stored_sources, legacy_index=False):
+    repository = AsyncESRepository("localhost", 9200)
+    repository.legacy_index = legacy_index
+    repository.es = FakeAsyncElasticsearch(stored_sources)
+    return repository
+
+
+@pytest.mark.asyncio
+async def test_existing_sources_uses_a_single_mget():
+    repository = make_async_repository({"https://a", "https://c"})
+
+    existing = await repository.existing_sources(
+        ["https://a", "https://b", "https://c"]
+    )
+
+    assert existing == {"https://a", "https://c"}
+    assert len(repository.es.mgets) == 1
+    assert await repository.existing_sources([]) == set()
+    assert len(repository.es.mgets) == 1
+
+
+@pytest.mark.asyncio
+async def test_existing_sources_on_legacy_index_uses_a_single_search():
+    repository = make_async_repository({"https://a", "https://c"}, legacy_index=True)
+
+    existing = await repository.existing_sources(
+        ["https://a", "https://b", "https://c"]
+    )
+
+    assert existing == {"https://a", "https://c"}
+    assert len(repository.es.searches) == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_reports_existing_articles_as_conflicts(make_article):
+    repository = make_async_repository({"https://a"})
+    articles = [make_article("https://a"), make_article("https://b")]
+
+    statuses = await repository.bulk_create_news_articles(articles)
+
+    assert statuses == {document_id("https://a"): 409, document_id("https://b"): 201}
+    assert articles[1].id == document_id("https://b")
+    assert repository.es.documents[articles[1].id]["id"] == articles[1].id
+    assert not repository.es.searches and not repository.es.mgets
+
+
+class FakeVersionedElasticsearch:
+    """Keeps a single article and applies the post scripts in Python."""
+
+    def __init__(self, posts):
+        self.posts = list(posts)
+        self.seq_no = 0
+        self.updates = 0
+
+    async def get(self, index, id, source_includes=None):
+        return {
+            "_id": id,
+            "_source": {"posts": [dict(post) for post in self.posts]},
+            "_seq_no": self.seq_no,
+            "_primary_term": 1,
+        }
+
+    async def update(self, index, id, script, if_seq_no, if_primary_term):
+        self.updates += 1
+        if if_seq_no != self.seq_no:
+            raise ConflictError("version_conflict_engine_exception", None, {})
+        params = script["params"]
+        if "posts" in params:
+            self.posts.extend(params["posts"])
+        else:
+            self.posts[params["index"]]["images_id"] = params["images_id"]
+        self.seq_no += 1
+        return {"_id": id, "_seq_no": self.seq_no, "_primary_term": 1}
+
+
+@pytest.mark.asyncio
+async def test_append_post_retries_after_a_concurrent_change(make_article):
+    repository = AsyncESRepository("localhost", 9200)
+    repository.es = FakeVersionedElasticsearch([])
+    article = make_article("https://a")
+    article.id = document_id("https://a")
+    article.seq_no, article.primary_term = 0, 1
+
+    # Another admin appends a post after this article was loaded
+    repository.es.posts.append(Post(social_post="other").__dict__)
+    repository.es.seq_no += 1
+
+    post_index = await repository.append_post(article, Post(social_post="mine"))
+    await repository.set_post_images(article, post_index, images_id=["file-id"])
+
+    assert post_index == 1
+    assert [post["social_post"] for post in repository.es.posts] == ["other", "mine"]
+    assert repository.es.posts[1]["images_id"] == ["file-id"]
+    assert article.posts[1].images_id == ["file-id"]
+    assert article.seq_no == repository.es.seq_no
+    assert repository.es.updates == 3
+
+
+class FakeSearchElasticsearch:
+    def __init__(self, hits):
+        self.hits = hits
+        self.searches = []
+
+    async def search(self, index, **search):
+        self.searches.append(search)
+        return {"hits": {"hits": self.hits[: search["size"]]}}
+
+
+@pytest.mark.asyncio
+async def test_list_latest_articles_projects_fields_and_pages():
+    repository = make_async_repository(set())
+    repository.es = FakeSearchElasticsearch(
+        [
+            {
+                "_id": f"id{number}",
+                "_source": {"title": f"Title {number}", "source": f"https://{number}"},
+                "sort": [1700000000000 - number, f"id{number}"],
+            }
+            for number in range(3)
+        ]
+    )
+
+    page = await repository.list_latest_articles(size=2)
+
+    assert [article.id for article in page.articles] == ["id0", "id1"]
+    assert page.articles[0].title == "Title 0"
+    assert page.next_cursor == "1699999999999:id1"
+    search = repository.es.searches[0]
+    assert "text" not in search["source_includes"]
+    assert "raw_text" not in search["source_includes"]
+
+    await repository.list_latest_articles(size=2, cursor=page.next_cursor)
+    assert repository.es.searches[1]["search_after"] == [1699999999999, "id1"]
+
+    with pytest.raises(ValueError):
+        await repository.list_latest_articles(fields=["raw_text"])
+
+
+class FakeIndices:
+    def __init__(self):
+        self.calls = []
+
+    def exists_alias(self, name):
+        return False
+
+    def exists(self, index):
+        return False
+
+    def __getattr__(self, name):
+        return lambda **kwargs: self.calls.append(name)
+
+
+def test_migration_keeps_the_old_index_when_documents_fail(monkeypatch):
+    repository = make_repository([])
+    repository.es.indices = FakeIndices()
+    monkeypatch.setattr(
+        "channel_automation.data_access.elasticsearch.methods.helpers.scan",
+        lambda es, index, size: [{"_source": {"source": "https://a"}}],
+    )
+    monkeypatch.setattr(
+        "channel_automation.data_access.elasticsearch.methods.helpers.streaming_bulk",
+        lambda es, actions, **kwargs: [
+            (False, {"create": {"status": 429}}) for _ in actions
+        ],
+    )
+
+    with pytest.raises(RuntimeError):
+        repository.migrate_index()
+
+    assert repository.es.indices.calls == ["create", "refresh"]
@@ -0,0 +1,99 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlmodel import SQLModel
+
+from channel_automation.data_access.postgresql.outbox import PGOutbox
+from channel_automation.services.outbox import ARTICLE, OutboxWorker
+
+
+@pytest.fixture
+def outbox(tmp_path, clock):
+    outbox = PGOutbox(
+        f"sqlite:///{tmp_path / 'outbox.db'}", lease=60, max_attempts=2, clock=clock
+    )
+    SQLModel.metadata.create_all(outbox.engine)
+    return outbox
+
+
+@pytest.mark.asyncio
+async def test_a_message_is_enqueued_once_per_key(outbox):
+    assert await outbox.enqueue(ARTICLE, "article:1", {"article_id": "1"})
+    assert not await outbox.enqueue(ARTICLE, "article:1", {"article_id": "1"})
+
+    messages = await outbox.claim(10)
+
+    assert [message.payload for message in messages] == ['{"article_id": "1"}']
+    assert outbox.stats().duplicates == 1
+
+
+@pytest.mark.asyncio
+async def test_an_unacknowledged_message_comes_back_after_its_lease(outbox, clock):
+    await outbox.enqueue(ARTICLE, "article:1", {"article_id": "1"})
+
+    assert len(await outbox.claim(10)) == 1
+    assert await outbox.claim(10) == []
+
+    clock.now += timedelta(seconds=61)
+    [message] = await outbox.claim(10)
+    assert message.attempts == 2
+
+    await outbox.mark_delivered([message.id])
+    clock.now += timedelta(seconds=61)
+    assert await outbox.claim(10) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_messages_are_retried_until_the_last_attempt(outbox, clock):
+    await outbox.enqueue(ARTICLE, "article:1", {"article_id": "1"})
+
+    for _ in range(2):
+        [message] = await outbox.claim(10)
+        await outbox.mark_failed(message.id, "Forbidden")
+        assert await outbox.claim(10) == []
+        clock.now += timedelta(hours=1)
+
+    assert await outbox.claim(10) == []
+
+
+@pytest.mark.asyncio
+async def test_the_worker_delivers_a_batch_and_keeps_failures(outbox, clock):
+    delivered = []
+
+    async def deliver(payload):
+        if payload["article_id"] == "broken":
+            raise RuntimeError("Article broken did not reach every admin")
+        delivered.append(payload["article_id"])
+
+    for article_id in ["1", "broken", "2"]:
+        await outbox.enqueue(
+            ARTICLE, f"article:{article_id}", {"article_id": article_id}
+        )
+    worker = OutboxWorker(outbox, {ARTICLE: deliver}, batch_size=10)
+
+    assert await worker.drain_once() == 3
+
+    assert sorted(delivered) == ["1", "2"]
+    assert (worker.stats().delivered, worker.stats().failed) == (2, 1)
+    clock.now += timedelta(minutes=1)
+    [retry] = await outbox.claim(10)
+    assert retry.dedup_key == "article:broken"
+    assert "did not reach" in retry.last_error
+
+
+@pytest.mark.asyncio
+async def test_the_worker_polls_without_notify(outbox):
+    delivered = asyncio.Event()
+
+    async def deliver(payload):
+        delivered.set()
+
+    worker = OutboxWorker(outbox, {ARTICLE: deliver}, poll_interval=0.05)
+    await worker.start()
+    await asyncio.sleep(0.01)
+    await outbox.enqueue(ARTICLE, "article:1", {"article_id": "1"})
+
+    await asyncio.wait_for(delivered.wait(), timeout=1)
+    await worker.close()
+    await outbox.close()
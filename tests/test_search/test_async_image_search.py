@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from channel_automation.search.images import AsyncBingImageSearch, parse_bing_image_urls
+
+
+def bing_page(count):
+    results = "".join(
+        f'<a class="iusc" m="{{&quot;cid&quot;:&quot;{number}&quot;,'
+        f"&quot;murl&quot;:&quot;https://img.example.com/{number}.jpg?a=1&amp;b=2"
+        f'&quot;,&quot;turl&quot;:&quot;https://tse.example.com/{number}&quot;}}">'
+        for number in range(count)
+    )
+    return f"<html><body>{results}</body></html>"
+
+
+@pytest_asyncio.fixture
+async def bing():
+    state = {"delay": 0.0, "count": 3, "queries": []}
+
+    async def search(request):
+        state["queries"].append(request.query["q"])
+        await asyncio.sleep(state["delay"])
+        return web.Response(text=bing_page(state["count"]), content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/images/search", search)
+    server = TestServer(app)
+    await server.start_server()
+    state["url"] = str(server.make_url("/images/search"))
+    yield state
+    await server.close()
+
+
+def test_image_urls_are_read_from_the_escaped_result_metadata():
+    assert parse_bing_image_urls(bing_page(3), 2) == [
+        "https://img.example.com/0.jpg?a=1&b=2",
+        "https://img.example.com/1.jpg?a=1&b=2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_repeated_queries_are_served_from_the_cache(bing):
+    search = AsyncBingImageSearch(base_url=bing["url"])
+
+    first = await search.search_images("Pattaya  Beach", 25)
+    again = await search.search_images("pattaya beach", 2)
+    await search.close()
+
+    assert len(first) == 3
+    assert again == first[:2]
+    assert bing["queries"] == ["Pattaya  Beach"]
+    stats = search.stats()
+    assert (stats.requests, stats.cache.hits) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_a_slow_answer_times_out(bing):
+    bing["delay"] = 1.0
+    search = AsyncBingImageSearch(timeout=0.1, base_url=bing["url"])
+
+    with pytest.raises(asyncio.TimeoutError):
+        await search.search_images("visa", 5)
+    await search.close()
+
+    assert search.stats().timeouts == 1
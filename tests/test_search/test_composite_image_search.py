@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from channel_automation.interfaces.search_interface import IAsyncImageSearch
+from channel_automation.search.composite import (
+    CompositeImageSearch,
+    normalize_image_url,
+)
+
+
+class FakeProvider(IAsyncImageSearch):
+    def __init__(self, urls, delay=0.0, error=None):
+        self.urls = urls
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def search_images(self, query, num_images):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.urls[:num_images]
+
+    async def close(self):
+        pass
+
+
+def test_urls_of_the_same_image_normalize_alike():
+    assert normalize_image_url("https://www.site.com/a.jpg?utm_source=x") == (
+        normalize_image_url("http://SITE.com/a.jpg#top")
+    )
+    assert normalize_image_url("https://site.com/a.jpg?w=1") != (
+        normalize_image_url("https://site.com/a.jpg?w=2")
+    )
+
+
+@pytest.mark.asyncio
+async def test_results_are_interleaved_and_deduplicated():
+    search = CompositeImageSearch(
+        {
+            "bing": FakeProvider(["https://a.com/1.jpg", "https://a.com/2.jpg"]),
+            "google": FakeProvider(["https://www.a.com/1.jpg", "https://b.com/3.jpg"]),
+        },
+        enough=10,
+    )
+
+    urls = await search.search_images("beach", 10)
+
+    assert urls == ["https://a.com/1.jpg", "https://a.com/2.jpg", "https://b.com/3.jpg"]
+
+
+@pytest.mark.asyncio
+async def test_returns_once_enough_images_are_in():
+    slow = FakeProvider(["https://slow.com/1.jpg"], delay=5)
+    search = CompositeImageSearch(
+        {"slow": slow, "fast": FakeProvider(["https://fast.com/1.jpg"])},
+        deadline=5,
+        enough=1,
+    )
+
+    urls = await asyncio.wait_for(search.search_images("beach", 25), timeout=1)
+
+    assert urls == ["https://fast.com/1.jpg"]
+    # Being outrun is not a failure
+    assert search.stats().providers["slow"].failures == 0
+
+
+@pytest.mark.asyncio
+async def test_providers_missing_the_deadline_are_skipped_after_a_while():
+    slow = FakeProvider(["https://slow.com/1.jpg"], delay=5)
+    search = CompositeImageSearch(
+        {"slow": slow, "fast": FakeProvider(["https://fast.com/1.jpg"])},
+        deadline=0.05,
+        enough=5,
+    )
+
+    for _ in range(4):
+        assert await search.search_images("beach", 5) == ["https://fast.com/1.jpg"]
+
+    assert slow.calls == 3
+    stats = search.stats()
+    assert stats.deadline_misses == 3
+    assert not stats.providers["slow"].available
+    assert stats.providers["fast"].success_rate == 1.0